@@ -0,0 +1,110 @@
+"""Populate the character list with N characters: QTableWidget rows vs. the model/view table.
+
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_character_table.py [--rows 10000] [--widget-rows 1000]
+
+The old per-row QTableWidget code resizes every column after every row, so it is
+quadratic; --widget-rows caps how many rows it is given.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QIcon
+from PyQt5.QtWidgets import QApplication, QPushButton, QTableView, QTableWidget, QTableWidgetItem
+
+from character_model import CharacterFilterProxyModel, CharacterTableModel, DeleteButtonDelegate, DELETE_COLUMN
+from character_store import CharacterStore
+
+ICON_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "icons", "red_cross.png")
+
+
+def rss_mib():
+    # Resident set size on Linux; None elsewhere
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+def widget_table(characters):
+    # The populate_character_table loop the launcher used before the model
+    table = QTableWidget()
+    table.setColumnCount(4)
+    table.show()
+    for character in characters:
+        row = table.rowCount()
+        table.insertRow(row)
+        table.setItem(row, 0, QTableWidgetItem(character["server"]))
+        table.setItem(row, 1, QTableWidgetItem(character["username"]))
+        table.setItem(row, 2, QTableWidgetItem(character["password"]))
+        table.setColumnHidden(2, True)
+        delete_button = QPushButton()
+        delete_button.setIcon(QIcon(ICON_FILE))
+        table.setCellWidget(row, 3, delete_button)
+        for column in range(4):
+            table.resizeColumnToContents(column)
+    return table
+
+
+def model_table(characters_file):
+    store = CharacterStore(characters_file)
+    model = CharacterTableModel(store)
+    proxy = CharacterFilterProxyModel()
+    proxy.setSourceModel(model)
+    table = QTableView()
+    table.setModel(proxy)
+    table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+    table.setSortingEnabled(True)
+    table.setItemDelegateForColumn(DELETE_COLUMN, DeleteButtonDelegate(ICON_FILE, table))
+    table.resizeColumnsToContents()
+    table.show()
+    return table, (store, model, proxy)
+
+
+def measure(label, app, func):
+    before = rss_mib()
+    start = time.perf_counter()
+    result = func()
+    app.processEvents()
+    elapsed = time.perf_counter() - start
+    after = rss_mib()
+    memory = f"{after - before:+8.1f} MiB" if before is not None else "n/a"
+    print(f"{label:<30} {elapsed:8.3f} s  RSS {memory}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--widget-rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    characters = [
+        {"server": f"server{i % 7}.example", "username": f"character{i}", "password": "secret"}
+        for i in range(args.rows)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        characters_file = os.path.join(tmp, "characters.json")
+        with open(characters_file, "w") as f:
+            json.dump(characters, f)
+
+        keep = measure(f"model/view, {args.rows} rows", app, lambda: model_table(characters_file))
+        table = keep[0]
+        measure(f"model/view, sort {args.rows} rows", app, lambda: table.sortByColumn(1, Qt.AscendingOrder))
+        widget_rows = min(args.rows, args.widget_rows)
+        keep = measure(f"QTableWidget, {widget_rows} rows", app, lambda: widget_table(characters[:widget_rows]))
+        del keep
+
+
+if __name__ == "__main__":
+    main()
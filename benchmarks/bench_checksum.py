@@ -0,0 +1,136 @@
+"""SHA-256 computed inside the download loop against hashing the finished file.
+
+Also checks that corrupted and truncated bodies are refused before anything
+is extracted, and that a verified archive is not downloaded twice; exits
+with status 1 if one of these does not hold:
+
+    python benchmarks/bench_checksum.py [--size-mb 64]
+"""
+import argparse
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import launcher_core
+from downloader import ChecksumMismatch, DigestRecord, RangedDownloader
+from launcher_core import LauncherError
+from local_server import FaultInjectingHandler, LocalAssetServer
+from manifest import InstallManifest
+from network import HttpClient
+
+
+def sha256_file(path):
+    # What verifying after the download costs: a second full read
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(4 * 1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_archive(size):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for i in range(max(1, size // (1024 * 1024))):
+            archive.writestr(f"client/{i}.bin", os.urandom(1024 * 1024))
+    return buffer.getvalue()
+
+
+def refused(server, path, expected):
+    # (description, whether the download was refused and left no file behind)
+    downloader = RangedDownloader(chunk_size=1024 * 1024, client=HttpClient(backoff=0.05))
+    try:
+        downloader.download(server.url, path, sha256=expected)
+    except ChecksumMismatch as e:
+        kept = os.path.exists(path)
+        return f"refused ({e}), file kept={kept}", not kept
+    os.remove(path)
+    DigestRecord(path).remove()
+    return "accepted", False
+
+
+def main():
+    failures = []
+
+    def expect(condition, failure):
+        if not condition:
+            failures.append(failure)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=64)
+    args = parser.parse_args()
+    payload = make_archive(args.size_mb * 1024 * 1024)
+    expected = hashlib.sha256(payload).hexdigest()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "asset.zip")
+
+        with LocalAssetServer(payload, handler=FaultInjectingHandler) as server:
+            downloader = RangedDownloader(chunk_size=4 * 1024 * 1024)
+            began = time.perf_counter()
+            downloader.download(server.url, path)
+            download_only = time.perf_counter() - began
+            DigestRecord(path).remove()
+            began = time.perf_counter()
+            digest = sha256_file(path)
+            rehash = time.perf_counter() - began
+            os.remove(path)
+
+            began = time.perf_counter()
+            inline = downloader.download(server.url, path, sha256=expected)
+            with_inline = time.perf_counter() - began
+            print(f"{len(payload) >> 20} MiB: download + second read {download_only + rehash:.3f}s "
+                  f"({rehash:.3f}s hashing), inline {with_inline:.3f}s, digests match={inline == digest == expected}")
+            expect(inline == digest == expected, "inline SHA-256 differs from the file's")
+
+            requests_before = len(server.httpd.requests)
+            began = time.perf_counter()
+            downloader.download(server.url, path, sha256=expected)
+            print(f"already verified: {1000 * (time.perf_counter() - began):.2f} ms, "
+                  f"requests={len(server.httpd.requests) - requests_before}")
+            expect(len(server.httpd.requests) == requests_before, "verified archive was downloaded again")
+            os.remove(path)
+            DigestRecord(path).remove()
+
+        # The first request of every download is the range probe
+        cases = [
+            ("corrupted range", payload, True, [None, None, "corrupt"]),
+            ("truncated body", payload[:-4096], True, []),
+            ("corrupted single stream", payload, False, [None, "corrupt"]),
+        ]
+        for label, body, supports_ranges, faults in cases:
+            with LocalAssetServer(body, handler=FaultInjectingHandler, supports_ranges=supports_ranges,
+                                  faults=faults) as server:
+                description, ok = refused(server, path, expected)
+                print(f"{label}: {description}")
+                expect(ok, f"{label}: {description}")
+
+        # Through the install path: the update is refused and nothing is extracted
+        install_dir = os.path.join(tmp, "install")
+        os.makedirs(install_dir)
+        manifest = InstallManifest(os.path.join(tmp, "manifest.json"), install_dir)
+        with LocalAssetServer(payload, handler=FaultInjectingHandler, faults=[None, "corrupt"]) as server:
+            downloader = RangedDownloader(chunk_size=1024 * 1024, client=HttpClient(backoff=0.05))
+            try:
+                launcher_core.download_and_extract(downloader, [server.url], path, install_dir, manifest,
+                                                   digest=expected)
+                print("install from a corrupted download: accepted")
+                failures.append("install from a corrupted download was accepted")
+            except LauncherError as e:
+                extracted = len(os.listdir(install_dir))
+                print(f"install from a corrupted download: {e}; extracted files={extracted}")
+                expect(extracted == 0, f"{extracted} files extracted from a corrupted download")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
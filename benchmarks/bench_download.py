@@ -0,0 +1,63 @@
+"""Compare the old single-stream download loop with RangedDownloader.
+
+Every connection to the local server is throttled, which is what a
+high-latency link looks like to a single TCP stream.
+
+    python benchmarks/bench_download.py [--size-mb 32] [--rate-kb 2048]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import requests
+
+from downloader import RangedDownloader
+from local_server import LocalAssetServer
+
+
+def single_stream(url, path):
+    # The loop update_app used before the ranged engine
+    with requests.get(url, stream=True) as r:
+        r.raise_for_status()
+        with open(path, "wb") as f:
+            for chunk in r.iter_content(chunk_size=8192):
+                f.write(chunk)
+
+
+def run(label, func, expected):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "asset.zip")
+        start = time.perf_counter()
+        func(path)
+        elapsed = time.perf_counter() - start
+        with open(path, "rb") as f:
+            ok = f.read() == expected
+    mb = len(expected) / (1024 * 1024)
+    print(f"{label:<28} {elapsed:7.2f} s  {mb / elapsed:7.2f} MiB/s  {'ok' if ok else 'CORRUPT'}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=32)
+    parser.add_argument("--rate-kb", type=int, default=2048, help="per-connection throttle in KiB/s")
+    parser.add_argument("--chunk-mb", type=int, default=2)
+    args = parser.parse_args()
+
+    payload = os.urandom(args.size_mb * 1024 * 1024)
+    with LocalAssetServer(payload, bytes_per_second=args.rate_kb * 1024) as server:
+        run("single stream (8 KiB)", lambda p: single_stream(server.url, p), payload)
+        for concurrency in (1, 4, 8):
+            downloader = RangedDownloader(concurrency=concurrency, chunk_size=args.chunk_mb * 1024 * 1024)
+            run(f"ranged x{concurrency}", lambda p: downloader.download(server.url, p), payload)
+
+    with LocalAssetServer(payload, bytes_per_second=args.rate_kb * 1024, supports_ranges=False) as server:
+        downloader = RangedDownloader(concurrency=8, chunk_size=args.chunk_mb * 1024 * 1024)
+        run("ranged x8, no range support", lambda p: downloader.download(server.url, p), payload)
+
+
+if __name__ == "__main__":
+    main()
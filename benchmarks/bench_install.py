@@ -0,0 +1,95 @@
+"""Wall-clock time and peak disk usage of download-then-extract vs. streaming install.
+
+    python benchmarks/bench_install.py [--files 400] [--rate-kb 4096]
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from downloader import RangedDownloader
+from local_server import LocalAssetServer
+from streaming_install import StreamingInstaller
+
+
+def make_archive(files, file_size):
+    # Half compressible, half random, roughly like client graphics and binaries
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for i in range(files):
+            data = os.urandom(file_size // 2) + bytes(file_size // 2)
+            archive.writestr(f"gfx/{i % 20}/{i}.png", data)
+    return buffer.getvalue()
+
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def measure(label, func):
+    with tempfile.TemporaryDirectory() as tmp:
+        peak = [0]
+        stop = threading.Event()
+
+        def sample():
+            while not stop.is_set():
+                peak[0] = max(peak[0], directory_size(tmp))
+                time.sleep(0.02)
+
+        sampler = threading.Thread(target=sample)
+        sampler.start()
+        start = time.perf_counter()
+        func(tmp)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        sampler.join()
+        peak[0] = max(peak[0], directory_size(tmp))
+    print(f"{label:<26} {elapsed:7.2f} s   peak disk {peak[0] / (1024 * 1024):8.1f} MiB")
+
+
+def download_then_extract(url, tmp, concurrency, chunk_size):
+    release_file = os.path.join(tmp, "release.zip")
+    RangedDownloader(concurrency=concurrency, chunk_size=chunk_size).download(url, release_file)
+    with zipfile.ZipFile(release_file) as archive:
+        archive.extractall(os.path.join(tmp, "install"))
+    os.remove(release_file)
+
+
+def streaming(url, tmp, concurrency, chunk_size):
+    downloader = RangedDownloader(concurrency=concurrency, chunk_size=chunk_size)
+    installer = StreamingInstaller(downloader, staging_dir=os.path.join(tmp, "install", ".update_staging"))
+    installer.install(url, os.path.join(tmp, "install"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=400)
+    parser.add_argument("--file-kb", type=int, default=256)
+    parser.add_argument("--rate-kb", type=int, default=4096, help="per-connection throttle in KiB/s")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--chunk-mb", type=int, default=4)
+    args = parser.parse_args()
+
+    payload = make_archive(args.files, args.file_kb * 1024)
+    print(f"archive {len(payload) / (1024 * 1024):.1f} MiB, {args.files} entries")
+    chunk_size = args.chunk_mb * 1024 * 1024
+    with LocalAssetServer(payload, bytes_per_second=args.rate_kb * 1024) as server:
+        measure("download then extract", lambda tmp: download_then_extract(server.url, tmp, args.concurrency, chunk_size))
+        measure("streaming install", lambda tmp: streaming(server.url, tmp, args.concurrency, chunk_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Network layer under faults: retries, Retry-After, connection reuse and the bandwidth cap.
+
+Runs RangedDownloader against a local server that answers with 503/429,
+resets connections and drops responses half way, then checks the file.
+Exits with status 1 if a file is damaged, Retry-After is not honoured, a
+persistent error is retried forever or the cap is exceeded:
+
+    python benchmarks/bench_network.py [--size-mb 8] [--cap-kb 2048]
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import requests
+
+from downloader import RangedDownloader
+from local_server import FaultInjectingHandler, LocalAssetServer
+from network import HttpClient
+
+
+def download(client, url, path, concurrency=4, chunk_size=1024 * 1024):
+    downloader = RangedDownloader(concurrency=concurrency, chunk_size=chunk_size, client=client)
+    began = time.perf_counter()
+    downloader.download(url, path)
+    return time.perf_counter() - began
+
+
+def check(path, payload):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).digest() == hashlib.sha256(payload).digest()
+
+
+def main():
+    failures = []
+
+    def expect(condition, failure):
+        if not condition:
+            failures.append(failure)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=8)
+    parser.add_argument("--cap-kb", type=int, default=2048)
+    args = parser.parse_args()
+    payload = os.urandom(args.size_mb * 1024 * 1024)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "asset.zip")
+
+        faults = ["503", "reset", "drop", "429", "drop", "503"]
+        with LocalAssetServer(payload, handler=FaultInjectingHandler, faults=faults) as server:
+            client = HttpClient(backoff=0.1)
+            elapsed = download(client, server.url, path)
+            intact = check(path, payload)
+            print(f"faults {faults}: {len(server.httpd.requests)} requests, {elapsed:.2f}s, intact={intact}")
+            expect(intact, f"download under faults {faults} is damaged")
+
+        with LocalAssetServer(payload, handler=FaultInjectingHandler, faults=["503"], retry_after=2) as server:
+            elapsed = download(HttpClient(backoff=0.1), server.url, path)
+            (first, _), (second, _) = server.httpd.requests[:2]
+            intact = check(path, payload)
+            print(f"Retry-After: 2 -> retried after {second - first:.2f}s, intact={intact}")
+            expect(second - first >= 1.95, f"Retry-After: 2 not honoured, retried after {second - first:.2f}s")
+            expect(intact, "download after Retry-After is damaged")
+
+        with LocalAssetServer(payload, handler=FaultInjectingHandler, faults=["503"] * 10) as server:
+            try:
+                download(HttpClient(retries=2, backoff=0.05), server.url, path)
+                print("persistent 503: download succeeded unexpectedly")
+                failures.append("persistent 503: download succeeded")
+            except requests.exceptions.RequestException as e:
+                print(f"persistent 503: gave up after {len(server.httpd.requests)} requests ({e})")
+                # The probe and its two retries
+                expect(len(server.httpd.requests) == 3,
+                       f"persistent 503: {len(server.httpd.requests)} requests with retries=2")
+
+        with LocalAssetServer(payload[:1024], handler=FaultInjectingHandler) as server:
+            for _ in range(20):
+                requests.get(server.url).content
+            bare = len({port for _, port in server.httpd.requests})
+            server.httpd.requests.clear()
+            client = HttpClient()
+            for _ in range(20):
+                client.get(server.url).content
+            pooled = len({port for _, port in server.httpd.requests})
+            print(f"20 sequential requests: {bare} connections with requests.get, {pooled} with the pooled client")
+            expect(pooled == 1, f"pooled client opened {pooled} connections for 20 requests")
+
+        cap = args.cap_kb * 1024
+        with LocalAssetServer(payload, handler=FaultInjectingHandler) as server:
+            elapsed = download(HttpClient(bandwidth_limit=cap), server.url, path)
+            rate = len(payload) / elapsed
+            intact = check(path, payload)
+            print(f"cap {args.cap_kb} KiB/s over 4 connections: {rate / 1024:.0f} KiB/s, intact={intact}")
+            # The token bucket allows one burst of a quarter second on top of the rate, plus 5% for timing
+            expect(len(payload) / (elapsed + 0.25) <= cap * 1.05, f"{rate / 1024:.0f} KiB/s over the cap of {args.cap_kb}")
+            expect(intact, "capped download is damaged")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
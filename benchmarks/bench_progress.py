@@ -0,0 +1,94 @@
+"""Per-chunk cost of progress reporting: the old GUI-thread loop vs. ProgressThrottle.
+
+Simulates a 100 MiB download in 8 KiB chunks without any network, so the
+numbers are pure reporting overhead. Run under offscreen Qt:
+
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_progress.py
+"""
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+from PyQt5.QtWidgets import QApplication, QProgressBar
+
+from progress import ProgressThrottle
+
+
+def old_loop(progress_bar, chunks, chunk_size):
+    # What update_app did for every chunk
+    total = chunks * chunk_size
+    dl = 0
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(chunks):
+            dl += chunk_size
+            progress = int(100 * dl / total)
+            print(progress)
+            progress_bar.setValue(progress)
+            QApplication.processEvents()
+
+
+class Reporter(QObject):
+    progress = pyqtSignal(int, float, float)
+
+
+class Transfer(QThread):
+    def __init__(self, reporter, chunks, chunk_size):
+        super().__init__()
+        self.reporter = reporter
+        self.chunks = chunks
+        self.chunk_size = chunk_size
+        self.emitted = 0
+
+    def run(self):
+        throttle = ProgressThrottle()
+        total = self.chunks * self.chunk_size
+        dl = 0
+        for _ in range(self.chunks):
+            dl += self.chunk_size
+            state = throttle.update(dl, total)
+            if state is not None:
+                self.reporter.progress.emit(*state)
+                self.emitted += 1
+
+
+def new_loop(app, progress_bar, chunks, chunk_size):
+    reporter = Reporter()
+    reporter.progress.connect(lambda percent, rate, eta: progress_bar.setValue(percent))
+    transfer = Transfer(reporter, chunks, chunk_size)
+    transfer.finished.connect(app.quit)
+    transfer.start()
+    app.exec_()
+    transfer.wait()
+    return transfer.emitted
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=100)
+    parser.add_argument("--chunk-kb", type=int, default=8)
+    args = parser.parse_args()
+
+    chunk_size = args.chunk_kb * 1024
+    chunks = args.size_mb * 1024 * 1024 // chunk_size
+    app = QApplication(sys.argv)
+    progress_bar = QProgressBar()
+    progress_bar.show()
+
+    start = time.perf_counter()
+    old_loop(progress_bar, chunks, chunk_size)
+    old = time.perf_counter() - start
+    print(f"GUI-thread loop     {old:7.3f} s  {old / chunks * 1e6:7.2f} us/chunk  {chunks} updates")
+
+    start = time.perf_counter()
+    emitted = new_loop(app, progress_bar, chunks, chunk_size)
+    new = time.perf_counter() - start
+    print(f"throttled signals   {new:7.3f} s  {new / chunks * 1e6:7.2f} us/chunk  {emitted} updates")
+
+
+if __name__ == "__main__":
+    main()
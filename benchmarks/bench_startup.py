@@ -0,0 +1,141 @@
+"""Launcher startup time: module imports (python -X importtime) and time to first paint.
+
+Each run starts a fresh interpreter under offscreen Qt in a scratch directory,
+imports main, builds and shows AstoniaLauncher and stops at the first event
+loop iteration. The median over the runs is compared against the budgets, and
+the script exits with status 1 when a budget is exceeded or when main pulls in
+a module that must stay off the startup path:
+
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_startup.py --runs 5 --json startup.json
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SRC_DIR = os.path.join(REPO_DIR, "src")
+
+# Only needed once an update, a verify or a launch actually runs
+DEFERRED_MODULES = ["requests", "urllib3", "zipfile", "bitarray", "asyncio", "concurrent.futures"]
+
+CHILD = r"""
+import json, os, sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+before = set(sys.modules)
+import main
+imported = time.perf_counter()
+new_modules = sorted(set(sys.modules) - before)
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication
+app = QApplication([])
+launcher = main.AstoniaLauncher()
+launcher.show()
+
+def first_paint():
+    print(json.dumps({
+        "import_ms": (imported - start) * 1000,
+        "first_paint_ms": (time.perf_counter() - start) * 1000,
+        "modules": new_modules,
+    }))
+    sys.stdout.flush()
+    # The update check thread may still be running, skip the Qt teardown
+    os._exit(0)
+
+QTimer.singleShot(0, first_paint)
+app.exec_()
+"""
+
+
+def parse_importtime(stderr):
+    # Lines look like "import time:  self [us] | cumulative | imported package", indented by nesting
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Drop the separator space, leaving two spaces of indentation per nesting level
+        modules.append((name[1:].rstrip(), int(cumulative)))
+    return modules
+
+
+def run_once(workdir):
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, SRC_DIR],
+        cwd=workdir, env=env, capture_output=True, text=True, timeout=60,
+    )
+    lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+    if result.returncode != 0 or not lines:
+        sys.exit(f"Launcher did not start:\n{result.stdout}\n{result.stderr}")
+    return json.loads(lines[-1]), parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=250.0)
+    parser.add_argument("--first-paint-budget-ms", type=float, default=600.0)
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level imports to show")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        shutil.copytree(os.path.join(REPO_DIR, "icons"), os.path.join(workdir, "icons"))
+        os.makedirs(os.path.join(workdir, "settings"))
+        runs = [run_once(workdir) for _ in range(args.runs)]
+
+    import_ms = statistics.median(timings["import_ms"] for timings, _ in runs)
+    first_paint_ms = statistics.median(timings["first_paint_ms"] for timings, _ in runs)
+    loaded = set(runs[0][0]["modules"])
+    deferred = [name for name in DEFERRED_MODULES if name in loaded]
+
+    # Direct imports of main from the last run, slowest first
+    tree = runs[-1][1]
+    # importtime lists children before their parent, main's subtree follows the previous top-level entry
+    main_index = max(i for i, (name, _) in enumerate(tree) if name == "main")
+    subtree_start = max((i for i, (name, _) in enumerate(tree[:main_index]) if not name.startswith(" ")), default=-1)
+    top_level = [
+        (name.strip(), cumulative) for name, cumulative in tree[subtree_start + 1:main_index]
+        if len(name) - len(name.lstrip()) == 2
+    ]
+    top_level.sort(key=lambda item: -item[1])
+
+    print(f"runs:            {args.runs}")
+    print(f"import main:     {import_ms:.1f} ms (budget {args.import_budget_ms:.0f} ms)")
+    print(f"first paint:     {first_paint_ms:.1f} ms (budget {args.first_paint_budget_ms:.0f} ms)")
+    print("slowest imports of main:")
+    for name, cumulative in top_level[:args.top]:
+        print(f"  {name:<28} {cumulative / 1000:>8.1f} ms")
+
+    failures = []
+    if import_ms > args.import_budget_ms:
+        failures.append(f"import main took {import_ms:.1f} ms")
+    if first_paint_ms > args.first_paint_budget_ms:
+        failures.append(f"first paint took {first_paint_ms:.1f} ms")
+    if deferred:
+        failures.append(f"imported at startup: {', '.join(deferred)}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "import_ms": import_ms,
+                "first_paint_ms": first_paint_ms,
+                "deferred_modules_loaded": deferred,
+                "top_imports": top_level[:args.top],
+                "failures": failures,
+            }, f, indent=2)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Verification of a synthetic install tree, cold and with the (size, mtime) index.
+
+    python benchmarks/bench_verify.py [--files 10000] [--file-kb 64]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from manifest import InstallManifest
+
+
+def make_tree(root, files, file_size):
+    entries = []
+    for i in range(files):
+        name = f"gfx/{i % 100}/{i}.png"
+        path = os.path.join(root, *name.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = os.urandom(file_size)
+        with open(path, "wb") as f:
+            f.write(data)
+        entries.append((name, len(data), zlib.crc32(data)))
+    return entries
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    broken = func()
+    print(f"{label:<34} {time.perf_counter() - start:7.3f} s  {len(broken)} broken")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=10000)
+    parser.add_argument("--file-kb", type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        entries = make_tree(root, args.files, args.file_kb * 1024)
+        print(f"{args.files} files, {args.files * args.file_kb / 1024:.0f} MiB")
+        manifest_file = os.path.join(root, "manifest.json")
+
+        for workers in (1, 4, 8):
+            manifest = InstallManifest(manifest_file, root)
+            timed(f"no index, {workers} worker(s)", lambda: manifest.find_changed(entries, workers=workers))
+        manifest.save()
+
+        with open(os.path.join(root, "gfx", "1", "1.png"), "r+b") as f:
+            f.write(b"corrupt")
+        manifest = InstallManifest(manifest_file, root)
+        timed("warm index, one file changed", lambda: manifest.find_changed(entries))
+        timed("warm index, full re-hash", lambda: manifest.find_changed(entries, trust_cache=False))
+
+
+if __name__ == "__main__":
+    main()
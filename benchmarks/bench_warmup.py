@@ -0,0 +1,76 @@
+"""Client file reads from a cold page cache against reads after the pre-launch warm-up.
+
+Creates a synthetic client directory, drops it from the page cache with
+posix_fadvise(DONTNEED) before each pass and reads every file once, as the
+client would on start, with and without warm_files() first:
+
+    python benchmarks/bench_warmup.py [--files 200] [--size-kb 512] [--budget 5]
+
+On a tmpfs or a machine that ignores DONTNEED both passes are warm; run it on
+the disk the client is installed on.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from data_warmup import format_report, warm_files
+
+
+def evict(paths):
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def read_all(paths):
+    # One file after the other in small reads, like a client loading its assets
+    started = time.perf_counter()
+    for path in paths:
+        with open(path, "rb") as f:
+            while f.read(64 * 1024):
+                pass
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=512)
+    parser.add_argument("--budget", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+    if not hasattr(os, "posix_fadvise"):
+        sys.exit("posix_fadvise is needed to empty the page cache between passes")
+
+    with tempfile.TemporaryDirectory(dir=".") as tmp:
+        paths = []
+        for i in range(args.files):
+            path = os.path.join(tmp, f"gfx/{i % 20}/{i}.png")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(os.urandom(args.size_kb * 1024))
+            paths.append(path)
+
+        evict(paths)
+        cold = read_all(paths)
+
+        evict(paths)
+        report = warm_files(paths, budget=args.budget, workers=args.workers)
+        warmed = read_all(paths)
+
+        print(f"{args.files} files, {args.files * args.size_kb / 1024:.0f} MiB")
+        print(f"cold reads: {cold:.3f}s")
+        print(f"warm-up: {format_report(report)}")
+        print(f"reads after the warm-up: {warmed:.3f}s, warm-up + reads {report['seconds'] + warmed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
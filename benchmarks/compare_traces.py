@@ -0,0 +1,80 @@
+"""Compare launcher traces recorded with --profile across versions.
+
+Each side is a trace file or a directory of traces; with several runs the
+median per-run time of each span is compared, which keeps noise down:
+
+    python src/main.py --profile=traces/old/run1.json   # repeat a few times per version
+    python benchmarks/compare_traces.py traces/old traces/new --threshold 20
+
+Exits with status 1 when a span got slower by more than the threshold, so it
+can gate CI. Spans shorter than --min-ms on both sides are ignored.
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+
+
+def load_runs(path):
+    files = sorted(glob.glob(os.path.join(path, "*.json"))) if os.path.isdir(path) else [path]
+    runs = []
+    for file in files:
+        with open(file, "r") as f:
+            trace = json.load(f)
+        # Span name -> total ms in this run
+        totals = {}
+        for event in trace.get("traceEvents", []):
+            if event.get("ph") == "X":
+                totals[event["name"]] = totals.get(event["name"], 0.0) + event["dur"] / 1000
+        runs.append((trace.get("otherData", {}).get("version"), totals))
+    if not runs:
+        sys.exit(f"No traces found in {path}")
+    return runs
+
+
+def median_totals(runs):
+    names = {name for _, totals in runs for name in totals}
+    return {name: statistics.median(totals.get(name, 0.0) for _, totals in runs) for name in names}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=20.0, help="allowed slowdown in percent")
+    parser.add_argument("--min-ms", type=float, default=5.0)
+    parser.add_argument("--ignore", action="append", default=[], help="span name to skip, repeatable")
+    args = parser.parse_args()
+
+    base_runs, new_runs = load_runs(args.base), load_runs(args.new)
+    base, new = median_totals(base_runs), median_totals(new_runs)
+    print(f"base: {len(base_runs)} runs, version {base_runs[0][0]}")
+    print(f"new:  {len(new_runs)} runs, version {new_runs[0][0]}")
+    print(f"{'span':<32} {'base ms':>10} {'new ms':>10} {'change':>8}")
+
+    regressions = []
+    for name in sorted(base.keys() | new.keys(), key=lambda name: -max(base.get(name, 0), new.get(name, 0))):
+        if name in args.ignore:
+            continue
+        before, after = base.get(name), new.get(name)
+        if before is None or after is None:
+            print(f"{name:<32} {before or 0:>10.1f} {after or 0:>10.1f} {'only ' + ('new' if before is None else 'base'):>8}")
+            continue
+        if max(before, after) < args.min_ms:
+            continue
+        change = 100 * (after - before) / before if before else 0.0
+        marker = ""
+        if change > args.threshold:
+            regressions.append(name)
+            marker = "  REGRESSION"
+        print(f"{name:<32} {before:>10.1f} {after:>10.1f} {change:>+7.0f}%{marker}")
+
+    if regressions:
+        print(f"{len(regressions)} spans slower than {args.threshold:.0f}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class AssetHandler(BaseHTTPRequestHandler):
+    # Serves self.server.payload for every path, honouring single byte ranges
+    def do_GET(self):
+        payload = self.server.payload
+        start, end = 0, len(payload) - 1
+        status = 200
+
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if if_range and if_range != self.server.etag:
+            range_header = None
+        if range_header and self.server.supports_ranges and range_header.startswith("bytes="):
+            first, _, last = range_header[len("bytes="):].partition("-")
+            if first:
+                start = int(first)
+                end = min(int(last), end) if last else end
+            else:
+                start = max(0, len(payload) - int(last))
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Length", str(end - start + 1))
+        if self.server.supports_ranges:
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", self.server.etag)
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(payload)}")
+        self.end_headers()
+        try:
+            self.send_body(payload, start, end)
+        except (BrokenPipeError, ConnectionResetError):
+            # Clients may hang up early, e.g. after a probe request
+            pass
+
+    def send_body(self, payload, start, end):
+        # Throttle each connection to bytes_per_second
+        block = 16 * 1024
+        rate = self.server.bytes_per_second
+        position = start
+        began = time.perf_counter()
+        while position <= end:
+            data = payload[position:min(position + block, end + 1)]
+            self.wfile.write(data)
+            position += len(data)
+            if rate:
+                expected = (position - start) / rate
+                delay = expected - (time.perf_counter() - began)
+                if delay > 0:
+                    time.sleep(delay)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FaultInjectingHandler(AssetHandler):
+    # Keep-alive capable; each request takes the next fault from server.faults, if any:
+    # "503" / "429" answer with that status and server.retry_after, "reset" closes without an answer,
+    # "drop" sends the headers and the first 64 KiB of the body, then closes,
+    # "corrupt" sends the whole response with one byte of the body flipped
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests.append((time.monotonic(), self.client_address[1]))
+            fault = self.server.faults.pop(0) if self.server.faults else None
+        if fault in ("503", "429"):
+            self.send_response(int(fault))
+            if self.server.retry_after is not None:
+                self.send_header("Retry-After", str(self.server.retry_after))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif fault == "reset":
+            self.close_connection = True
+            self.connection.close()
+        elif fault == "drop":
+            self.close_connection = True
+            self.wfile = _TruncatedWriter(self.wfile, 64 * 1024)
+            super().do_GET()
+        elif fault == "corrupt":
+            self.corrupt_body = True
+            super().do_GET()
+        else:
+            super().do_GET()
+
+    def send_body(self, payload, start, end):
+        if getattr(self, "corrupt_body", False):
+            self.corrupt_body = False
+            payload = payload[:start] + bytes([payload[start] ^ 0xFF]) + payload[start + 1:]
+        super().send_body(payload, start, end)
+
+
+class _TruncatedWriter:
+    # Passes on `limit` bytes of the response, then pretends the peer went away
+    def __init__(self, wfile, limit):
+        self.wfile = wfile
+        self.limit = limit
+
+    def write(self, data):
+        if self.limit <= 0:
+            raise ConnectionResetError()
+        data = data[:self.limit]
+        self.limit -= len(data)
+        return self.wfile.write(data)
+
+    def flush(self):
+        self.wfile.flush()
+
+    def __getattr__(self, name):
+        # closed, close() and the rest come from the real stream
+        return getattr(self.wfile, name)
+
+
+class LocalAssetServer:
+    def __init__(self, payload, bytes_per_second=None, supports_ranges=True, handler=AssetHandler,
+                 faults=None, retry_after=None):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.payload = payload
+        self.httpd.etag = '"%s"' % hashlib.md5(payload).hexdigest()
+        self.httpd.bytes_per_second = bytes_per_second
+        self.httpd.supports_ranges = supports_ranges
+        # Used by FaultInjectingHandler; requests records (time, client port) of every request
+        self.httpd.faults = list(faults or [])
+        self.httpd.retry_after = retry_after
+        self.httpd.requests = []
+        self.httpd.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}/asset.zip"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,337 @@
+"""Regression suite for the launcher's hot paths, offline and under offscreen Qt.
+
+Cases: cold start to first paint, populate_character_table at 10, 1k and 10k
+rows, the client options mask and launch command, settings load and save, and
+check_updates -> update_app against a local server serving a synthetic archive
+(streaming install and whole-archive download). Every case runs in a scratch
+directory; nothing touches the network or the real settings.
+
+    QT_QPA_PLATFORM=offscreen python benchmarks/suite.py --json results.json
+    QT_QPA_PLATFORM=offscreen python benchmarks/suite.py --json new.json --baseline results.json
+
+Results are written as JSON, one entry per metric with the median of the runs.
+The script exits with status 1 when a metric exceeds its budget in
+benchmarks/thresholds.json or, with --baseline, got slower than --tolerance
+percent compared to an earlier results file.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.join(BENCH_DIR, "..")
+sys.path.insert(0, os.path.join(REPO_DIR, "src"))
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import bench_startup as startup_benchmark
+from local_server import LocalAssetServer
+
+THRESHOLDS_FILE = os.path.join(BENCH_DIR, "thresholds.json")
+
+
+def timed(func, runs, setup=None):
+    # Milliseconds per run; setup() runs before each run and is not timed
+    samples = []
+    for _ in range(runs):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def per_call(func, calls, runs):
+    # Microseconds per call, for functions too fast to time one by one
+    return [sample * 1000 / calls for sample in timed(lambda: [func() for _ in range(calls)], runs)]
+
+
+def summary(samples, unit):
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "runs": len(samples),
+        "unit": unit,
+    }
+
+
+def scratch_dir(root):
+    # The layout the launcher expects next to it: icons/ and settings/
+    workdir = tempfile.mkdtemp(dir=root)
+    shutil.copytree(os.path.join(REPO_DIR, "icons"), os.path.join(workdir, "icons"))
+    os.makedirs(os.path.join(workdir, "settings"))
+    return workdir
+
+
+def write_release_cache(tag, url=None, digest=None):
+    import launcher_core
+
+    asset = {"name": "release.zip", "browser_download_url": url or "http://127.0.0.1:9/none.zip"}
+    if digest is not None:
+        asset["digest"] = f"sha256:{digest}"
+    # Fresh for the default TTL, so the launcher's own release lookup never goes to GitHub
+    with open(launcher_core.RELEASE_CACHE_FILE, "w") as f:
+        json.dump({"body": {"tag_name": tag, "body": "", "assets": [asset]},
+                   "etag": None, "last_modified": None, "fetched_at": time.time()}, f)
+
+
+def write_characters(count):
+    import launcher_core
+
+    characters = [
+        {"server": f"server{i % 7}.example", "username": f"character{i}", "password": "secret"}
+        for i in range(count)
+    ]
+    with open(launcher_core.CHARACTERS_FILE, "w") as f:
+        json.dump(characters, f)
+
+
+def make_archive(size):
+    # Stored 1 MiB entries of random data: building a deflated archive this size would dominate the run
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for i in range(max(1, size // (1024 * 1024))):
+            archive.writestr(f"gfx/{i % 20}/{i}.png", os.urandom(1024 * 1024))
+    return buffer.getvalue()
+
+
+def bench_startup(args, root):
+    workdir = scratch_dir(root)
+    runs = [startup_benchmark.run_once(workdir)[0] for _ in range(args.startup_runs)]
+    return {
+        "startup.import_ms": summary([run["import_ms"] for run in runs], "ms"),
+        "startup.first_paint_ms": summary([run["first_paint_ms"] for run in runs], "ms"),
+    }
+
+
+def new_launcher(app):
+    import main
+
+    launcher = main.AstoniaLauncher()
+    launcher.show()
+    # The start-up release check answers from the fresh release cache; it has to be done before a case
+    # changes the release, or it would run check_updates a second time
+    while not launcher.update_check_done:
+        app.processEvents()
+        time.sleep(0.001)
+    return launcher
+
+
+def bench_character_table(args, root, app):
+    import launcher_core
+
+    results = {}
+    for rows in (10, 1000, 10000):
+        os.chdir(scratch_dir(root))
+        # Installed and latest agree, so the start-up check does not start an update during the timing
+        write_release_cache("v0")
+        launcher_core.write_installed_version("v0")
+        write_characters(rows)
+        launcher = new_launcher(app)
+
+        def populate():
+            launcher.populate_character_table()
+            app.processEvents()
+
+        results[f"character_table.{rows}_ms"] = summary(timed(populate, args.runs), "ms")
+        launcher.stop_prefetch()
+        launcher.deleteLater()
+    return results
+
+
+def bench_options(args, root):
+    import launcher_core
+    from settings_model import OPTION_FIELDS, Settings
+
+    settings = Settings(executable_name="moac.exe")
+
+    def toggle_options():
+        # What the settings dialog does on save: every option field is assigned
+        for field in OPTION_FIELDS:
+            setattr(settings, field.name, not getattr(settings, field.name))
+
+    def launch_command():
+        return launcher_core.build_launch_command(settings, "server.example", "character", "secret")
+
+    return {
+        "options.mask_update_us": summary(per_call(toggle_options, 10000, args.runs), "us"),
+        "options.launch_command_us": summary(per_call(launch_command, 10000, args.runs), "us"),
+    }
+
+
+def bench_settings(args, root):
+    import launcher_core
+    from persistence import writer
+    from settings_model import Settings
+
+    os.chdir(scratch_dir(root))
+    Settings().save(launcher_core.SETTINGS_FILE)
+    writer.flush()
+    settings = Settings.load(launcher_core.SETTINGS_FILE)
+
+    def save():
+        # Debounced write plus the flush a close or launch does, fsync included
+        settings.save(launcher_core.SETTINGS_FILE)
+        writer.flush()
+
+    return {
+        "settings.load_ms": summary(timed(lambda: Settings.load(launcher_core.SETTINGS_FILE), args.runs * 10), "ms"),
+        "settings.save_ms": summary(timed(save, args.runs * 10), "ms"),
+    }
+
+
+def bench_update(args, root, app):
+    from PyQt5.QtWidgets import QMessageBox
+
+    import launcher_core
+
+    payload = make_archive(args.update_mb * 1024 * 1024)
+    digest = hashlib.sha256(payload).hexdigest()
+    # The update prompt is answered right away, the time measured is the launcher's
+    original_exec = QMessageBox.exec_
+    QMessageBox.exec_ = lambda box: QMessageBox.Yes
+    results = {}
+    try:
+        with LocalAssetServer(payload) as server:
+            for label, streaming in (("streaming", True), ("download", False)):
+                samples = []
+                for _ in range(args.update_runs):
+                    os.chdir(scratch_dir(root))
+                    # An older version is installed, so the start-up check finds nothing to do
+                    write_release_cache("v0")
+                    launcher_core.write_installed_version("v0")
+                    launcher = new_launcher(app)
+                    launcher.settings_dialog.settings.enable_streaming_install = streaming
+                    launcher.release_cache.body = {
+                        "tag_name": "v1",
+                        "body": "",
+                        "assets": [{"name": "release.zip", "browser_download_url": server.url,
+                                    "digest": f"sha256:{digest}"}],
+                    }
+                    done = []
+                    start = time.perf_counter()
+                    launcher.check_updates()
+                    launcher.update_worker.update_finished.connect(lambda: done.append("finished"))
+                    launcher.update_worker.update_failed.connect(done.append)
+                    while not done or launcher.update_worker.isRunning():
+                        app.processEvents()
+                        time.sleep(0.001)
+                    app.processEvents()
+                    samples.append((time.perf_counter() - start) * 1000)
+                    if done[0] != "finished" or launcher_core.read_installed_version() != "v1":
+                        raise RuntimeError(f"{label} update failed: {done[0]}")
+                    launcher.deleteLater()
+                results[f"update.{label}_{args.update_mb}mb_ms"] = summary(samples, "ms")
+    finally:
+        QMessageBox.exec_ = original_exec
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def check(results, thresholds, baseline, tolerance, min_value):
+    failures = []
+    for name, result in sorted(results.items()):
+        budget = thresholds.get(name)
+        line = f"{name:<36} {result['median']:>10.2f} {result['unit']:<3}"
+        if budget is not None:
+            line += f"  budget {budget:g}"
+            if result["median"] > budget:
+                failures.append(f"{name}: {result['median']:.2f} {result['unit']} over the budget of {budget:g}")
+                line += "  OVER BUDGET"
+        before = baseline.get(name)
+        if before is not None and before["median"] > 0:
+            change = 100 * (result["median"] - before["median"]) / before["median"]
+            line += f"  {change:+.0f}% vs baseline"
+            # Tiny values are mostly timer noise
+            if change > tolerance and result["median"] >= min_value:
+                failures.append(f"{name}: {change:+.0f}% compared to the baseline")
+                line += "  REGRESSION"
+        print(line)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--startup-runs", type=int, default=5)
+    parser.add_argument("--update-mb", type=int, default=200, help="size of the synthetic release archive")
+    parser.add_argument("--update-runs", type=int, default=1)
+    parser.add_argument("--only", action="append", choices=["startup", "table", "options", "settings", "update"],
+                        help="run only these cases, repeatable")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--thresholds", default=THRESHOLDS_FILE)
+    parser.add_argument("--baseline", help="results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=25.0, help="allowed slowdown against the baseline in %%")
+    parser.add_argument("--min-value", type=float, default=1.0, help="medians below this never count as regressions")
+    args = parser.parse_args()
+    only = set(args.only or ["startup", "table", "options", "settings", "update"])
+
+    from PyQt5.QtWidgets import QApplication
+
+    app = QApplication(sys.argv[:1])
+    cwd = os.getcwd()
+    results = {}
+    root = tempfile.mkdtemp(prefix="launcher-suite-")
+    try:
+        if "startup" in only:
+            results.update(bench_startup(args, root))
+        if "table" in only:
+            results.update(bench_character_table(args, root, app))
+        if "options" in only:
+            results.update(bench_options(args, root))
+        if "settings" in only:
+            results.update(bench_settings(args, root))
+        if "update" in only:
+            results.update(bench_update(args, root, app))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(root, ignore_errors=True)
+
+    with open(args.thresholds, "r") as f:
+        thresholds = json.load(f)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)["results"]
+    failures = check(results, thresholds, baseline, args.tolerance, args.min_value)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "revision": git_revision(),
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "update_mb": args.update_mb,
+                "results": results,
+                "failures": failures,
+            }, f, indent=2)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    # Worker threads of the launchers may still be finishing, skip the Qt teardown
+    sys.stdout.flush()
+    os._exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
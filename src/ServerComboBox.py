@@ -1,49 +1,104 @@
 import json
-import os
 
+from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import (
     QComboBox
 )
 
+from persistence import read_json, writer
+from server_prober import ServerProbeWorker, cached_result
+
+# The item text carries the latency, the plain server name is kept in this role
+NAME_ROLE = Qt.UserRole + 1
+LATENCY_ROLE = Qt.UserRole + 2
+
+# Probe threads must outlive the combo box that started them
+_running_probes = set()
+
 
 class ServerComboBox(QComboBox):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.servers_file = "settings/servers.json"
         self.load_servers()
+        self.probe_servers()
 
     def load_servers(self):
-        if not os.path.isfile(self.servers_file):
+        try:
+            # Load servers from the file, or from its backup if it is damaged
+            data = read_json(self.servers_file)
+        except FileNotFoundError:
             # Create a new servers file with default values
             default_servers = [
                 {"name": "Localhost (127.0.0.1)", "address": "127.0.0.1"},
                 {"name": "Ugaris Server", "address": "login.ugaris.com"}
             ]
-            with open(self.servers_file, 'w') as f:
-                json.dump({'servers': default_servers}, f)
+            writer.write(self.servers_file, json.dumps({'servers': default_servers}))
+        except ValueError:
+            print("Error decoding servers, check file format.")
         else:
-            # Load servers from the file
-            with open(self.servers_file, 'r') as f:
-                data = json.load(f)
-                servers = data.get('servers', [])
-                for server in servers:
-                    self.addItem(server['name'], server['address'])
+            servers = data.get('servers', [])
+            for server in servers:
+                self.add_item(server['name'], server['address'])
 
     def save_servers(self):
         servers = []
         for i in range(self.count()):
-            name = self.itemText(i)
+            name = self.itemData(i, NAME_ROLE)
             address = self.itemData(i)
             servers.append({'name': name, 'address': address})
 
-        with open(self.servers_file, 'w') as f:
-            json.dump({'servers': servers}, f)
+        writer.write(self.servers_file, json.dumps({'servers': servers}))
 
-    def add_server(self, name, address):
+    def add_item(self, name, address):
         self.addItem(name, address)
+        self.setItemData(self.count() - 1, name, NAME_ROLE)
+        result = cached_result(address)
+        if result is not None:
+            self.on_probe_result(address, result)
+
+    def add_server(self, name, address):
+        self.add_item(name, address)
         self.setCurrentIndex(self.count() - 1)
         self.save_servers()
+        self.probe_servers([address])
 
     def delete_server(self, index):
         self.removeItem(index)
         self.save_servers()
+
+    def probe_servers(self, addresses=None):
+        # Runs in the background; results within the cache TTL are not probed again
+        if addresses is None:
+            addresses = [self.itemData(i) for i in range(self.count())]
+        addresses = [address for address in addresses if cached_result(address) is None]
+        if not addresses:
+            return
+        worker = ServerProbeWorker(addresses)
+        worker.result_ready.connect(self.on_probe_result)
+        worker.finished.connect(lambda: _running_probes.discard(worker))
+        _running_probes.add(worker)
+        worker.start()
+
+    def on_probe_result(self, address, result):
+        if result["reachable"]:
+            status = f"{result['rtt_ms']:.0f} ms ± {result['jitter_ms']:.0f}"
+            latency = result["rtt_ms"]
+        else:
+            status = "unreachable"
+            latency = None
+        for i in range(self.count()):
+            if self.itemData(i) == address:
+                self.setItemText(i, f"{self.itemData(i, NAME_ROLE)}  ({status})")
+                self.setItemData(i, latency, LATENCY_ROLE)
+
+    def select_fastest(self):
+        # Preselects the reachable server with the lowest measured RTT
+        fastest = None
+        for i in range(self.count()):
+            latency = self.itemData(i, LATENCY_ROLE)
+            if latency is not None and (fastest is None or latency < self.itemData(fastest, LATENCY_ROLE)):
+                fastest = i
+        if fastest is not None:
+            self.setCurrentIndex(fastest)
+        return fastest
@@ -0,0 +1,139 @@
+from PyQt5.QtCore import (
+    QAbstractTableModel,
+    QEvent,
+    QModelIndex,
+    QSize,
+    QSortFilterProxyModel,
+    Qt,
+    pyqtSignal,
+)
+from PyQt5.QtGui import QIcon
+from PyQt5.QtWidgets import QStyle, QStyledItemDelegate
+
+SERVER_COLUMN, NAME_COLUMN, PASSWORD_COLUMN, DELETE_COLUMN = range(4)
+
+
+class CharacterTableModel(QAbstractTableModel):
+    headers = ["Server", "Name", "Password", "Delete"]
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.keys = []
+        self.rows = {}
+        self.reload()
+
+        store.character_added.connect(self.on_character_added)
+        store.character_updated.connect(self.on_character_updated)
+        store.character_removed.connect(self.on_character_removed)
+
+    def reload(self):
+        self.beginResetModel()
+        self.keys = list(self.store.characters)
+        self.rows = {key: row for row, key in enumerate(self.keys)}
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.keys)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ToolTipRole and index.column() == DELETE_COLUMN:
+            return "Delete character"
+        if role not in (Qt.DisplayRole, Qt.UserRole) or index.column() == DELETE_COLUMN:
+            return None
+        character = self.store.get(*self.keys[index.row()])
+        if role == Qt.UserRole:
+            return character
+        return character[("server", "username", "password")[index.column()]]
+
+    def character(self, row):
+        return self.store.get(*self.keys[row])
+
+    def row_of(self, server, username):
+        return self.rows.get((server, username), -1)
+
+    def on_character_added(self, character):
+        row = len(self.keys)
+        self.beginInsertRows(QModelIndex(), row, row)
+        key = (character["server"], character["username"])
+        self.keys.append(key)
+        self.rows[key] = row
+        self.endInsertRows()
+
+    def on_character_updated(self, character):
+        row = self.row_of(character["server"], character["username"])
+        if row >= 0:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, DELETE_COLUMN))
+
+    def on_character_removed(self, server, username):
+        row = self.row_of(server, username)
+        if row < 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.keys[row]
+        del self.rows[(server, username)]
+        # Rows after the removed one shift up by one
+        for key in self.keys[row:]:
+            self.rows[key] -= 1
+        self.endRemoveRows()
+
+
+class CharacterFilterProxyModel(QSortFilterProxyModel):
+    # Filters on server and name only, never on the hidden password column
+    def filterAcceptsRow(self, source_row, source_parent):
+        pattern = self.filterRegExp()
+        if pattern.isEmpty():
+            return True
+        model = self.sourceModel()
+        for column in (SERVER_COLUMN, NAME_COLUMN):
+            if pattern.indexIn(model.data(model.index(source_row, column, source_parent))) >= 0:
+                return True
+        return False
+
+    def lessThan(self, left, right):
+        # Compare the Python strings directly instead of going through data() and QVariant
+        model = self.sourceModel()
+        column = left.column()
+        if column not in (SERVER_COLUMN, NAME_COLUMN):
+            return False
+        return model.keys[left.row()][column].lower() < model.keys[right.row()][column].lower()
+
+
+class DeleteButtonDelegate(QStyledItemDelegate):
+    delete_requested = pyqtSignal(QModelIndex)
+
+    def __init__(self, icon_file, parent=None):
+        super().__init__(parent)
+        # Loaded once and shared by every row
+        self.icon = QIcon(icon_file)
+
+    def paint(self, painter, option, index):
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+        size = min(option.rect.width(), option.rect.height(), 16)
+        rect = option.rect.adjusted(
+            (option.rect.width() - size) // 2,
+            (option.rect.height() - size) // 2,
+            -((option.rect.width() - size) // 2),
+            -((option.rect.height() - size) // 2),
+        )
+        self.icon.paint(painter, rect)
+
+    def sizeHint(self, option, index):
+        return QSize(24, 20)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            self.delete_requested.emit(index)
+            return True
+        return super().editorEvent(event, model, option, index)
@@ -0,0 +1,55 @@
+import json
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from launcher_core import load_characters
+from persistence import writer
+
+
+class CharacterStore(QObject):
+    # Emitted with the character dict, or with (server, username) on removal
+    character_added = pyqtSignal(dict)
+    character_updated = pyqtSignal(dict)
+    character_removed = pyqtSignal(str, str)
+
+    def __init__(self, characters_file, parent=None):
+        super().__init__(parent)
+        self.characters_file = characters_file
+        # (server, username) -> {"server", "username", "password"}, in file order
+        self.characters = {}
+        self.load()
+
+    def load(self):
+        self.characters = load_characters(self.characters_file)
+
+    def save(self):
+        # Debounced, atomic and with a backup of the previous file, see persistence.WriteBehind
+        writer.write(self.characters_file, json.dumps(list(self.characters.values())))
+
+    def __len__(self):
+        return len(self.characters)
+
+    def __iter__(self):
+        return iter(list(self.characters.values()))
+
+    def get(self, server, username):
+        return self.characters.get((server, username))
+
+    def add(self, server, username, password):
+        key = (server, username)
+        character = {"server": server, "username": username, "password": password}
+        existing = key in self.characters
+        self.characters[key] = character
+        self.save()
+        if existing:
+            self.character_updated.emit(character)
+        else:
+            self.character_added.emit(character)
+        return character
+
+    def remove(self, server, username):
+        if self.characters.pop((server, username), None) is None:
+            return False
+        self.save()
+        self.character_removed.emit(server, username)
+        return True
@@ -0,0 +1,282 @@
+"""Headless launcher: update, verify and launch without starting the GUI.
+
+    python cli.py update [--check-only | --stage]
+    python cli.py verify [--repair]
+    python cli.py launch --character NAME [--server ADDRESS] [--update] [--dry-run]
+    python cli.py serve [--host ADDRESS] [--port PORT] [--refresh SECONDS] [--keep N]
+    python cli.py versions [--use TAG | --rollback | --gc]
+
+Packaged releases ship this as astonia_launcher_cli next to astonia_launcher.
+Run from the launcher directory, next to settings/. Every command prints one
+JSON object on stdout and exits with 0 on success, 1 on failure; progress and
+diagnostics go to stderr. serve is the exception: it prints one object once it
+listens and another when it is stopped with Ctrl+C. PyQt5 is never imported, and requests only when the
+release cache is stale or a download runs.
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import zipfile
+
+import launcher_core
+from launcher_core import LauncherError
+from persistence import writer
+from release_cache import ReleaseCache
+from settings_model import Settings
+
+
+def report_progress(done, total):
+    if total:
+        print(f"\r{100 * done // total:3d}% {done // 1024} KiB", end="", file=sys.stderr, flush=True)
+
+
+def check_release(settings, timeout):
+    release_cache = ReleaseCache(launcher_core.RELEASE_CACHE_FILE, ttl=settings.release_cache_ttl)
+    return launcher_core.fetch_release(release_cache, timeout=timeout)
+
+
+def install(settings, release, stage=False):
+    # With stage the release is installed next to the active version without switching to it,
+    # as the GUI's background prefetch does
+    from downloader import DownloadCancelled
+    from streaming_install import UnsupportedArchive
+
+    asset_url, release_file = launcher_core.release_asset(release)
+    if stage:
+        downloader = launcher_core.make_background_downloader(settings)
+    else:
+        downloader = launcher_core.make_downloader(settings)
+    try:
+        if stage:
+            launcher_core.stage_release(downloader, release, settings, progress_callback=report_progress)
+        else:
+            launcher_core.install_release(
+                downloader,
+                asset_url,
+                release_file,
+                release["tag_name"],
+                streaming=settings.enable_streaming_install,
+                progress_callback=report_progress,
+                mirrors=launcher_core.mirror_list(settings),
+                digest=launcher_core.release_digest(release),
+            )
+    except KeyboardInterrupt:
+        # Partial downloads and their journals stay in place for the next run
+        downloader.cancel()
+        raise LauncherError("Interrupted, the download resumes on the next run")
+    except DownloadCancelled:
+        raise LauncherError("Download cancelled")
+    except UnsupportedArchive as e:
+        raise LauncherError(f"Cannot stage this release: {e}") from e
+    except zipfile.BadZipFile as e:
+        raise LauncherError(f"Release archive is damaged: {e}") from e
+    except OSError as e:
+        raise LauncherError(str(e)) from e
+    finally:
+        print(file=sys.stderr)
+    if not stage:
+        launcher_core.collect_versions(settings)
+
+
+def update(args, settings):
+    installed = launcher_core.read_installed_version()
+    release = check_release(settings, args.timeout)
+    latest = release["tag_name"]
+    if installed == latest:
+        return {"status": "up_to_date", "version": installed}
+    if args.check_only:
+        return {"status": "update_available", "version": installed, "latest": latest}
+
+    if launcher_core.staged_version(latest) is not None:
+        if args.stage:
+            return {"status": "staged", "version": installed, "latest": latest}
+        try:
+            launcher_core.activate_version(latest)
+            launcher_core.collect_versions(settings)
+        except OSError as e:
+            raise LauncherError(f"Applying the staged update failed: {e}") from e
+        return {"status": "updated", "version": latest, "previous": installed, "staged": True}
+    install(settings, release, stage=args.stage)
+    if args.stage:
+        return {"status": "staged", "version": installed, "latest": latest}
+    return {"status": "updated", "version": latest, "previous": installed}
+
+
+def verify(args, settings):
+    result = launcher_core.verify_files()
+    if result is None:
+        raise LauncherError("No install manifest found, update the client first")
+    file_count, broken = result
+    if not broken:
+        return {"status": "ok", "files": file_count, "broken": []}
+    if not args.repair:
+        return {"status": "damaged", "files": file_count, "broken": broken}
+    # Against the installed version's release: repairing never switches to a newer one, that is update's job
+    installed = launcher_core.read_installed_version()
+    if installed is None:
+        raise LauncherError("Installed version unknown, run update to reinstall the client")
+    release_cache = ReleaseCache(launcher_core.RELEASE_CACHE_FILE, ttl=settings.release_cache_ttl)
+    # With a manifest the streaming installer only re-fetches the damaged entries
+    install(settings, launcher_core.release_for_version(release_cache, installed, args.timeout))
+    return {"status": "repaired", "files": file_count, "broken": broken}
+
+
+def launch(args, settings):
+    result = {}
+    if args.update:
+        result["update"] = update(args, settings)
+    elif launcher_core.read_installed_version() is None:
+        raise LauncherError("Client is not installed, run update first")
+
+    character = launcher_core.find_character(launcher_core.load_characters(), args.character, args.server)
+    command = launcher_core.build_launch_command(
+        settings, character["server"], character["username"], character["password"]
+    )
+    # The password is never echoed
+    shown = launcher_core.masked_command(command)
+    result.update({"status": "launching", "character": character["username"], "server": character["server"],
+                   "command": shown})
+    if args.dry_run:
+        result["status"] = "dry_run"
+        return result
+
+    if settings.enable_launch_warmup:
+        result["warmup"] = launcher_core.warm_up_client(settings)
+    # The client resolves its files relative to the working directory
+    os.chdir(launcher_core.install_dir())
+    # Checked up front, so a missing wine or client is reported as the only result
+    if shutil.which(command[0]) is None:
+        raise LauncherError(f"Error launching application: {command[0]} not found")
+    emit(result)
+    # exec skips atexit
+    writer.flush()
+    try:
+        os.execvpe(command[0], command, launcher_core.launch_environment(settings))
+    except OSError as e:
+        raise LauncherError(f"Error launching application: {e}") from e
+
+
+def versions(args, settings):
+    # Switching only swaps the active version pointer, the installed files are not touched
+    from versions import VersionStore
+
+    store = VersionStore()
+    previous = launcher_core.read_installed_version()
+    if args.use is not None:
+        if not store.has(args.use):
+            raise LauncherError(f"Version {args.use} is not installed")
+        launcher_core.activate_version(args.use)
+    elif args.rollback:
+        launcher_core.rollback_version()
+    removed = launcher_core.collect_versions(settings) if args.gc else []
+    result = {
+        "status": "ok",
+        "version": launcher_core.read_installed_version(),
+        "previous": launcher_core.previous_version(),
+        "installed": store.versions(),
+        "disk_bytes": store.disk_usage(),
+    }
+    if args.use is not None or args.rollback:
+        result["switched_from"] = previous
+    if args.gc:
+        result["removed"] = removed
+    return result
+
+
+def serve(args, settings):
+    # Shares the latest release archive with the other launchers of the site, which list this
+    # machine in their update mirrors; the archive crosses the WAN once per release
+    from mirror import AssetStore, MirrorServer
+
+    store = AssetStore(launcher_core.ASSET_STORE_DIR)
+    try:
+        server = MirrorServer((args.host, args.port), store)
+    except OSError as e:
+        raise LauncherError(f"Cannot listen on {args.host}:{args.port}: {e}") from e
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    emit({"status": "serving", "command_name": "serve", "url": f"http://{host}:{port}", "assets": store.digests()})
+
+    try:
+        while True:
+            try:
+                release = check_release(settings, args.timeout)
+                digest = launcher_core.store_release(
+                    launcher_core.make_downloader(settings), release, store, launcher_core.mirror_list(settings)
+                )
+                store.prune(args.keep)
+                print(f"Serving {release['tag_name']} as sha256/{digest}")
+            except (LauncherError, OSError) as e:
+                print(f"Release refresh failed: {e}")
+            time.sleep(args.refresh)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+    return {"status": "stopped", "assets": store.digests()}
+
+
+def emit(result):
+    print(json.dumps(result), file=sys.__stdout__, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="astonia-launcher", description="Headless Astonia launcher")
+    parser.add_argument("--timeout", type=int, default=10, help="release lookup timeout in seconds")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    update_parser = commands.add_parser("update", help="install the latest client release")
+    update_mode = update_parser.add_mutually_exclusive_group()
+    update_mode.add_argument("--check-only", action="store_true", help="only report whether an update exists")
+    update_mode.add_argument("--stage", action="store_true",
+                             help="download the update for the next start without installing it")
+    update_parser.set_defaults(handler=update)
+
+    verify_parser = commands.add_parser("verify", help="check the installed files against the manifest")
+    verify_parser.add_argument("--repair", action="store_true", help="re-fetch damaged or missing files")
+    verify_parser.set_defaults(handler=verify)
+
+    launch_parser = commands.add_parser("launch", help="start the client for a saved character")
+    launch_parser.add_argument("--character", required=True)
+    launch_parser.add_argument("--server", help="needed when the character exists on several servers")
+    launch_parser.add_argument("--update", action="store_true", help="update before launching")
+    launch_parser.add_argument("--dry-run", action="store_true", help="print the command instead of running it")
+    launch_parser.set_defaults(handler=launch, check_only=False, stage=False)
+
+    versions_parser = commands.add_parser("versions", help="list, switch or clean up installed versions")
+    versions_mode = versions_parser.add_mutually_exclusive_group()
+    versions_mode.add_argument("--use", metavar="TAG", help="switch to an installed version")
+    versions_mode.add_argument("--rollback", action="store_true", help="switch back to the previous version")
+    versions_mode.add_argument("--gc", action="store_true",
+                               help="remove old versions beyond the configured count and disk budget")
+    versions_parser.set_defaults(handler=versions)
+
+    serve_parser = commands.add_parser("serve", help="share verified release archives with launchers on the LAN")
+    serve_parser.add_argument("--host", default="0.0.0.0")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--refresh", type=int, default=600, help="seconds between release checks")
+    serve_parser.add_argument("--keep", type=int, default=2, help="releases to keep serving")
+    serve_parser.set_defaults(handler=serve)
+
+    args = parser.parse_args(argv)
+    started = time.perf_counter()
+    # Modules report problems with print(); keep stdout for the JSON result
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            result = args.handler(args, Settings.load(launcher_core.SETTINGS_FILE))
+        except LauncherError as e:
+            result = {"status": "error", "error": str(e)}
+    result["command_name"] = args.command
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    emit(result)
+    return 1 if result["status"] in ("error", "damaged") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from persistence import read_json, write_atomic
+
+READ_SIZE = 1024 * 1024
+# Readahead hint where the platform has one; the reads that follow wait for it
+WILLNEED = getattr(os, "POSIX_FADV_WILLNEED", None)
+# Warm-up reads must not look like the client's reads to the next access time scan
+NOATIME = getattr(os, "O_NOATIME", 0)
+# Windows opens in text mode without it
+BINARY = getattr(os, "O_BINARY", 0)
+
+
+class AccessProfile:
+    # Client files in the order earlier sessions first read them, as names relative to the install directory.
+    # Filled from the open files of supervised clients and from access times newer than the last launch.
+    def __init__(self, profile_file):
+        self.profile_file = profile_file
+        # name -> {"offset": seconds after the launch, smoothed over sessions, "sessions": count}
+        self.files = {}
+        self.last_launch = None
+        try:
+            data = read_json(profile_file)
+            self.files = data.get("files", {})
+            self.last_launch = data.get("last_launch")
+        except FileNotFoundError:
+            pass
+        except (ValueError, AttributeError):
+            print(f"Ignoring damaged access profile {profile_file}")
+
+    def record(self, name, offset):
+        entry = self.files.get(name)
+        if entry is None:
+            self.files[name] = {"offset": offset, "sessions": 1}
+        else:
+            entry["offset"] = (entry["offset"] + offset) / 2
+            entry["sessions"] += 1
+
+    def record_session(self, directory, opened):
+        # opened: absolute path -> seconds after the start when the client had it open first
+        root = os.path.abspath(directory)
+        for path, offset in opened.items():
+            name = os.path.relpath(path, root).replace(os.sep, "/")
+            if not name.startswith("../"):
+                self.record(name, offset)
+
+    def record_access_times(self, directory, names):
+        # Files the client read since the last launch; relatime and Windows' defaults make this a best effort
+        if self.last_launch is None:
+            return
+        for name in names:
+            try:
+                accessed = os.stat(os.path.join(directory, name)).st_atime
+            except OSError:
+                continue
+            if accessed > self.last_launch:
+                self.record(name, accessed - self.last_launch)
+
+    def ordered(self, names):
+        # Profiled files by when they were first read, more often used ones first on ties, then the rest
+        profiled = sorted(
+            (name for name in names if name in self.files),
+            key=lambda name: (self.files[name]["offset"], -self.files[name]["sessions"]),
+        )
+        return profiled + [name for name in names if name not in self.files]
+
+    def save(self):
+        write_atomic(self.profile_file, json.dumps({"last_launch": self.last_launch, "files": self.files}),
+                     backup=False)
+
+
+def warm_file(path, deadline, buffer):
+    # Returns (bytes read, whether the whole file was read) once the file ends or the deadline passes
+    try:
+        fd = os.open(path, os.O_RDONLY | BINARY | NOATIME)
+    except PermissionError:
+        # O_NOATIME needs the file's owner
+        fd = os.open(path, os.O_RDONLY | BINARY)
+    with open(fd, "rb", buffering=0) as f:
+        if WILLNEED is not None:
+            # The whole file is queued at once, in large requests the disk can reorder
+            os.posix_fadvise(fd, 0, 0, WILLNEED)
+        done = 0
+        while time.monotonic() < deadline:
+            count = f.readinto(buffer)
+            if not count:
+                return done, True
+            done += count
+    return done, False
+
+
+def warm_files(paths, budget=5.0, workers=8):
+    # Reads paths into the page cache, in order and several at a time, until the budget in seconds is spent.
+    # Returns {"files", "total_files", "bytes", "seconds", "complete"}.
+    started = time.monotonic()
+    deadline = started + budget
+    pending = iter(paths)
+    lock = threading.Lock()
+    totals = {"files": 0, "bytes": 0}
+
+    def worker():
+        buffer = bytearray(READ_SIZE)
+        while time.monotonic() < deadline:
+            with lock:
+                path = next(pending, None)
+            if path is None:
+                return
+            try:
+                done, complete = warm_file(path, deadline, buffer)
+            except OSError as e:
+                print(f"Not warming {path}: {e}")
+                continue
+            with lock:
+                totals["bytes"] += done
+                totals["files"] += complete
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in [executor.submit(worker) for _ in range(workers)]:
+            future.result()
+    return {
+        "files": totals["files"],
+        "total_files": len(paths),
+        "bytes": totals["bytes"],
+        "seconds": round(time.monotonic() - started, 3),
+        "complete": totals["files"] == len(paths),
+    }
+
+
+def format_report(report):
+    rate = report["bytes"] / report["seconds"] / (1024 * 1024) if report["seconds"] else 0.0
+    text = (f"Warmed {report['files']} of {report['total_files']} client files, "
+            f"{report['bytes'] / (1024 * 1024):.0f} MiB in {report['seconds']:.1f} s ({rate:.0f} MiB/s)")
+    return text if report["complete"] else text + ", time budget reached"
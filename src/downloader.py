@@ -0,0 +1,342 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
+
+import requests
+
+from network import DownloadCancelled, check_cancelled, shared_client
+
+
+class DownloadJournal:
+    # Records how many bytes of each range are on disk, next to the partial file
+    def __init__(self, path):
+        self.journal_file = path + ".journal.json"
+        self.validator = None
+        self.size = None
+        self.ranges = []
+        self._lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.journal_file, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+        self.validator = data.get("validator")
+        self.size = data.get("size")
+        self.ranges = [list(r) for r in data.get("ranges", [])]
+        return True
+
+    def save(self):
+        data = {"validator": self.validator, "size": self.size, "ranges": self.ranges}
+        with self._lock:
+            tmp_file = self.journal_file + ".tmp"
+            with open(tmp_file, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_file, self.journal_file)
+
+    def remove(self):
+        if os.path.isfile(self.journal_file):
+            os.remove(self.journal_file)
+
+    def completed(self):
+        return sum(done for _, _, done in self.ranges)
+
+
+class ChecksumMismatch(Exception):
+    # The downloaded file is not the expected one; it has already been deleted
+    pass
+
+
+class DigestRecord:
+    # SHA-256 of a finished download, next to the file; trusted while the file's size and mtime are unchanged
+    def __init__(self, path):
+        self.path = path
+        self.record_file = path + ".sha256.json"
+
+    def load(self):
+        try:
+            with open(self.record_file, "r") as f:
+                data = json.load(f)
+            stat = os.stat(self.path)
+        except (OSError, ValueError):
+            return None
+        if data.get("size") != stat.st_size or data.get("mtime_ns") != stat.st_mtime_ns:
+            return None
+        return data.get("sha256")
+
+    def save(self, digest):
+        stat = os.stat(self.path)
+        data = {"sha256": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        tmp_file = self.record_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_file, self.record_file)
+
+    def remove(self):
+        if os.path.isfile(self.record_file):
+            os.remove(self.record_file)
+
+
+class InlineDigest:
+    # SHA-256 of a file that several threads write range by range, computed as the bytes arrive instead of
+    # reading the finished file again. Bytes are hashed once everything before them is; bytes that arrive
+    # early wait in memory up to buffer_limit, beyond that they are read back from the file (page cache).
+    def __init__(self, path, buffer_limit=32 * 1024 * 1024, cancelled=None):
+        self.path = path
+        self.buffer_limit = buffer_limit
+        # Reading back what an interrupted download wrote can take a while; it stops between blocks
+        self.cancelled = cancelled
+        self.position = 0
+        self._sha256 = hashlib.sha256()
+        # offset -> bytes waiting in memory, or the length of bytes waiting on disk
+        self._pending = {}
+        self._disk_ends = {}
+        self._buffered = 0
+        self._lock = threading.Lock()
+
+    def update(self, offset, data):
+        with self._lock:
+            if offset == self.position:
+                self._sha256.update(data)
+                self.position += len(data)
+                self._drain()
+            elif self._buffered + len(data) <= self.buffer_limit:
+                self._pending[offset] = bytes(data)
+                self._buffered += len(data)
+            else:
+                self._add_on_disk(offset, len(data))
+
+    def on_disk(self, offset, length):
+        # Bytes an interrupted download already wrote
+        if length:
+            with self._lock:
+                self._add_on_disk(offset, length)
+                self._drain()
+
+    def hexdigest(self):
+        # Only meaningful once every byte up to position arrived
+        return self._sha256.hexdigest()
+
+    def _add_on_disk(self, offset, length):
+        # Adjacent segments are merged, so they are read back in large blocks
+        start = self._disk_ends.pop(offset, offset)
+        if start != offset:
+            length += offset - start
+        self._pending[start] = length
+        self._disk_ends[start + length] = start
+
+    def _drain(self):
+        while self.position in self._pending:
+            entry = self._pending.pop(self.position)
+            if isinstance(entry, int):
+                del self._disk_ends[self.position + entry]
+                self._read_back(self.position, entry)
+                self.position += entry
+            else:
+                self._sha256.update(entry)
+                self._buffered -= len(entry)
+                self.position += len(entry)
+
+    def _read_back(self, offset, length):
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            while length:
+                check_cancelled(self.cancelled)
+                data = f.read(min(length, 1024 * 1024))
+                if not data:
+                    raise OSError(f"{self.path} is shorter than its download journal")
+                self._sha256.update(data)
+                length -= len(data)
+
+
+class RangedDownloader:
+    def __init__(self, concurrency=4, chunk_size=4 * 1024 * 1024, client=None):
+        self.concurrency = max(1, concurrency)
+        # Size of each byte range fetched by one request
+        self.chunk_size = max(64 * 1024, chunk_size)
+        self.read_size = 64 * 1024
+        # Seconds between journal writes while ranges are in flight
+        self.journal_interval = 1.0
+
+        # Pooled connections, timeouts, retries and the bandwidth cap come from the shared network client
+        self.client = client if client is not None else shared_client()
+
+        self._lock = threading.Lock()
+        self._downloaded = 0
+        # The user's cancel; never cleared, a downloader is built for one update
+        self.cancelled = threading.Event()
+        # Stops the threads of the current transfer, set when it ends for any reason
+        self.stopping = threading.Event()
+
+    def cancel(self):
+        # Stops in-flight ranges, and every later transfer raises DownloadCancelled before it starts
+        self.cancelled.set()
+        self.stopping.set()
+
+    def start_transfer(self):
+        # Called before each transfer; a cancel that came while no transfer ran is not lost
+        self.stopping = threading.Event()
+        if self.cancelled.is_set():
+            raise DownloadCancelled()
+
+    def download(self, url, path, progress_callback=None, sha256=None):
+        # Returns the file's SHA-256, computed while the bytes arrive. With sha256 a file with a different
+        # digest or size is deleted and ChecksumMismatch raised, so it never reaches extraction; a file
+        # that an earlier run already verified is not downloaded again.
+        # progress_callback(downloaded, total) is always called from the calling thread
+        if sha256 is not None and DigestRecord(path).load() == sha256:
+            return sha256
+        DigestRecord(path).remove()
+        self._downloaded = 0
+        self.start_transfer()
+        final_url, total, validator = self.probe(url)
+
+        # Without range support or a validator a partial file cannot be trusted
+        if validator is None or total is None:
+            DownloadJournal(path).remove()
+            # Nothing to resume from, an interrupted transfer starts over
+            digest = self.client.call_with_retries(
+                lambda: self.download_single(final_url, path, total, progress_callback), self.stopping
+            )
+            return self.check(path, digest, total if total is not None else digest.position, sha256)
+
+        journal = self.open_journal(path, total, validator)
+        digest = InlineDigest(path, cancelled=self.stopping)
+        for start, _, done in journal.ranges:
+            digest.on_disk(start, done)
+        self._downloaded = journal.completed()
+        if progress_callback:
+            progress_callback(self._downloaded, total)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [
+                executor.submit(self.download_range, final_url, path, byte_range, validator, digest)
+                for byte_range in journal.ranges
+                if byte_range[2] < byte_range[1] - byte_range[0] + 1
+            ]
+            pending = set(futures)
+            last_save = time.monotonic()
+            try:
+                while pending:
+                    done, pending = wait(pending, timeout=0.1, return_when=FIRST_EXCEPTION)
+                    if progress_callback:
+                        progress_callback(self._downloaded, total)
+                    if time.monotonic() - last_save >= self.journal_interval:
+                        journal.save()
+                        last_save = time.monotonic()
+                    for future in done:
+                        if future.exception() is not None:
+                            raise future.exception()
+            finally:
+                # Also reached on errors and interrupts, so the next launch can resume
+                self.stopping.set()
+                for future in pending:
+                    future.cancel()
+                executor.shutdown(wait=True)
+                journal.save()
+
+        journal.remove()
+        return self.check(path, digest, total, sha256)
+
+    def check(self, path, digest, size, sha256=None):
+        # Size first: a short body is reported as truncated rather than as a different file
+        if digest.position != size:
+            problem = f"got {digest.position} of {size} bytes"
+        elif sha256 is not None and digest.hexdigest() != sha256:
+            problem = f"SHA-256 {digest.hexdigest()}, expected {sha256}"
+        else:
+            DigestRecord(path).save(digest.hexdigest())
+            return digest.hexdigest()
+        os.remove(path)
+        DownloadJournal(path).remove()
+        raise ChecksumMismatch(problem)
+
+    def open_journal(self, path, total, validator):
+        journal = DownloadJournal(path)
+        if journal.load() and os.path.isfile(path):
+            if journal.validator == validator and journal.size == total and os.path.getsize(path) == total:
+                return journal
+            print("Release asset changed since the interrupted download, starting over")
+
+        # Preallocate the file so every range can be written in place
+        with open(path, "wb") as f:
+            f.truncate(total)
+        journal.validator = validator
+        journal.size = total
+        journal.ranges = [
+            [start, min(start + self.chunk_size, total) - 1, 0]
+            for start in range(0, total, self.chunk_size)
+        ]
+        journal.save()
+        return journal
+
+    def probe(self, url):
+        # A one byte range request tells us the size and whether ranges are honoured.
+        # Returns (url, size, validator); validator is None when ranges are unsupported.
+        with self.client.get(url, self.stopping, headers={"Range": "bytes=0-0"}, stream=True) as r:
+            r.raise_for_status()
+            final_url = r.url
+            if r.status_code == 206:
+                content_range = r.headers.get("Content-Range", "")
+                size = content_range.rpartition("/")[2]
+                validator = r.headers.get("ETag") or r.headers.get("Last-Modified")
+                if size.isdigit():
+                    return final_url, int(size), validator
+            length = r.headers.get("Content-Length")
+            return final_url, int(length) if length is not None else None, None
+
+    def download_range(self, url, path, byte_range, validator, digest):
+        # A dropped connection continues from the bytes already written
+        self.client.call_with_retries(
+            lambda: self.fetch_range(url, path, byte_range, validator, digest), self.stopping
+        )
+
+    def fetch_range(self, url, path, byte_range, validator, digest):
+        # byte_range is the journal entry [start, end, done] and is updated in place
+        start, end, done = byte_range
+        headers = {"Range": f"bytes={start + done}-{end}"}
+        if validator and not validator.startswith("W/"):
+            # The server answers 200 instead of 206 if the asset changed meanwhile
+            headers["If-Range"] = validator
+        with self.client.get(url, self.stopping, headers=headers, stream=True) as r:
+            r.raise_for_status()
+            if r.status_code != 206:
+                raise requests.exceptions.RequestException(
+                    f"Server ignored range request for bytes {start + done}-{end}"
+                )
+            # Each worker owns an unbuffered file handle, so whatever the journal counts is on disk
+            with open(path, "r+b", buffering=0) as f:
+                f.seek(start + done)
+                for chunk in self.client.iter_content(r, self.read_size, self.stopping):
+                    if self.stopping.is_set():
+                        raise DownloadCancelled()
+                    f.write(chunk)
+                    digest.update(start + byte_range[2], chunk)
+                    byte_range[2] += len(chunk)
+                    with self._lock:
+                        self._downloaded += len(chunk)
+        if byte_range[2] != end - start + 1:
+            raise requests.exceptions.RequestException(
+                f"Incomplete range bytes {start}-{end}: got {byte_range[2]} bytes"
+            )
+
+    def download_single(self, url, path, total, progress_callback=None):
+        # Returns the InlineDigest of what was written; every attempt starts from scratch
+        self._downloaded = 0
+        digest = InlineDigest(path)
+        with self.client.get(url, self.stopping, stream=True) as r:
+            r.raise_for_status()
+            with open(path, "wb") as f:
+                for chunk in self.client.iter_content(r, self.read_size, self.stopping):
+                    if self.stopping.is_set():
+                        raise DownloadCancelled()
+                    f.write(chunk)
+                    digest.update(self._downloaded, chunk)
+                    self._downloaded += len(chunk)
+                    if progress_callback:
+                        progress_callback(self._downloaded, total)
+        return digest
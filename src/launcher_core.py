@@ -0,0 +1,584 @@
+import os
+import re
+import sys
+
+from persistence import read_json, read_with_backup, write_atomic
+
+# Qt-free launcher logic shared by the GUI (main.py) and the headless CLI (cli.py).
+# Heavy modules (requests, zipfile, the downloader) are imported inside the functions that need them.
+
+REPO_OWNER = "DanielBrockhaus"
+REPO_NAME = "astonia_client"
+RELEASE_API_URL = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/releases/latest"
+# Release of one tag, formatted with the quoted tag name
+RELEASE_TAG_URL = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/releases/tags/{{}}"
+
+SETTINGS_FILE = os.path.join("settings", "settings.json")
+CHARACTERS_FILE = os.path.join("settings", "characters.json")
+VERSION_FILE = os.path.join("settings", "version.json")
+MANIFEST_FILE = os.path.join("settings", "manifest.json")
+RELEASE_CACHE_FILE = os.path.join("settings", "release_cache.json")
+LAUNCH_TIMES_FILE = os.path.join("settings", "launch_times.json")
+INPUTS_FILE = os.path.join("settings", "inputs.txt")
+# Verified release archives shared by "cli.py serve"
+ASSET_STORE_DIR = os.path.join("settings", "assets")
+# Active version before the last switch, the target of a rollback
+PREVIOUS_VERSION_FILE = os.path.join("settings", "previous_version.json")
+# Client files in the order earlier sessions read them, for the pre-launch warm-up
+ACCESS_PROFILE_FILE = os.path.join("settings", "access_profile.json")
+
+
+class LauncherError(Exception):
+    pass
+
+
+def parse_version(text):
+    version = text.strip()
+    if not version or "\n" in version:
+        raise ValueError("Malformed version file")
+    return version
+
+
+def read_installed_version(version_file=VERSION_FILE):
+    try:
+        return read_with_backup(version_file, parse_version)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def write_installed_version(version, version_file=VERSION_FILE):
+    # Not deferred: the version is what tells the next start an install completed
+    write_atomic(version_file, version)
+
+
+def load_characters(characters_file=CHARACTERS_FILE):
+    # (server, username) -> {"server", "username", "password"}, in file order
+    try:
+        characters = read_json(characters_file)
+    except FileNotFoundError:
+        characters = []
+    except ValueError:
+        print("Error decoding characters, check file format.")
+        characters = []
+
+    loaded = {}
+    for character in characters:
+        if (
+                isinstance(character, dict)
+                and "server" in character
+                and "username" in character
+                and "password" in character
+        ):
+            loaded[(character["server"], character["username"])] = character
+    return loaded
+
+
+def find_character(characters, username, server=None):
+    # Without a server the username has to be unique across all servers
+    if server is not None:
+        character = characters.get((server, username))
+        if character is None:
+            raise LauncherError(f"No saved character {username} on {server}")
+        return character
+    matches = [character for (_, name), character in characters.items() if name == username]
+    if not matches:
+        raise LauncherError(f"No saved character {username}")
+    if len(matches) > 1:
+        servers = ", ".join(character["server"] for character in matches)
+        raise LauncherError(f"Character {username} exists on several servers ({servers}), pass a server")
+    return matches[0]
+
+
+def fetch_release(release_cache, url=RELEASE_API_URL, timeout=10, cancelled=None):
+    # requests' exceptions derive from OSError, so the import can stay inside ReleaseCache.fetch.
+    # Raises DownloadCancelled once cancelled is set.
+    try:
+        release = release_cache.fetch(url, timeout=timeout, cancelled=cancelled)
+    except (OSError, ValueError) as e:
+        raise LauncherError(str(e)) from e
+    if not isinstance(release, dict) or "tag_name" not in release:
+        raise LauncherError("Unexpected response from the release API")
+    return release
+
+
+def release_for_version(release_cache, version, timeout=10, cancelled=None):
+    # The release a version was installed from, which a repair has to fetch files from: the cached
+    # latest release if that is the version, otherwise releases/tags/<version>
+    from urllib.parse import quote
+
+    if isinstance(release_cache.body, dict) and release_cache.body.get("tag_name") == version:
+        return release_cache.body
+    from network import check_cancelled, shared_client
+
+    check_cancelled(cancelled)
+    try:
+        response = shared_client().get(RELEASE_TAG_URL.format(quote(version, safe="")), cancelled,
+                                       timeout=timeout)
+        response.raise_for_status()
+        release = response.json()
+    except (OSError, ValueError) as e:
+        raise LauncherError(f"Release {version} not found: {e}") from e
+    if not isinstance(release, dict) or release.get("tag_name") != version:
+        raise LauncherError(f"Unexpected response from the release API for {version}")
+    return release
+
+
+def release_asset(release):
+    # (download url, file name) of the client archive
+    try:
+        asset = release["assets"][0]
+        return asset["browser_download_url"], asset["name"]
+    except (KeyError, IndexError, TypeError):
+        raise LauncherError("Release has no downloadable asset")
+
+
+def release_digest(release):
+    # SHA-256 of the client archive as GitHub lists it ("sha256:<hex>"), None for older releases
+    try:
+        algorithm, _, digest = (release["assets"][0].get("digest") or "").partition(":")
+    except (KeyError, IndexError, TypeError, AttributeError):
+        return None
+    digest = digest.lower()
+    if algorithm != "sha256" or not re.fullmatch(r"[0-9a-f]{64}", digest):
+        return None
+    return digest
+
+
+def mirror_list(settings):
+    # Base URLs from the update_mirrors setting
+    return [url.rstrip("/") for url in re.split(r"[\s,]+", settings.update_mirrors) if url]
+
+
+def make_downloader(settings):
+    from downloader import RangedDownloader
+    from network import shared_client
+
+    # The cap applies to the shared client, i.e. to every transfer of this process
+    shared_client().set_bandwidth_limit(settings.download_bandwidth_limit * 1024)
+    return RangedDownloader(
+        concurrency=settings.download_connections,
+        chunk_size=settings.download_chunk_size * 1024 * 1024,
+    )
+
+
+def make_background_downloader(settings):
+    from downloader import RangedDownloader
+    from network import HttpClient
+
+    # Own client and bandwidth cap, so a prefetch never competes with a foreground update's connections
+    client = HttpClient(bandwidth_limit=settings.background_bandwidth_limit * 1024)
+    return RangedDownloader(concurrency=1, chunk_size=settings.download_chunk_size * 1024 * 1024, client=client)
+
+
+def install_dir(version=None):
+    # Directory of an installed version, versions/<tag>; the launcher directory itself for a client
+    # installed in place by launchers from before versioned installs
+    from versions import VersionStore
+
+    if version is None:
+        version = read_installed_version()
+    store = VersionStore()
+    if version is not None and store.has(version):
+        return store.path(version)
+    return "."
+
+
+def installed_manifest(directory):
+    from manifest import InstallManifest
+    from versions import VersionStore
+
+    if directory == ".":
+        return InstallManifest(MANIFEST_FILE)
+    return VersionStore().manifest(directory)
+
+
+def install_release(downloader, asset_url, release_file, version, streaming=True, progress_callback=None,
+                    mirrors=(), digest=None, activate=True):
+    # Installs version into versions/<tag> next to the installed ones and, with activate, switches to it.
+    # Installing the active version again repairs it in place. Returns the install directory.
+    # Raises DownloadCancelled, LauncherError, OSError (including requests' errors) or zipfile.BadZipFile
+    from mirror import available_mirrors
+    from versions import VersionStore
+
+    mirror_urls = []
+    if mirrors and digest is None:
+        print("Release lists no SHA-256 digest, downloading from GitHub instead of the mirrors")
+    elif mirrors:
+        mirror_urls = available_mirrors(downloader.client, mirrors, digest, cancelled=downloader.cancelled)
+    urls = mirror_urls + [asset_url]
+    # A mirror on the LAN sends the whole archive faster than GitHub sends the changed entries,
+    # and only a whole archive can be checked against the digest
+    streaming = streaming and not mirror_urls
+
+    active = read_installed_version()
+    if version == active:
+        directory = install_dir(active)
+        repair_install(downloader, urls, release_file, directory, streaming, progress_callback, digest)
+        return directory
+
+    store = VersionStore()
+    if active is not None and not store.has(active) and installed_manifest(".").release:
+        adopt_in_place_install(store, active)
+    base_dir = store.path(active) if active is not None and store.has(active) else None
+
+    staging = store.staging_path(version)
+    os.makedirs(staging, exist_ok=True)
+    build_version(store, downloader, urls, release_file, staging, base_dir, streaming, progress_callback, digest)
+    directory = store.finish(staging, version)
+    if activate:
+        activate_version(version)
+    return directory
+
+
+def repair_install(downloader, urls, release_file, directory, streaming=True, progress_callback=None, digest=None):
+    from streaming_install import StreamingInstaller, UnsupportedArchive
+
+    manifest = installed_manifest(directory)
+    if streaming:
+        try:
+            # Only entries that differ from the installed files are fetched, and they are
+            # extracted into a staging directory while the archive downloads
+            installer = StreamingInstaller(downloader, manifest=manifest)
+            installer.install(urls[-1], directory, progress_callback)
+            refresh_store(directory, installer.manifest)
+            return
+        except UnsupportedArchive as e:
+            print(f"Streaming install not possible ({e}), downloading the archive instead")
+    download_and_extract(downloader, urls, release_file, directory, manifest, progress_callback, digest)
+    refresh_store(directory, manifest)
+
+
+def refresh_store(directory, manifest):
+    # A repaired file is a new inode; it replaces the object, which may be the damaged file it was
+    # linked from, so versions built from the store later get the repaired content
+    from versions import VersionStore
+
+    if directory == ".":
+        return
+    store = VersionStore()
+    for name in manifest.release:
+        entry = manifest.files.get(name)
+        path = manifest.path(name)
+        if entry is not None and path is not None and os.path.isfile(path):
+            store.add_to_store(path, entry["blake2"])
+
+
+def build_version(store, downloader, urls, release_file, staging, base_dir=None, streaming=True,
+                  progress_callback=None, digest=None):
+    # Fills staging with a complete release: files unchanged since base_dir are hardlinked from there,
+    # only the others are downloaded
+    from streaming_install import StreamingInstaller, UnsupportedArchive
+
+    manifest = store.manifest(staging)
+    base_manifest = store.manifest(base_dir) if base_dir is not None else None
+
+    def reuse(entries):
+        if base_manifest is not None:
+            link_unchanged(store, base_manifest, manifest, entries, downloader.cancelled)
+
+    installed = False
+    if streaming:
+        try:
+            installer = StreamingInstaller(downloader, os.path.join(staging, ".incoming"), manifest)
+            installer.stage(urls[-1], progress_callback, reuse)
+            installer.commit(staging)
+            installed = True
+        except UnsupportedArchive as e:
+            print(f"Streaming install not possible ({e}), downloading the archive instead")
+    if not installed:
+        download_and_extract(downloader, urls, release_file, staging, manifest, progress_callback, digest, reuse)
+
+    # New and changed files become objects too, so the next release can link them
+    for name in manifest.release:
+        entry = manifest.files.get(name)
+        if entry is not None:
+            store.add_to_store(manifest.path(name), entry["blake2"])
+    if base_manifest is not None:
+        store.carry_over(base_dir, base_manifest.release, staging)
+
+
+def link_unchanged(store, base_manifest, manifest, entries, cancelled=None):
+    # Hardlinks every entry whose content the base version already has into the new version. The link is
+    # to the base file is_current just checked, not to the stored object, which nothing re-checks.
+    from network import check_cancelled
+    from versions import link_or_copy
+
+    for info in entries:
+        check_cancelled(cancelled)
+        path = manifest.path(info.filename)
+        if info.is_dir() or path is None or os.path.lexists(path):
+            continue
+        if not base_manifest.is_current(info.filename, info.file_size, info.CRC):
+            continue
+        entry = base_manifest.files[info.filename]
+        link_or_copy(base_manifest.path(info.filename), path)
+        manifest.record(info.filename, entry["crc"], entry["blake2"])
+
+
+def adopt_in_place_install(store, version):
+    # Moves a client installed in place into the version store by hardlinking its intact release files,
+    # so it can be switched back to; damaged files are left out and Verify / Repair fetches them
+    from versions import link_or_copy
+
+    legacy = installed_manifest(".")
+    staging = store.staging_path(version)
+    os.makedirs(staging, exist_ok=True)
+    manifest = store.manifest(staging)
+    manifest.release = legacy.release
+    intact = set(legacy.release) - set(legacy.find_changed(legacy.release_entries()))
+    for name in intact:
+        path = manifest.path(name)
+        entry = legacy.files.get(name)
+        if path is None or entry is None:
+            continue
+        # Linked from the file find_changed just checked; it replaces any stored object with its content
+        link_or_copy(legacy.path(name), path)
+        store.add_to_store(path, entry["blake2"])
+        manifest.record(name, entry["crc"], entry["blake2"])
+    manifest.save()
+    # Only the client's own directories; the launcher directory also holds the launcher and its settings
+    roots = {name.split("/")[0] for name in legacy.release if "/" in name} - {"settings", "versions", "icons"}
+    store.carry_over(".", legacy.release, staging, roots=sorted(roots))
+    store.finish(staging, version)
+
+
+def activate_version(version, version_file=VERSION_FILE):
+    # The pointer swap: one atomic rename of the version file, the installed files are not touched
+    active = read_installed_version(version_file)
+    if active is not None and active != version:
+        write_atomic(PREVIOUS_VERSION_FILE, active)
+    write_installed_version(version, version_file)
+
+
+def previous_version():
+    return read_installed_version(PREVIOUS_VERSION_FILE)
+
+
+def rollback_version():
+    # Switches back to the version that was active before the current one
+    from versions import VersionStore
+
+    previous = previous_version()
+    if previous is None or not VersionStore().has(previous):
+        raise LauncherError("No previous version to roll back to")
+    activate_version(previous)
+    return previous
+
+
+def collect_versions(settings):
+    # Removes old versions beyond the configured count and disk budget; returns the removed ones
+    from versions import VersionStore
+
+    return VersionStore().gc(
+        settings.keep_versions,
+        protected=(read_installed_version(), previous_version()),
+        budget_bytes=settings.versions_disk_budget * 1024 * 1024,
+    )
+
+
+def published_digest(client, asset_url, timeout=10):
+    # SHA-256 from a checksum file published next to the asset (<asset>.sha256, sha256sum format), or None
+    try:
+        # A checksum line is short; whatever else a server answers with is not read
+        with client.session.get(asset_url + ".sha256", timeout=timeout, stream=True) as response:
+            text = response.raw.read(4096).decode("ascii", "replace") if response.status_code == 200 else ""
+    except OSError as e:
+        print(f"No checksum file for {asset_url} ({type(e).__name__})")
+        return None
+    match = re.match(r"\s*([0-9a-fA-F]{64})\b", text)
+    return match.group(1).lower() if match else None
+
+
+def download_verified(downloader, urls, path, digest, progress_callback=None):
+    # Tries each source in turn and keeps the first file whose SHA-256 and size match; returns its url.
+    # The digest is computed during the download and recorded next to the file, see DigestRecord.
+    from downloader import ChecksumMismatch
+
+    for i, url in enumerate(urls):
+        try:
+            downloader.download(url, path, progress_callback, sha256=digest)
+        except ChecksumMismatch as e:
+            print(f"{url} sent a different file ({e}), discarding it")
+            continue
+        except OSError as e:
+            if i == len(urls) - 1:
+                raise
+            print(f"Download from {url} failed ({e}), trying the next source")
+            continue
+        return url
+    raise LauncherError(f"No download source had the release archive with sha256 {digest}, update refused")
+
+
+def download_and_extract(downloader, urls, release_file, directory, manifest, progress_callback=None, digest=None,
+                         reuse=None):
+    import zipfile
+
+    from downloader import DigestRecord
+    from manifest import hash_file
+    from network import check_cancelled
+
+    # Interrupted downloads are resumed from release_file and its journal. Nothing is extracted
+    # from an archive whose digest does not match.
+    if digest is None:
+        digest = published_digest(downloader.client, urls[-1])
+    if digest is not None:
+        download_verified(downloader, urls, release_file, digest, progress_callback)
+    else:
+        print("Release lists no SHA-256 digest, the archive is only checked by its CRCs")
+        downloader.download(urls[-1], release_file, progress_callback)
+
+    with zipfile.ZipFile(release_file, "r") as zip_ref:
+        entries = zip_ref.infolist()
+        manifest.set_release(entries)
+        if reuse is not None:
+            reuse(entries)
+        # Only entries that differ from the files already in place are written
+        changed = set(manifest.find_changed([(info.filename, info.file_size, info.CRC) for info in entries]))
+        for info in entries:
+            check_cancelled(downloader.cancelled)
+            path = manifest.path(info.filename)
+            if info.filename not in changed or path is None:
+                continue
+            if os.path.lexists(path) and not info.is_dir():
+                # Never write through a hardlink shared with another installed version
+                os.remove(path)
+            zip_ref.extract(info, directory)
+            if not info.is_dir():
+                # Record the installed files so the next update can be a delta update
+                manifest.record(info.filename, *hash_file(path))
+    manifest.save()
+
+    # Clean up
+    os.remove(release_file)
+    DigestRecord(release_file).remove()
+
+
+def store_release(downloader, release, store, mirrors=()):
+    # Puts the release archive into the asset store, from an upstream mirror when one has it; returns the digest
+    from mirror import available_mirrors
+
+    asset_url, _ = release_asset(release)
+    digest = release_digest(release)
+    if digest is None:
+        raise LauncherError("Release lists no SHA-256 digest, it cannot be mirrored")
+    if not store.has(digest):
+        from downloader import DigestRecord
+
+        partial = store.partial_path(digest)
+        download_verified(downloader, available_mirrors(downloader.client, mirrors, digest) + [asset_url],
+                          partial, digest)
+        # The store is addressed by the digest, the record is not needed there
+        DigestRecord(partial).remove()
+        store.add(partial, digest)
+    return digest
+
+
+def stage_release(downloader, release, settings, progress_callback=None):
+    # Installs release next to the active version without switching to it; activate_version applies it.
+    # Like a foreground update it tries the mirrors first and checks the release's digest.
+    # Raises DownloadCancelled, OSError, zipfile.BadZipFile or LauncherError.
+    asset_url, release_file = release_asset(release)
+    return install_release(downloader, asset_url, release_file, release["tag_name"],
+                           streaming=settings.enable_streaming_install, progress_callback=progress_callback,
+                           mirrors=mirror_list(settings), digest=release_digest(release), activate=False)
+
+
+def staged_version(version):
+    # version if it is installed but not active, i.e. applying it is only the pointer swap
+    from versions import VersionStore
+
+    if version != read_installed_version() and VersionStore().has(version):
+        return version
+    return None
+
+
+def verify_files(directory=None):
+    # Checks the active install; returns (number of release files, damaged or missing names), or None without a manifest
+    manifest = installed_manifest(install_dir() if directory is None else directory)
+    if not manifest.release:
+        return None
+    # Files whose size and mtime match the manifest are not hashed again
+    broken = manifest.find_changed(manifest.release_entries())
+    manifest.save()
+    return len(manifest.release), sorted(broken)
+
+
+def warm_up_client(settings, profile_file=ACCESS_PROFILE_FILE):
+    # Reads the active version's files into the page cache before a launch, the ones earlier sessions
+    # read first at the front, for at most settings.launch_warmup_budget seconds; returns the report
+    import time
+
+    from data_warmup import AccessProfile, warm_files
+
+    directory = install_dir()
+    names = [name for name in installed_manifest(directory).release if not name.endswith("/")]
+    profile = AccessProfile(profile_file)
+    # What the client read in the session after the last warm-up
+    profile.record_access_times(directory, names)
+    report = warm_files([os.path.join(directory, name) for name in profile.ordered(names)],
+                        budget=settings.launch_warmup_budget)
+    profile.last_launch = time.time()
+    profile.save()
+    return report
+
+
+def record_client_session(directory, opened, profile_file=ACCESS_PROFILE_FILE):
+    # opened: absolute path -> seconds after the start, as sampled from a supervised client
+    from data_warmup import AccessProfile
+
+    profile = AccessProfile(profile_file)
+    profile.record_session(directory, opened)
+    profile.save()
+
+
+def build_launch_command(settings, server, username, password):
+    # Returns the client command line, raises LauncherError naming the first missing field
+    server = server.strip()
+    username = username.strip()
+    password = password.strip()
+    executable_name = settings.executable_name.strip()
+
+    # Validate required fields
+    app_args = {
+        "Server": server,
+        "Username": username,
+        "Password": password,
+        "Executable Name": executable_name,
+    }
+    for key, value in app_args.items():
+        if not value:
+            raise LauncherError(f"{key} is required but is empty.")
+
+    # Construct command line arguments based on platform
+    command_args = [
+        f"-u {username}",
+        f"-p {password}",
+        f"-d {server}",
+        f"-w {settings.desired_width}",
+        f"-h {settings.desired_height}",
+        f"-o {settings.options_mask}",
+        f"-c {settings.sdl_cache_size}",
+        f"-k {settings.sdl_frames}",
+        f"-m {settings.sdl_multi}",
+    ]
+
+    if sys.platform in ["linux", "linux2", "darwin"]:
+        # Assume Wine is needed to run Windows executable on Unix-like systems
+        app_path = "wine"
+        command_args.insert(0, executable_name)
+    else:
+        # Directly use the executable path on Windows
+        app_path = executable_name
+
+    return [app_path] + command_args
+
+
+def masked_command(command):
+    # The command line for logs and output, with the password replaced
+    return [f"-p {'*' * 8}" if arg.startswith("-p ") else arg for arg in command]
+
+
+def launch_environment(settings):
+    from wine_warmup import wine_environment
+
+    return wine_environment(settings.wine_prefix.strip())
@@ -1,9 +1,14 @@
+import atexit
 import json
 import os
+import random
 import sys
+import time
 
-import requests
-from PyQt5.QtGui import QIcon
+# Imported first so the "imports" span covers PyQt5 and the launcher modules
+from profiling import tracer
+
+from PyQt5.QtCore import Qt, QThread, QTimer
 from PyQt5.QtWidgets import (
     QApplication,
     QWidget,
@@ -15,14 +20,40 @@ from PyQt5.QtWidgets import (
     QLineEdit,
     QCheckBox,
     QDialog,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QAbstractItemView, QInputDialog, QHBoxLayout,
 )
-from bitarray import bitarray
 
-from ServerComboBox import ServerComboBox
+from character_model import (
+    CharacterFilterProxyModel,
+    CharacterTableModel,
+    DeleteButtonDelegate,
+    DELETE_COLUMN,
+    PASSWORD_COLUMN,
+    SERVER_COLUMN,
+)
+from character_store import CharacterStore
+import launcher_core
+from launcher_core import LauncherError
+from persistence import read_with_backup, writer
+from progress import format_progress
+from release_cache import ReleaseCache
 from settings_dialog import SettingsDialog
+from supervisor import ClientSupervisor, FirstWindowProbe, SupervisorDialog
+from update_checker import ReleaseCheckWorker
+from wine_warmup import record_launch, start_persistent_wineserver
+
+
+def parse_inputs(text):
+    # "key:value" lines; the value may itself contain colons
+    inputs = {}
+    for line in text.splitlines():
+        if line:
+            key, separator, value = line.partition(":")
+            if not separator:
+                raise ValueError(f"Malformed line {line!r}")
+            inputs[key] = value
+    return inputs
 
 
 class AstoniaLauncher(QWidget):
@@ -41,13 +72,37 @@ class AstoniaLauncher(QWidget):
             application_path = os.path.dirname(os.path.abspath(__file__))
 
         # URLs and file paths
-        self.repo_owner = "DanielBrockhaus"
-        self.repo_name = "astonia_client"
-        self.release_api_url = f"https://api.github.com/repos/{self.repo_owner}/{self.repo_name}/releases/latest"
-        self.latest_version_file = os.path.join('settings', 'version.json')
-        self.settings_file = os.path.join('settings', 'settings.json')
-        self.characters_file = os.path.join('settings', 'characters.json')
-        self.release_api_url_body = requests.get(self.release_api_url).json()
+        self.repo_owner = launcher_core.REPO_OWNER
+        self.repo_name = launcher_core.REPO_NAME
+        self.release_api_url = launcher_core.RELEASE_API_URL
+        self.latest_version_file = launcher_core.VERSION_FILE
+        self.settings_file = launcher_core.SETTINGS_FILE
+        self.characters_file = launcher_core.CHARACTERS_FILE
+        self.launch_times_file = launcher_core.LAUNCH_TIMES_FILE
+        self.inputs_file = launcher_core.INPUTS_FILE
+
+        # Release lookup runs in the background; after the timeout we fall back to the installed version
+        self.update_check_timeout = 10
+        self.update_check_worker = None
+        self.update_check_done = False
+        self.downloader = None
+        self.update_worker = None
+        # Opt-in background polling that stages new releases for the next start
+        self.prefetch_worker = None
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.timeout.connect(self.start_prefetch)
+
+        # Optional pre-launch read of the client files into the page cache
+        self.warmup_worker = None
+
+        # Verify / Repair: hashing the install and looking up the installed version's release
+        self.verify_worker = None
+        self.repair_lookup_worker = None
+
+        # Supervised multi-client launches
+        self.supervisor = None
+        self.supervisor_dialog = None
 
         # Selected Character
         self.character = ""
@@ -55,16 +110,41 @@ class AstoniaLauncher(QWidget):
         self.password = ""
 
         # Settings dialog
-        self.settings_dialog = SettingsDialog(self)
-        self.settings_dialog.load_settings_from_file()
-        # Add Character Dialog
-        self.add_character_dialog = QDialog(self)
-
-        self.init_ui()
+        with tracer.span("load settings"):
+            self.settings_dialog = SettingsDialog(self)
+            self.settings_dialog.load_settings_from_file()
+
+        # Release metadata, shared by check_updates and update_app
+        self.release_cache = ReleaseCache(
+            launcher_core.RELEASE_CACHE_FILE,
+            ttl=self.settings_dialog.value("release_cache_ttl"),
+        )
+        # Persistent wineserver so client launches skip the cold prefix start-up
+        self.wineserver = None
+        self.window_probes = []
+        if sys.platform != "win32" and self.settings_dialog.value("enable_wine_warm_start"):
+            with tracer.span("start wineserver"):
+                self.wineserver = start_persistent_wineserver(self.settings_dialog.value("wine_prefix").strip())
+
+        # Add Character Dialog, built on first open and reused
+        self.add_character_dialog = None
+
+        # Saved characters, indexed by (server, username)
+        with tracer.span("load characters"):
+            self.character_store = CharacterStore(self.characters_file, self)
+
+        with tracer.span("init_ui"):
+            self.init_ui()
         self.init_signals()
-        self.restore_inputs()
+        with tracer.span("restore inputs"):
+            self.restore_inputs()
 
-        self.check_updates()
+        # Ended when the release lookup succeeds, fails or times out
+        self.update_check_span = None
+        self.update_span = None
+        self.start_update_check()
+        if self.settings_dialog.value("enable_background_updates"):
+            self.schedule_prefetch()
 
     def init_ui(self):
         # UI setup
@@ -82,7 +162,12 @@ class AstoniaLauncher(QWidget):
 
         self.PlayButton = QPushButton(self)
         self.PlayButton.setText("Launch App")
-        self.PlayButton.setEnabled(False)
+
+        self.LaunchSelectedButton = QPushButton(self)
+        self.LaunchSelectedButton.setText("Launch Selected")
+        self.LaunchSelectedButton.setToolTip("Start every selected character and keep the launcher open")
+        # An installed client can be launched while the update check is running
+        self.PlayButton.setEnabled(self.read_installed_version() is not None)
 
         self.remember_checkbox = QCheckBox("Remember me")
         self.remember_checkbox.setChecked(True)
@@ -93,25 +178,50 @@ class AstoniaLauncher(QWidget):
         self.addCharacterButton = QPushButton(self)
         self.addCharacterButton.setText("Add Character")
 
-        # Table
-        self.CharacterTable = QTableWidget()
-        self.CharacterTable.setColumnCount(4)
-        self.CharacterTable.setHorizontalHeaderLabels(
-            ["Server", "Name", "Password", "Delete"]
-        )
-        self.CharacterTable.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.VerifyButton = QPushButton(self)
+        self.VerifyButton.setText("Verify / Repair")
+
+        self.VersionsButton = QPushButton(self)
+        self.VersionsButton.setText("Versions...")
+
+        # Table, rows are painted on demand from the character store
+        self.character_model = CharacterTableModel(self.character_store, self)
+        self.character_proxy = CharacterFilterProxyModel(self)
+        self.character_proxy.setSourceModel(self.character_model)
+        self.character_proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+
+        self.CharacterFilter = QLineEdit()
+        self.CharacterFilter.setPlaceholderText("Filter characters")
+        self.CharacterFilter.setClearButtonEnabled(True)
+
+        self.CharacterTable = QTableView()
+        self.CharacterTable.setModel(self.character_proxy)
+        self.CharacterTable.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        # Keep file order until a header is clicked
+        self.CharacterTable.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
         self.CharacterTable.setSortingEnabled(True)
         self.CharacterTable.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.CharacterTable.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.CharacterTable.setColumnHidden(PASSWORD_COLUMN, True)
+        self.CharacterTable.verticalHeader().setDefaultSectionSize(
+            self.CharacterTable.verticalHeader().minimumSectionSize()
+        )
+        self.delete_delegate = DeleteButtonDelegate("icons/red_cross.png", self.CharacterTable)
+        self.CharacterTable.setItemDelegateForColumn(DELETE_COLUMN, self.delete_delegate)
         self.populate_character_table()
 
         self.layout = QVBoxLayout()
         self.layout.addWidget(self.SettingsButton)
         self.layout.addWidget(self.addCharacterButton)
+        self.layout.addWidget(self.VerifyButton)
+        self.layout.addWidget(self.VersionsButton)
         self.layout.addWidget(self.label)
         self.layout.addWidget(self.progress_bar)
+        self.layout.addWidget(self.CharacterFilter)
         self.layout.addWidget(self.CharacterTable)
         self.layout.addWidget(self.remember_checkbox)
         self.layout.addWidget(self.PlayButton)
+        self.layout.addWidget(self.LaunchSelectedButton)
         self.setLayout(self.layout)
 
         # Show the UI
@@ -121,63 +231,34 @@ class AstoniaLauncher(QWidget):
         selected_rows = self.CharacterTable.selectionModel().selectedRows()
         if len(selected_rows) == 1:
             # Get the server and character names from the selected row
-            row = selected_rows[0].row()
-            server_item = self.CharacterTable.item(row, 0)
-            character_item = self.CharacterTable.item(row, 1)
-            password_item = self.CharacterTable.item(row, 2)
-            if server_item and character_item and password_item:
-                self.server = server_item.text()
-                self.character = character_item.text()
-                self.password = password_item.text()
+            character = selected_rows[0].data(Qt.UserRole)
+            if character:
+                self.server = character["server"]
+                self.character = character["username"]
+                self.password = character["password"]
 
     def populate_character_table(self):
-        try:
-            with open(self.characters_file, "r") as f:
-                characters = json.load(f)
-        except FileNotFoundError:
-            characters = []
-        # Clear table and populate it with logins
-        self.CharacterTable.setRowCount(0)
-        for character in characters:
-            if (
-                    isinstance(character, dict)
-                    and "server" in character
-                    and "username" in character
-                    and "password" in character
-            ):
-                row = self.CharacterTable.rowCount()
-                self.CharacterTable.insertRow(row)
-                self.CharacterTable.setItem(
-                    row, 0, QTableWidgetItem(character["server"])
-                )
-                self.CharacterTable.setItem(
-                    row, 1, QTableWidgetItem(character["username"])
-                )
-                self.CharacterTable.setItem(
-                    row, 2, QTableWidgetItem(character["password"])
-                )
-                self.CharacterTable.setColumnHidden(2, True)
-
-                # Add a delete button with a red cross icon to the fourth column
-                delete_button = QPushButton()
-                delete_button.setIcon(QIcon("icons/red_cross.png"))
-                delete_button.setToolTip("Delete character")
-                delete_button.clicked.connect(self.handle_delete_button_click)
-                self.CharacterTable.setCellWidget(row, 3, delete_button)
-
-                self.CharacterTable.resizeColumnToContents(0)
-                self.CharacterTable.resizeColumnToContents(1)
-                self.CharacterTable.resizeColumnToContents(2)
-                self.CharacterTable.resizeColumnToContents(3)
-
-    def handle_delete_button_click(self):
-        button = self.sender()
-        row = self.CharacterTable.indexAt(button.pos()).row()
-        server_item = self.CharacterTable.item(row, 0)
-        character_item = self.CharacterTable.item(row, 1)
-        if server_item and character_item:
-            server = server_item.text()
-            character = character_item.text()
+        # Full reload from the store; later changes arrive through the store's signals
+        with tracer.span("populate_character_table", rows=len(self.character_store)):
+            self.character_model.reload()
+            self.CharacterTable.resizeColumnsToContents()
+
+    def select_character(self, server, username):
+        row = self.character_model.row_of(server, username)
+        if row < 0:
+            return
+        index = self.character_proxy.mapFromSource(self.character_model.index(row, SERVER_COLUMN))
+        if index.isValid():
+            self.CharacterTable.selectRow(index.row())
+            self.CharacterTable.scrollTo(index)
+            # Selecting the already selected row does not emit selectionChanged
+            self.handle_character_selection_change()
+
+    def handle_delete_requested(self, index):
+        character = index.data(Qt.UserRole)
+        if character:
+            server = character["server"]
+            character = character["username"]
 
             # Prompt the user to confirm the deletion
             message_box = QMessageBox()
@@ -188,55 +269,53 @@ class AstoniaLauncher(QWidget):
             message_box.setDefaultButton(QMessageBox.No)
             result = message_box.exec_()
             if result == QMessageBox.Yes:
-                # Remove the character from the JSON file
+                # The store saves the file and the model drops the row through character_removed
                 self.remove_character(server, character)
-                # Refresh the table
-                self.populate_character_table()
 
     def remove_character(self, server, character):
-        # Load the current settings from the JSON file
-        if os.path.isfile(self.characters_file):
-            with open(self.characters_file, "r") as f:
-                settings = json.load(f)
-        else:
-            settings = []
-
-        # Remove the character data from the settings
-        for character_data in settings:
-            if (
-                    character_data["server"] == server
-                    and character_data["username"] == character
-            ):
-                settings.remove(character_data)
-                break
-
-        # Save the updated settings to the JSON file
-        with open(self.characters_file, "w") as f:
-            json.dump(settings, f)
+        self.character_store.remove(server, character)
 
     def init_signals(self):
         self.PlayButton.clicked.connect(self.launch_app)
+        self.LaunchSelectedButton.clicked.connect(self.launch_selected)
         self.SettingsButton.clicked.connect(self.open_settings_dialog)
         self.addCharacterButton.clicked.connect(self.open_add_character_dialog)
-        self.CharacterTable.itemSelectionChanged.connect(
+        self.VerifyButton.clicked.connect(self.verify_install)
+        self.VersionsButton.clicked.connect(self.choose_version)
+        self.CharacterTable.selectionModel().selectionChanged.connect(
             self.handle_character_selection_change
         )
+        self.delete_delegate.delete_requested.connect(self.handle_delete_requested)
+        self.CharacterFilter.textChanged.connect(self.character_proxy.setFilterFixedString)
 
     def open_settings_dialog(self):
         self.settings_dialog.show()
         self.settings_dialog.exec_()
 
     def open_add_character_dialog(self):
+        if self.add_character_dialog is None:
+            self.build_add_character_dialog()
+        else:
+            self.server_input.probe_servers()
+        self.character_input.clear()
+        self.password_input.clear()
+        self.character_input.setFocus()
+        self.add_character_dialog.exec_()
+
+    def build_add_character_dialog(self):
+        from ServerComboBox import ServerComboBox
+
+        self.add_character_dialog = QDialog(self)
         self.add_character_dialog.setWindowTitle("Add Character")
         # Server Input
-        self.server_input = ServerComboBox(self)
+        self.server_input = ServerComboBox(self.add_character_dialog)
         # Create input fields for character data
         character_input_label = QLabel("Character")
-        character_input = QLineEdit()
+        self.character_input = QLineEdit()
 
         password_input_label = QLabel("Password")
-        password_input = QLineEdit()
-        password_input.setEchoMode(QLineEdit.Password)
+        self.password_input = QLineEdit()
+        self.password_input.setEchoMode(QLineEdit.Password)
 
         server_input_label = QLabel("Server")
         # Create the QHBoxLayout for the buttons
@@ -250,15 +329,20 @@ class AstoniaLauncher(QWidget):
         remove_server_button = QPushButton("Remove")
         button_layout.addWidget(remove_server_button)
 
+        # Add the "Fastest" button, it selects the server with the lowest ping
+        fastest_server_button = QPushButton("Fastest")
+        fastest_server_button.setToolTip("Select the server with the lowest measured latency")
+        button_layout.addWidget(fastest_server_button)
+
         # Create a layout for the dialog
         layout = QVBoxLayout()
         layout.addWidget(server_input_label)
         layout.addWidget(self.server_input)
         layout.addLayout(button_layout)
         layout.addWidget(character_input_label)
-        layout.addWidget(character_input)
+        layout.addWidget(self.character_input)
         layout.addWidget(password_input_label)
-        layout.addWidget(password_input)
+        layout.addWidget(self.password_input)
 
         # Create the QHBoxLayout for the buttons
         button_layout = QHBoxLayout()
@@ -276,19 +360,19 @@ class AstoniaLauncher(QWidget):
         # Add server button clicked
         add_server_button.clicked.connect(self.on_add_server)
         remove_server_button.clicked.connect(self.on_delete_server)
+        fastest_server_button.clicked.connect(self.server_input.select_fastest)
 
         # Connect the save button to a function to save the data
         add_character_button.clicked.connect(
             lambda: self.save_character(
                 self.server_input.currentData(),
-                character_input.text(),
-                password_input.text(),
+                self.character_input.text(),
+                self.password_input.text(),
             )
         )
         cancel_button.clicked.connect(self.on_add_character_dialog_close)
 
         self.add_character_dialog.setLayout(layout)
-        self.add_character_dialog.exec_()
 
     def on_add_character_dialog_close(self):
         self.add_character_dialog.close()
@@ -306,25 +390,11 @@ class AstoniaLauncher(QWidget):
                 self.server_input.add_server(name, address)
 
     def save_character(self, server, character, password):
-        # Load the current settings from the JSON file
-        if os.path.isfile(self.characters_file):
-            with open(self.characters_file, "r") as f:
-                settings = json.load(f)
-        else:
-            settings = []
-
-        # Add the new server and character data to the settings
-        character_data = {"server": server, "username": character, "password": password}
-        settings.append(character_data)
-
-        # Save the updated settings to the JSON file
-        with open(self.characters_file, "w") as f:
-            json.dump(settings, f)
+        self.character_store.add(server, character, password)
 
         # Close the dialog
         self.add_character_dialog.close()
-        self.populate_character_table()
-        self.CharacterTable.selectRow(0)
+        self.select_character(server, character)
 
     def save_settings(self, server, character, password):
         # Load the current settings from the JSON file
@@ -349,16 +419,16 @@ class AstoniaLauncher(QWidget):
 
     def restore_inputs(self):
         self.inputs = {}
-        if os.path.isfile("settings/inputs.txt"):
-            with open("settings/inputs.txt", "r") as f:
-                for line in f:
-                    key, value = line.strip().split(":")
-                    self.inputs[key] = value
+        try:
+            self.inputs = read_with_backup(self.inputs_file, parse_inputs)
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            print("Error reading saved inputs, ignoring them.")
 
     def save_inputs(self):
-        with open("settings/inputs.txt", "w") as f:
-            for key, value in self.inputs.items():
-                f.write(f"{key}:{value}\n")
+        # Called for every keystroke; the write-behind turns a burst of typing into one write
+        writer.write(self.inputs_file, "".join(f"{key}:{value}\n" for key, value in self.inputs.items()))
 
     def server_changed(self, index):
         self.inputs["server"] = index
@@ -375,175 +445,475 @@ class AstoniaLauncher(QWidget):
         if self.remember_checkbox.isChecked():
             self.save_inputs()
 
+    def read_installed_version(self):
+        return launcher_core.read_installed_version(self.latest_version_file)
+
+    def start_update_check(self):
+        self.label.setText("Checking for updates...")
+        self.update_check_done = False
+        self.update_check_span = tracer.span("release lookup")
+        self.update_check_worker = ReleaseCheckWorker(
+            self.release_api_url, self.release_cache, timeout=self.update_check_timeout, parent=self
+        )
+        self.update_check_worker.release_found.connect(self.on_release_found)
+        self.update_check_worker.check_failed.connect(self.on_update_check_failed)
+        self.update_check_worker.start()
+        QTimer.singleShot(
+            self.update_check_timeout * 1000,
+            lambda: self.on_update_check_failed("Timed out waiting for the update server"),
+        )
+
+    def on_release_found(self, release):
+        if self.update_check_done:
+            return
+        self.update_check_done = True
+        self.update_check_span.end(result="found")
+        self.check_updates()
+
+    def on_update_check_failed(self, error):
+        if self.update_check_done:
+            return
+        self.update_check_done = True
+        self.update_check_span.end(result="failed")
+        print(f"Update check failed: {error}")
+
+        # Offline fallback to the installed version
+        current_version = self.read_installed_version()
+        if current_version is None:
+            self.label.setText(f"Could not check for updates: {error}")
+            self.PlayButton.setEnabled(False)
+        else:
+            self.label.setText(f"Offline, using installed version {current_version}")
+            self.PlayButton.setEnabled(True)
+
     def check_updates(self):
+        span = tracer.span("check_updates")
         # Parse the response for the latest version
-        latest_version = self.release_api_url_body["tag_name"]
+        latest_version = self.release_cache.body["tag_name"]
 
         # Check if version.txt exists
-        if not os.path.isfile(self.latest_version_file):
+        current_version = self.read_installed_version()
+        span.args["installed"] = current_version
+        span.args["latest"] = latest_version
+        if current_version is None:
             self.label.setText("Downloading latest release...")
+            span.end()
             self.update_app(latest_version)
             return
 
         # Check if update is available
-        with open(self.latest_version_file, "r") as f:
-            current_version = f.read().strip()
-
         if current_version != latest_version:
             # Get release notes
-            release_notes = self.release_api_url_body["body"]
+            release_notes = self.release_cache.body["body"]
 
-            # Display update message
+            # Display update message; time spent in the prompt is the user's, so the span ends here
+            span.end()
             message = f"A new version ({latest_version}) of the app is available:\n\n{release_notes}"
-            response = QMessageBox.question(
-                self, "Update Available", message, QMessageBox.Yes | QMessageBox.No
-            )
-
-            if response == QMessageBox.Yes:
+            staged = launcher_core.staged_version(latest_version)
+            box = QMessageBox(QMessageBox.Question, "Update Available", message, QMessageBox.Yes | QMessageBox.No, self)
+            if staged is not None:
+                # Installed in the background, only the switch is left
+                box.button(QMessageBox.Yes).setText("Apply Staged Update")
+            response = box.exec_()
+
+            if response == QMessageBox.Yes and staged is not None:
+                self.apply_staged_update(staged)
+            elif response == QMessageBox.Yes:
                 self.label.setText("Downloading update...")
                 self.update_app(latest_version)
+            else:
+                self.label.setText(f"Using installed version {current_version}")
         else:
             self.label.setText("No updates available.")
             self.PlayButton.setEnabled(True)
+            span.end()
 
-    def update_app(self, latest_version):
-        # Download the latest release from GitHub
-        asset_url = self.release_api_url_body["assets"][0]["browser_download_url"]
-        release_file = self.release_api_url_body["assets"][0]["name"]
+    def apply_staged_update(self, version):
+        span = tracer.span("apply staged update", version=version)
         try:
-            with requests.get(asset_url, stream=True) as r:
-                r.raise_for_status()
-                self.progress_bar.show()
-                with open(release_file, "wb") as f:
-                    total_length = int(r.headers.get("content-length"))
-                    dl = 0
-                    for chunk in r.iter_content(chunk_size=8192):
-                        # If you have chunk encoded response uncomment if
-                        # and set chunk_size parameter to None.
-                        # if chunk:
-                        f.write(chunk)
-                        dl += len(chunk)
-                        progress = int(100 * dl / total_length)
-                        print(progress)
-                        self.progress_bar.setValue(progress)
-                        QApplication.processEvents()
-
-        except requests.exceptions.RequestException as e:
-            self.label.setText(f"Error: {e}")
+            launcher_core.activate_version(version, self.latest_version_file)
+        except OSError as e:
+            span.end(result="failed")
+            self.label.setText(f"Error applying the staged update: {e}")
+            return
+        span.end(result="applied")
+        self.label.setText(f"Updated to version {version}")
+        self.PlayButton.setEnabled(True)
+        self.collect_versions()
+
+    def choose_version(self):
+        from versions import VersionStore
+
+        current_version = self.read_installed_version()
+        installed = VersionStore().versions()
+        if not installed:
+            QMessageBox.information(self, "Versions", "No versions are installed side by side yet.")
+            return
+        # Newest first; switching is a pointer swap, the files of every listed version stay installed
+        installed.reverse()
+        current = installed.index(current_version) if current_version in installed else 0
+        version, ok = QInputDialog.getItem(self, "Versions", "Switch to version:", installed, current, False)
+        if not ok or version == current_version:
+            return
+        try:
+            launcher_core.activate_version(version, self.latest_version_file)
+        except OSError as e:
+            self.label.setText(f"Error switching versions: {e}")
+            return
+        self.label.setText(f"Using version {version}")
+        self.PlayButton.setEnabled(True)
+
+    def collect_versions(self):
+        try:
+            removed = launcher_core.collect_versions(self.settings_dialog.settings)
+        except OSError as e:
+            print(f"Removing old versions failed: {e}")
             return
+        if removed:
+            print(f"Removed old versions: {', '.join(removed)}")
 
-        # Extract the release files to the current directory
-        import zipfile
+    def schedule_prefetch(self):
+        # Jitter keeps launchers that started together from polling GitHub together
+        interval = self.settings_dialog.value("background_check_interval")
+        self.prefetch_timer.start(int(interval * random.uniform(0.8, 1.2) * 1000))
 
-        with zipfile.ZipFile(release_file, "r") as zip_ref:
-            zip_ref.extractall(".")
+    def start_prefetch(self):
+        from update_worker import PrefetchWorker
 
-        # Update the version file
-        with open(self.latest_version_file, "w") as f:
-            f.write(latest_version)
+        if self.update_worker is not None and self.update_worker.isRunning():
+            self.schedule_prefetch()
+            return
+        self.prefetch_worker = PrefetchWorker(
+            self.release_api_url,
+            self.release_cache,
+            self.settings_dialog.settings,
+            timeout=self.update_check_timeout,
+            parent=self,
+        )
+        self.prefetch_worker.staged.connect(self.on_update_staged)
+        self.prefetch_worker.finished.connect(self.schedule_prefetch)
+        # SCHED_IDLE on Linux: the staging only gets CPU time the game does not want
+        self.prefetch_worker.start(QThread.IdlePriority)
+
+    def stop_prefetch(self):
+        self.prefetch_timer.stop()
+        if self.prefetch_worker is not None and self.prefetch_worker.isRunning():
+            self.prefetch_worker.finished.disconnect(self.schedule_prefetch)
+            self.prefetch_worker.cancel()
+            # The release lookup, mirror probes, transfers and hashing all check the cancel, so this
+            # waits for one network read at most; a foreground update must not share the staging directory
+            self.prefetch_worker.wait()
+
+    def on_update_staged(self, version):
+        self.label.setText(f"Update {version} is downloaded and will be offered on the next start")
+
+    def update_app(self, latest_version, release=None):
+        # Installs latest_version from release, the latest release by default; the installed version is repaired
+        # requests and zipfile are only imported once an update actually runs
+        from update_worker import UpdateWorker
+
+        if release is None:
+            release = self.release_cache.body
+        # A foreground update replaces whatever the background prefetch is working on
+        self.stop_prefetch()
+
+        # Download the release from GitHub
+        try:
+            asset_url, release_file = launcher_core.release_asset(release)
+        except LauncherError as e:
+            self.label.setText(f"Error: {e}")
+            return
+        # Covers the whole download and install, ended by the worker's finished/failed/cancelled signal
+        self.update_span = tracer.span("update_app", version=latest_version)
+        self.PlayButton.setEnabled(False)
+        self.VerifyButton.setEnabled(False)
+        self.downloader = launcher_core.make_downloader(self.settings_dialog.settings)
+
+        # The transfer runs on a worker thread and posts throttled progress back
+        self.update_worker = UpdateWorker(
+            self.downloader,
+            asset_url,
+            release_file,
+            latest_version,
+            streaming=self.settings_dialog.value("enable_streaming_install"),
+            mirrors=launcher_core.mirror_list(self.settings_dialog.settings),
+            digest=launcher_core.release_digest(release),
+            parent=self,
+        )
+        self.update_worker.progress.connect(self.on_download_progress)
+        self.update_worker.update_finished.connect(lambda: self.on_update_finished(latest_version))
+        self.update_worker.update_failed.connect(self.on_update_failed)
+        self.update_worker.update_cancelled.connect(self.on_update_cancelled)
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.update_worker.start()
+
+    def on_update_finished(self, latest_version):
+        self.update_span.end(result="finished")
+        # install_release switched to the new version; the old one stays installed for a rollback
+        self.collect_versions()
 
-        # Clean up
-        os.remove(release_file)
+        self.progress_bar.hide()
         self.label.setText(f"Updated to version {latest_version}")
         self.PlayButton.setEnabled(True)
+        self.VerifyButton.setEnabled(True)
+        if self.settings_dialog.value("enable_background_updates"):
+            self.schedule_prefetch()
+
+    def on_update_failed(self, error):
+        self.update_span.end(result="failed")
+        self.progress_bar.hide()
+        self.label.setText(f"Error: {error}")
+        self.PlayButton.setEnabled(self.read_installed_version() is not None)
+        self.VerifyButton.setEnabled(True)
+        if self.settings_dialog.value("enable_background_updates"):
+            self.schedule_prefetch()
+
+    def on_update_cancelled(self):
+        self.update_span.end(result="cancelled")
+        self.label.setText("Download paused, it will resume on the next start")
+
+    def verify_install(self):
+        # Hashing runs on a worker thread, a large install takes seconds to minutes
+        from verify_worker import VerifyWorker
+
+        if self.verify_worker is not None and self.verify_worker.isRunning():
+            return
+        self.label.setText("Verifying installed files...")
+        self.VerifyButton.setEnabled(False)
+        self.verify_worker = VerifyWorker(parent=self)
+        self.verify_worker.verified.connect(self.on_verified)
+        self.verify_worker.verify_failed.connect(self.on_verify_failed)
+        self.verify_worker.start()
+
+    def on_verify_failed(self, error):
+        self.VerifyButton.setEnabled(True)
+        self.label.setText(f"Error verifying the installed files: {error}")
+
+    def on_verified(self, result):
+        self.VerifyButton.setEnabled(True)
+        if result is None:
+            self.label.setText("")
+            QMessageBox.information(self, "Verify / Repair", "No install manifest found, update the client first.")
+            return
+        file_count, broken = result
+        if not broken:
+            self.label.setText(f"Verified {file_count} files, no problems found.")
+            return
+
+        self.label.setText(f"{len(broken)} damaged or missing files.")
+        listing = "\n".join(broken[:20])
+        if len(broken) > 20:
+            listing += f"\n... and {len(broken) - 20} more"
+        message = f"These client files are missing or damaged:\n\n{listing}\n\nRepair them now?"
+        response = QMessageBox.question(
+            self, "Verify / Repair", message, QMessageBox.Yes | QMessageBox.No
+        )
+        if response != QMessageBox.Yes:
+            return
+        installed = self.read_installed_version()
+        if installed is None:
+            self.label.setText("Installed version unknown, update the client to reinstall it.")
+            return
+        # The files come from the installed version's release, a repair never installs a newer version
+        self.label.setText(f"Looking up release {installed}...")
+        self.VerifyButton.setEnabled(False)
+        self.repair_lookup_worker = ReleaseCheckWorker(
+            self.release_api_url, self.release_cache, timeout=self.update_check_timeout, version=installed,
+            parent=self,
+        )
+        self.repair_lookup_worker.release_found.connect(self.repair_install)
+        self.repair_lookup_worker.check_failed.connect(self.on_repair_lookup_failed)
+        self.repair_lookup_worker.start()
+
+    def on_repair_lookup_failed(self, error):
+        self.VerifyButton.setEnabled(True)
+        self.label.setText(f"Cannot repair: {error}")
+
+    def repair_install(self, release):
+        # With a manifest the streaming installer only re-fetches the damaged entries
+        self.label.setText("Repairing...")
+        self.update_app(release["tag_name"], release)
 
-    def create_options_arg(self):
-
-        option_mapping = {
-            "enable_dark_gui": 0,
-            "enable_context": 1,
-            "enable_keybindings": 2,
-            "enable_smaller_bottom_window": 3,
-            "enable_smaller_top_window": 4,
-            "enable_big_health_bar": 5,
-            "enable_sound": 6,
-            "enable_large_font": 7,
-            "enable_true_full_screen": 8,
-            "enable_legacy_mouse_wheel": 9,
-            "enable_gamma_increase": 14,  # Assuming bit positions 14-15 for gamma
-            "enable_minimap_management": 13,
-            "enable_minimap": 18,
-            "enable_appdata_usage": 12
-        }
-
-        options = bitarray(len(option_mapping) + 7)  # Adjusted size for the maximum bit index used + 1
-        options.setall(False)
-        if self.settings_dialog:
-            for checkbox_name, option_value in option_mapping.items():
-                checkbox = getattr(self.settings_dialog, checkbox_name)
-                if checkbox.isChecked():
-                    options[option_value] = True
-        return int.from_bytes(options.tobytes(), byteorder="little")
+    def on_download_progress(self, percent, rate, eta):
+        self.progress_bar.setValue(percent)
+        self.progress_bar.setFormat(f"%p%  ({format_progress(rate, eta)})")
+
+    def build_launch_command(self, server, username, password):
+        # Returns the client command line, or None after warning about a missing field
+        try:
+            return launcher_core.build_launch_command(self.settings_dialog.settings, server, username, password)
+        except LauncherError as e:
+            QMessageBox.warning(None, "Missing Information", str(e))
+            return None
 
     def launch_app(self):
-        server = self.server.strip()
-        username = self.character.strip()
-        password = self.password.strip()
-        executable_name = self.settings_dialog.executable_name.text().strip()
-        width = self.settings_dialog.desired_width.value()
-        height = self.settings_dialog.desired_height.value()
-        sdl_cache = self.settings_dialog.sdl_cache_size.value()
-        sdl_multi = self.settings_dialog.sdl_multi.value()
-        sdl_frames = self.settings_dialog.sdl_frames.value()
-
-        options_arg = self.create_options_arg()
-
-        # Validate required fields
-        app_args = {
-            "Server": server,
-            "Username": username,
-            "Password": password,
-            "Executable Name": executable_name,
-            "Width": width,
-            "Height": height,
-            "SDL Cache Size": sdl_cache,
-            "SDL Multi-threading": sdl_multi,
-            "SDL Frames": sdl_frames
-        }
-
-        for key, value in app_args.items():
-            if isinstance(value, str) and not value:
-                QMessageBox.warning(None, "Missing Information", f"{key} is required but is empty.")
-                return  # Cancel execution if any field is empty
-
-        # Construct command line arguments based on platform
-        command_args = [
-            f"-u {username}",
-            f"-p {password}",
-            f"-d {server}",
-            f"-w {width}",
-            f"-h {height}",
-            f"-o {options_arg}",
-            f"-c {sdl_cache}",
-            f"-k {sdl_frames}",
-            f"-m {sdl_multi}",
-        ]
-
-        if sys.platform in ["linux", "linux2", "darwin"]:
-            # Assume Wine is needed to run Windows executable on Unix-like systems
-            app_path = "wine"
-            command_args.insert(0, executable_name)
-        elif sys.platform == "win32":
-            # Directly use the executable path on Windows
-            app_path = executable_name
+        with tracer.span("launch_app"):
+            full_command = self.build_launch_command(self.server, self.character, self.password)
+        if full_command is None:
+            return
+        self.warm_up_then(lambda: self.exec_client(full_command))
+
+    def exec_client(self, full_command):
+        app_path = full_command[0]
+        launcher_dir = os.getcwd()
 
         # Launch the app
         try:
-            full_command = [app_path] + command_args
-            print("Command to execute:", ' '.join(full_command))  # Debug: print command to be executed
-            os.execvp(app_path, full_command)  # Here, full_command[0] should match app_path
+            print("Command to execute:", ' '.join(launcher_core.masked_command(full_command)))
+            # exec() replaces the process without running exit handlers
+            tracer.finish()
+            # exec skips atexit, pending settings writes have to land first
+            writer.flush()
+            # The client resolves its files relative to the working directory
+            os.chdir(launcher_core.install_dir())
+            # Here, full_command[0] should match app_path
+            os.execvpe(app_path, full_command, self.launch_environment())
         except OSError as e:
+            os.chdir(launcher_dir)
             if self.label:
                 self.label.setText(f"Error launching application: {e}")
             print(f"Error launching application: {e}")
 
+    def launch_selected(self):
+        # Supervised mode: every selected character runs as a child process and the launcher stays open
+        characters = [index.data(Qt.UserRole) for index in self.CharacterTable.selectionModel().selectedRows()]
+        if not characters:
+            QMessageBox.information(self, "Launch Selected", "Select one or more characters first.")
+            return
+
+        commands = []
+        for character in characters:
+            full_command = self.build_launch_command(
+                character["server"], character["username"], character["password"]
+            )
+            if full_command is None:
+                return
+            commands.append((f'{character["username"]} ({character["server"]})', full_command))
+        self.warm_up_then(lambda: self.launch_supervised(commands))
+
+    def launch_supervised(self, commands):
+        if self.supervisor is None:
+            self.supervisor = ClientSupervisor(parent=self)
+            self.supervisor.client_started.connect(self.on_client_started)
+            self.supervisor.client_finished.connect(self.on_client_finished)
+        self.supervisor.max_starting = self.settings_dialog.value("launch_concurrency")
+        self.supervisor.stagger = self.settings_dialog.value("launch_stagger")
+        install_dir = launcher_core.install_dir()
+        for name, full_command in commands:
+            self.supervisor.launch(name, full_command, self.launch_environment(), cwd=install_dir)
+
+        if self.supervisor_dialog is None:
+            self.supervisor_dialog = SupervisorDialog(self.supervisor, self)
+        self.supervisor_dialog.show()
+        self.supervisor_dialog.raise_()
+
+    def warm_up_then(self, launch):
+        # With the warm-up enabled, launch() runs once the client files are read, or the time budget is spent
+        from warmup_worker import WarmupWorker
+
+        if not self.settings_dialog.value("enable_launch_warmup"):
+            launch()
+            return
+        if self.warmup_worker is not None and self.warmup_worker.isRunning():
+            return
+        self.label.setText("Preloading client files...")
+        self.PlayButton.setEnabled(False)
+        self.LaunchSelectedButton.setEnabled(False)
+        span = tracer.span("launch warm-up")
+        self.warmup_worker = WarmupWorker(self.settings_dialog.settings, parent=self)
+        self.warmup_worker.warmed.connect(lambda report: self.on_warmed(report, span, launch))
+        self.warmup_worker.start()
+
+    def on_warmed(self, report, span, launch):
+        from data_warmup import format_report
+
+        span.end(**report)
+        if report:
+            print(format_report(report))
+            self.label.setText(format_report(report))
+        self.PlayButton.setEnabled(True)
+        self.LaunchSelectedButton.setEnabled(True)
+        launch()
+
+    def on_client_finished(self, client):
+        # What the client opened early in its session puts those files first in the next warm-up
+        if not client.opened_files:
+            return
+        try:
+            launcher_core.record_client_session(client.cwd, client.opened_files)
+        except OSError as e:
+            print(f"Failed to save the access profile: {e}")
+
+    def launch_environment(self):
+        return launcher_core.launch_environment(self.settings_dialog.settings)
+
+    def on_client_started(self, client):
+        # Measure launch-to-first-window latency for every supervised launch
+        probe = FirstWindowProbe(client.pid, client.started_at, parent=self)
+        if not probe.available():
+            return
+        warm_start = self.wineserver is not None
+
+        def on_first_window(latency_ms):
+            client.first_window_ms = latency_ms
+            self.supervisor.client_changed.emit(client)
+            record_launch(self.launch_times_file, {
+                "time": time.time(),
+                "character": client.name,
+                "warm_start": warm_start,
+                "first_window_ms": round(latency_ms),
+            })
+            self.window_probes.remove(probe)
+
+        probe.first_window.connect(on_first_window)
+        probe.timed_out.connect(lambda: self.window_probes.remove(probe))
+        self.window_probes.append(probe)
+        probe.start()
+
+    def closeEvent(self, event):
+        # Supervised clients are children of the launcher and stop with it
+        if self.supervisor is not None and self.supervisor.running():
+            response = QMessageBox.question(
+                self,
+                "Clients Running",
+                f"{len(self.supervisor.running())} clients are still running. Closing the launcher stops them.",
+                QMessageBox.Ok | QMessageBox.Cancel,
+            )
+            if response != QMessageBox.Ok:
+                event.ignore()
+                return
+            self.supervisor.terminate_all()
+
+        # Leave the partial download and its journal in place for the next start
+        if self.update_worker is not None and self.update_worker.isRunning():
+            self.update_worker.cancel()
+            self.update_worker.wait()
+        self.stop_prefetch()
+        # A release lookup waits for one request at most once cancelled
+        for worker in (self.update_check_worker, self.repair_lookup_worker):
+            if worker is not None and worker.isRunning():
+                worker.cancel()
+                worker.wait()
+        # Hashing cannot be interrupted, but a running QThread must not be destroyed
+        if self.verify_worker is not None and self.verify_worker.isRunning():
+            self.verify_worker.wait()
+        writer.flush()
+        super().closeEvent(event)
+
     def close(self):
         QApplication.quit()
 
 
 if __name__ == "__main__":
+    argv = tracer.configure(sys.argv)
+    atexit.register(tracer.finish)
     os.makedirs("settings", exist_ok=True)
-    app = QApplication(sys.argv)
-    launcher = AstoniaLauncher()
+    app = QApplication(argv)
+    with tracer.span("AstoniaLauncher.__init__"):
+        launcher = AstoniaLauncher()
+    tracer.metadata["version"] = launcher.read_installed_version()
     launcher.show()
+    # The first event loop iteration runs after the window has been painted
+    QTimer.singleShot(0, lambda: tracer.add("startup to first paint", tracer.origin, time.perf_counter()))
     sys.exit(app.exec_())
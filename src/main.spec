@@ -15,8 +15,23 @@ a = Analysis(
              win_private_assemblies=False,
              cipher=block_cipher,
              noarchive=False)
+# Headless CLI (update, verify, launch, serve) for scripted and fleet use; it never imports PyQt5
+cli_a = Analysis(
+             ['cli.py'],
+             binaries=[],
+             datas=[],
+             hiddenimports=[],
+             hookspath=[],
+             runtime_hooks=[],
+             excludes=['PyQt5'],
+             win_no_prefer_redirects=False,
+             win_private_assemblies=False,
+             cipher=block_cipher,
+             noarchive=False)
 pyz = PYZ(a.pure, a.zipped_data,
              cipher=block_cipher)
+cli_pyz = PYZ(cli_a.pure, cli_a.zipped_data,
+             cipher=block_cipher)
 exe = EXE(pyz,
           a.scripts,
           [],
@@ -27,9 +42,24 @@ exe = EXE(pyz,
           strip=False,
           upx=True,
           console=False )
+# A console executable, so stdout/stderr and the exit status reach the calling shell
+cli_exe = EXE(cli_pyz,
+          cli_a.scripts,
+          [],
+          exclude_binaries=True,
+          name=PROJECT_NAME + "_cli",
+          debug=False,
+          bootloader_ignore_signals=False,
+          strip=False,
+          upx=True,
+          console=True )
+# Both executables share one directory, next to the same settings/
 coll = COLLECT(exe,
+               cli_exe,
                a.binaries,
+               cli_a.binaries,
                a.zipfiles,
+               cli_a.zipfiles,
                a.datas,
                strip=False,
                upx=True,
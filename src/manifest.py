@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import shutil
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from persistence import write_atomic
+
+
+def hash_file(path, block_size=4 * 1024 * 1024):
+    # One pass for both the zip-comparable CRC32 and the BLAKE2 content hash
+    crc = 0
+    blake2 = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(block_size)
+            if not data:
+                break
+            crc = zlib.crc32(data, crc)
+            blake2.update(data)
+    return crc, blake2.hexdigest()
+
+
+def safe_path(target_dir, name):
+    # Same idea as ZipFile._extract_member: no absolute paths and no '..'
+    parts = [p for p in name.replace("\\", "/").split("/") if p not in ("", ".", "..")]
+    return os.path.join(target_dir, *parts) if parts else None
+
+
+def move_tree(source_dir, target_dir):
+    # Renames every file of source_dir into the same place under target_dir, then removes source_dir
+    for root, dirs, files in os.walk(source_dir):
+        relative = os.path.relpath(root, source_dir)
+        destination = os.path.normpath(os.path.join(target_dir, relative))
+        os.makedirs(destination, exist_ok=True)
+        for name in files:
+            os.replace(os.path.join(root, name), os.path.join(destination, name))
+    shutil.rmtree(source_dir, ignore_errors=True)
+
+
+class InstallManifest:
+    def __init__(self, manifest_file=os.path.join("settings", "manifest.json"), target_dir="."):
+        self.manifest_file = manifest_file
+        self.target_dir = target_dir
+        # Archive entry name -> {"size", "mtime", "crc", "blake2"} of the installed file
+        self.files = {}
+        # Archive entry name -> {"size", "crc"} from the central directory of the installed release
+        self.release = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.manifest_file, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = {}
+        self.files = data.get("files", {})
+        self.release = data.get("release", {})
+
+    def save(self):
+        write_atomic(self.manifest_file, json.dumps({"files": self.files, "release": self.release}), backup=False)
+
+    def set_release(self, entries):
+        # entries are zipfile.ZipInfo objects
+        self.release = {info.filename: {"size": info.file_size, "crc": info.CRC} for info in entries}
+
+    def release_entries(self):
+        return [(name, entry["size"], entry["crc"]) for name, entry in self.release.items()]
+
+    def path(self, name):
+        return safe_path(self.target_dir, name)
+
+    def record(self, name, crc, blake2):
+        stat = os.stat(self.path(name))
+        self.files[name] = {"size": stat.st_size, "mtime": stat.st_mtime, "crc": crc, "blake2": blake2}
+
+    def is_current(self, name, size, crc, trust_cache=True):
+        # True if the installed file matches an archive entry with this size and CRC32
+        path = self.path(name)
+        if path is None:
+            return True
+        if name.endswith("/"):
+            return os.path.isdir(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if stat.st_size != size:
+            return False
+
+        # The (size, mtime) key makes re-checking an unchanged file free
+        entry = self.files.get(name)
+        if trust_cache and entry is not None and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            return entry["crc"] == crc
+
+        # Unknown or modified since it was recorded, hash it once and remember the result
+        file_crc, blake2 = hash_file(path)
+        self.record(name, file_crc, blake2)
+        return file_crc == crc
+
+    def find_changed(self, entries, workers=8, trust_cache=True):
+        # entries are (name, size, crc) tuples; returns the names that need to be (re)installed
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            current = executor.map(lambda entry: self.is_current(*entry, trust_cache=trust_cache), entries)
+            return [entry[0] for entry, ok in zip(entries, current) if not ok]
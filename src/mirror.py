@@ -0,0 +1,138 @@
+import os
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Release assets are addressed by their SHA-256 as <mirror>/sha256/<hex>, so whatever a
+# mirror returns is checked against the digest GitHub lists for the release
+ASSET_PATH = re.compile(r"/sha256/([0-9a-f]{64})")
+
+
+def mirror_urls(mirrors, digest):
+    return [f"{mirror}/sha256/{digest}" for mirror in mirrors]
+
+
+def available_mirrors(client, mirrors, digest, timeout=2, cancelled=None):
+    # One HEAD per mirror and no retries, so a mirror that is down costs at most the timeout.
+    # Raises DownloadCancelled between probes once cancelled is set.
+    from network import check_cancelled
+
+    urls = []
+    for url in mirror_urls(mirrors, digest):
+        check_cancelled(cancelled)
+        try:
+            response = client.session.head(url, timeout=timeout, allow_redirects=True)
+        except OSError as e:
+            print(f"Mirror {url} unreachable ({type(e).__name__})")
+            continue
+        if response.status_code == 200:
+            urls.append(url)
+    return urls
+
+
+class AssetStore:
+    # Verified release archives, one file per digest under <root>/sha256/
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, digest):
+        return os.path.join(self.root, "sha256", digest)
+
+    def partial_path(self, digest):
+        os.makedirs(os.path.join(self.root, "partial"), exist_ok=True)
+        return os.path.join(self.root, "partial", digest)
+
+    def has(self, digest):
+        return os.path.isfile(self.path(digest))
+
+    def add(self, path, digest):
+        # path must already be verified against digest
+        os.makedirs(os.path.dirname(self.path(digest)), exist_ok=True)
+        os.replace(path, self.path(digest))
+
+    def digests(self):
+        # Newest first
+        directory = os.path.join(self.root, "sha256")
+        if not os.path.isdir(directory):
+            return []
+        names = [name for name in os.listdir(directory) if ASSET_PATH.fullmatch("/sha256/" + name)]
+        return sorted(names, key=lambda name: -os.path.getmtime(os.path.join(directory, name)))
+
+    def prune(self, keep):
+        for digest in self.digests()[keep:]:
+            os.remove(self.path(digest))
+
+
+def parse_range(header, size):
+    # (start, end) of a single "bytes=" range, None to send the whole file; raises ValueError if unsatisfiable
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    if not (first + last).isdigit():
+        return None
+    if first:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(0, size - int(last)), size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+class MirrorHandler(BaseHTTPRequestHandler):
+    # GET and HEAD of /sha256/<hex> with single byte ranges, which is all RangedDownloader needs
+    protocol_version = "HTTP/1.1"
+    server_version = "AstoniaLauncherMirror"
+
+    def do_HEAD(self):
+        self.send_asset(body=False)
+
+    def do_GET(self):
+        self.send_asset(body=True)
+
+    def send_asset(self, body):
+        match = ASSET_PATH.fullmatch(self.path)
+        if match is None or not self.server.store.has(match.group(1)):
+            self.send_error(404)
+            return
+        digest = match.group(1)
+        with open(self.server.store.path(digest), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            # The digest is the strongest validator there is
+            etag = f'"{digest}"'
+            if_range = self.headers.get("If-Range")
+            try:
+                byte_range = parse_range(self.headers.get("Range"), size)
+            except ValueError:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if if_range and if_range != etag:
+                byte_range = None
+            start, end = byte_range if byte_range is not None else (0, size - 1)
+
+            self.send_response(206 if byte_range is not None else 200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(end - start + 1))
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", etag)
+            if byte_range is not None:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            self.end_headers()
+            if not body or size == 0:
+                return
+            try:
+                # Straight from the page cache to the socket
+                self.connection.sendfile(f, start, end - start + 1)
+            except (BrokenPipeError, ConnectionResetError):
+                # Probes and cancelled downloads hang up early
+                self.close_connection = True
+
+
+class MirrorServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, store):
+        super().__init__(address, MirrorHandler)
+        self.store = store
@@ -0,0 +1,152 @@
+import email.utils
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Answers worth another attempt; 429 and 503 usually say when in Retry-After
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Failures of the connection itself, before or while the body is read
+TRANSIENT_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+class DownloadCancelled(Exception):
+    pass
+
+
+class TokenBucket:
+    # Bandwidth cap shared by every connection, so it holds for the sum of all transfers
+    def __init__(self, rate, burst=None):
+        self.rate = rate  # bytes per second
+        self.capacity = burst if burst is not None else max(rate // 4, 16 * 1024)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount, cancelled=None):
+        # Takes the tokens right away and sleeps off any debt; concurrent callers queue up behind it
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+        if delay:
+            sleep(delay, cancelled)
+
+
+def check_cancelled(cancelled):
+    # For loops that neither sleep nor transfer, e.g. hashing, to stop between steps
+    if cancelled is not None and cancelled.is_set():
+        raise DownloadCancelled()
+
+
+def sleep(delay, cancelled=None):
+    if cancelled is None:
+        time.sleep(delay)
+    elif cancelled.wait(delay):
+        raise DownloadCancelled()
+
+
+def parse_retry_after(value):
+    # Seconds to wait from a Retry-After header (delay-seconds or HTTP-date), or None
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class HttpClient:
+    def __init__(self, connect_timeout=5, read_timeout=30, retries=4, backoff=0.5, max_backoff=30,
+                 max_retry_after=120, pool_size=16, bandwidth_limit=None):
+        # One keep-alive pool for the release API and the asset host, sized for the most download connections
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = "astonia-launcher"
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # A longer Retry-After than this is not waited for, the error goes to the caller instead
+        self.max_retry_after = max_retry_after
+        self.bucket = None
+        self.set_bandwidth_limit(bandwidth_limit)
+
+    def set_bandwidth_limit(self, bytes_per_second):
+        self.bucket = TokenBucket(bytes_per_second) if bytes_per_second else None
+
+    def backoff_delay(self, attempt):
+        # Exponential with jitter, so clients that failed together do not retry together
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+    def get(self, url, cancelled=None, **kwargs):
+        # Retries connection errors and RETRY_STATUSES; the final response is returned as is
+        kwargs.setdefault("timeout", self.timeout)
+        attempt = 0
+        while True:
+            try:
+                response = self.session.get(url, **kwargs)
+            except TRANSIENT_ERRORS as e:
+                if attempt >= self.retries:
+                    raise
+                delay = self.backoff_delay(attempt)
+                reason = type(e).__name__
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    return response
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if retry_after is not None and retry_after > self.max_retry_after:
+                    return response
+                delay = retry_after if retry_after is not None else self.backoff_delay(attempt)
+                reason = f"HTTP {response.status_code}"
+                response.close()
+            print(f"Retrying {url} in {delay:.1f}s after {reason}")
+            sleep(delay, cancelled)
+            attempt += 1
+
+    def call_with_retries(self, func, cancelled=None):
+        # For transfers that fail half way: func() is called again and has to continue where it stopped
+        attempt = 0
+        while True:
+            try:
+                return func()
+            except TRANSIENT_ERRORS as e:
+                if attempt >= self.retries:
+                    raise
+                delay = self.backoff_delay(attempt)
+                print(f"Transfer interrupted ({type(e).__name__}), retrying in {delay:.1f}s")
+                sleep(delay, cancelled)
+                attempt += 1
+
+    def iter_content(self, response, chunk_size, cancelled=None):
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            if self.bucket is not None:
+                self.bucket.consume(len(chunk), cancelled)
+            yield chunk
+
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+def shared_client():
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = HttpClient()
+        return _shared_client
@@ -0,0 +1,127 @@
+import atexit
+import json
+import os
+import shutil
+import threading
+
+# Previous good version of each file, used when the file itself does not parse
+BACKUP_SUFFIX = ".bak"
+
+# Files whose current content parsed or was written by this process; only those become backups
+_known_good = set()
+_known_good_lock = threading.Lock()
+
+
+def _fsync_directory(path):
+    # Makes the rename itself durable; not possible (or needed) on Windows
+    if os.name != "posix":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _keep_backup(path):
+    # Hard link, so the old content survives the rename without being copied
+    backup_path = path + BACKUP_SUFFIX
+    tmp_path = backup_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(path, tmp_path)
+    except OSError:
+        shutil.copy2(path, tmp_path)
+    os.replace(tmp_path, backup_path)
+
+
+def write_atomic(path, text, backup=True):
+    # Temporary file, fsync, rename: readers and crashes see either the old or the new file, never a mix
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    with _known_good_lock:
+        rotate = backup and path in _known_good and os.path.isfile(path)
+    if rotate:
+        _keep_backup(path)
+    os.replace(tmp_path, path)
+    _fsync_directory(path)
+    with _known_good_lock:
+        _known_good.add(path)
+
+
+def read_with_backup(path, parse):
+    # parse(text) of the file, or of its backup when the file does not parse (parse raises ValueError).
+    # A missing file is not an error the backup can fix: FileNotFoundError is raised as usual.
+    text = writer.pending(path)
+    if text is not None:
+        return parse(text)
+    with open(path, "r") as f:
+        text = f.read()
+    try:
+        value = parse(text)
+    except ValueError as e:
+        try:
+            with open(path + BACKUP_SUFFIX, "r") as f:
+                value = parse(f.read())
+        except (OSError, ValueError):
+            raise e
+        print(f"{path} is damaged, loaded the last good copy instead")
+        return value
+    with _known_good_lock:
+        _known_good.add(path)
+    return value
+
+
+def read_json(path):
+    return read_with_backup(path, json.loads)
+
+
+class WriteBehind:
+    # Coalesces writes per file and flushes them together at most every `delay` seconds,
+    # so a burst of changes (a keystroke per character) costs one write
+    def __init__(self, delay=0.5):
+        self.delay = delay
+        self._pending = {}
+        self._writing = {}
+        self._timer = None
+        self._lock = threading.Lock()
+        # Held while files are written, so two flushes never write the same file at once
+        self._write_lock = threading.Lock()
+
+    def write(self, path, text, backup=True):
+        with self._lock:
+            self._pending[path] = (text, backup)
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def pending(self, path):
+        # Text scheduled for path but possibly not on disk yet, or None
+        with self._lock:
+            entry = self._pending.get(path) or self._writing.get(path)
+        return entry[0] if entry is not None else None
+
+    def flush(self):
+        # Also called on close, before exec and at exit
+        with self._write_lock:
+            with self._lock:
+                self._writing, self._pending = self._pending, {}
+                timer, self._timer = self._timer, None
+            if timer is not None:
+                timer.cancel()
+            for path, (text, backup) in self._writing.items():
+                try:
+                    write_atomic(path, text, backup)
+                except OSError as e:
+                    print(f"Failed to save {path}: {e}")
+            with self._lock:
+                self._writing = {}
+
+
+writer = WriteBehind()
+atexit.register(writer.flush)
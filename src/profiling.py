@@ -0,0 +1,166 @@
+import json
+import os
+import threading
+import time
+
+# Taken when main.py imports this module, before PyQt5 and the rest of the launcher are imported
+_origin = time.perf_counter()
+
+DEFAULT_TRACE_FILE = "launcher_trace.json"
+DEFAULT_PROFILE_FILE = "launcher.prof"
+
+
+class Span:
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = time.perf_counter()
+
+    def end(self, **args):
+        # Ending twice is a no-op, so a span can be closed early inside a with block
+        if self.start is None:
+            return
+        self.tracer.add(self.name, self.start, time.perf_counter(), {**self.args, **args})
+        self.start = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.end()
+
+
+class _NullSpan:
+    # Returned while tracing is disabled so instrumented code costs next to nothing
+    @property
+    def args(self):
+        # Callers may annotate a span after creating it; the values are dropped
+        return {}
+
+    def end(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+_null_span = _NullSpan()
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.origin = _origin
+        self.started_at = time.time() - (time.perf_counter() - _origin)
+        self.trace_file = None
+        self.profile_file = None
+        self.profiler = None
+        self.metadata = {}
+        self.events = []
+        self.finished = False
+
+    def configure(self, argv, environ=os.environ):
+        # --profile[=trace.json] or ASTONIA_PROFILE=trace.json records spans,
+        # --cprofile[=file.prof] or ASTONIA_CPROFILE=file.prof also dumps cProfile stats of the main thread.
+        # Returns argv without the profiling flags.
+        remaining = []
+        trace_file = environ.get("ASTONIA_PROFILE") or None
+        profile_file = environ.get("ASTONIA_CPROFILE") or None
+        for arg in argv:
+            flag, _, value = arg.partition("=")
+            if flag == "--profile":
+                trace_file = value or DEFAULT_TRACE_FILE
+            elif flag == "--cprofile":
+                profile_file = value or DEFAULT_PROFILE_FILE
+            else:
+                remaining.append(arg)
+        if trace_file == "1":
+            trace_file = DEFAULT_TRACE_FILE
+        if profile_file == "1":
+            profile_file = DEFAULT_PROFILE_FILE
+
+        if trace_file or profile_file:
+            self.enable(trace_file or DEFAULT_TRACE_FILE, profile_file)
+        return remaining
+
+    def enable(self, trace_file, profile_file=None):
+        self.enabled = True
+        self.trace_file = trace_file
+        self.profile_file = profile_file
+        # Everything from the import of this module up to now is module import time
+        self.add("imports", self.origin, time.perf_counter())
+        if profile_file:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return _null_span
+        return Span(self, name, args)
+
+    def add(self, name, start, end, args=None):
+        if not self.enabled:
+            return
+        # Chrome trace "complete" events, timestamps in microseconds since the process start mark
+        self.events.append({
+            "name": name,
+            "cat": "launcher",
+            "ph": "X",
+            "ts": round((start - self.origin) * 1e6),
+            "dur": round((end - start) * 1e6),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args or {},
+        })
+
+    def summary(self):
+        # name -> (count, total ms, max ms)
+        totals = {}
+        for event in self.events:
+            count, total, longest = totals.get(event["name"], (0, 0.0, 0.0))
+            duration = event["dur"] / 1000
+            totals[event["name"]] = (count + 1, total + duration, max(longest, duration))
+        return totals
+
+    def print_summary(self):
+        print(f"{'span':<32} {'count':>5} {'total ms':>10} {'max ms':>10}")
+        for name, (count, total, longest) in sorted(self.summary().items(), key=lambda item: -item[1][1]):
+            print(f"{name:<32} {count:>5} {total:>10.1f} {longest:>10.1f}")
+
+    def save(self):
+        trace = {
+            "traceEvents": self.events,
+            "displayTimeUnit": "ms",
+            "otherData": {"started_at": self.started_at, **self.metadata},
+        }
+        tmp_file = self.trace_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(trace, f)
+        os.replace(tmp_file, self.trace_file)
+
+    def finish(self):
+        # Called on exit, and explicitly before exec() replaces the process
+        if not self.enabled or self.finished:
+            return
+        self.finished = True
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.profile_file)
+            print(f"cProfile stats written to {self.profile_file}")
+        try:
+            self.save()
+        except OSError as e:
+            print(f"Failed to write trace: {e}")
+        else:
+            print(f"Trace written to {self.trace_file}")
+        self.print_summary()
+
+
+tracer = Tracer()
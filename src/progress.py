@@ -0,0 +1,46 @@
+import time
+
+
+class ProgressThrottle:
+    # Turns raw (done, total) byte counts into rate-limited (percent, bytes/s, eta) reports
+    def __init__(self, interval=0.1, smoothing=0.3):
+        self.interval = interval
+        # Weight of the newest sample in the throughput moving average
+        self.smoothing = smoothing
+        self.rate = None
+        self.last_time = None
+        self.last_done = 0
+        self.last_percent = -1
+
+    def update(self, done, total):
+        # Reports every interval seconds and on every whole-percent change in between; returns None
+        # when nothing should be reported yet
+        now = time.monotonic()
+        if self.last_time is None:
+            self.last_time = now
+            self.last_done = done
+
+        finished = bool(total) and done >= total
+        percent = int(100 * done / total) if total else 0
+        elapsed = now - self.last_time
+        if elapsed >= self.interval:
+            # The throughput is only sampled over whole intervals, shorter ones are too noisy
+            sample = (done - self.last_done) / elapsed
+            self.rate = sample if self.rate is None else self.smoothing * sample + (1 - self.smoothing) * self.rate
+            self.last_time = now
+            self.last_done = done
+        elif percent == self.last_percent and not finished:
+            return None
+        self.last_percent = percent
+
+        rate = self.rate or 0.0
+        eta = (total - done) / rate if total and rate > 0 else -1.0
+        return percent, rate, eta
+
+
+def format_progress(rate, eta):
+    text = f"{rate / (1024 * 1024):.1f} MiB/s"
+    if eta >= 0:
+        minutes, seconds = divmod(int(eta), 60)
+        text += f", {minutes}:{seconds:02d} left"
+    return text
@@ -0,0 +1,75 @@
+import json
+import os
+import time
+
+from persistence import write_atomic
+
+
+class ReleaseCache:
+    def __init__(self, cache_file=os.path.join("settings", "release_cache.json"), ttl=300):
+        self.cache_file = cache_file
+        # Seconds during which the cached body is used without asking GitHub at all
+        self.ttl = ttl
+        self.body = None
+        self.etag = None
+        self.last_modified = None
+        self.fetched_at = 0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_file, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        self.body = data.get("body")
+        self.etag = data.get("etag")
+        self.last_modified = data.get("last_modified")
+        self.fetched_at = data.get("fetched_at", 0)
+
+    def save(self):
+        data = {
+            "body": self.body,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "fetched_at": self.fetched_at,
+        }
+        try:
+            write_atomic(self.cache_file, json.dumps(data), backup=False)
+        except OSError as e:
+            print(f"Failed to save release cache: {e}")
+
+    def is_fresh(self):
+        return self.body is not None and time.time() - self.fetched_at < self.ttl
+
+    def fetch(self, url, timeout=5, cancelled=None):
+        # cancelled: threading.Event that makes a pending retry raise DownloadCancelled
+        if self.is_fresh():
+            return self.body
+
+        # Conditional request, a 304 does not count against the rate limit
+        headers = {}
+        if self.body is not None:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+
+        # Imported here so the launcher window does not wait for requests; fetch runs on a worker thread
+        from network import check_cancelled, shared_client
+
+        check_cancelled(cancelled)
+        client = shared_client()
+        response = client.get(url, cancelled, headers=headers, timeout=(min(client.timeout[0], timeout), timeout))
+        if response.status_code == 304 and self.body is not None:
+            self.fetched_at = time.time()
+            self.save()
+            return self.body
+
+        response.raise_for_status()
+        self.body = response.json()
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+        self.fetched_at = time.time()
+        self.save()
+        return self.body
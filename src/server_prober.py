@@ -0,0 +1,78 @@
+import asyncio
+import statistics
+import time
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+# Port of the Astonia login server, used when an address has no ":port" suffix
+DEFAULT_SERVER_PORT = 27584
+
+# Results are reused for this many seconds, e.g. when the add-character dialog is reopened
+CACHE_TTL = 30
+_cache = {}
+
+
+def split_address(address, default_port=DEFAULT_SERVER_PORT):
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and host:
+        return host, int(port)
+    return address, default_port
+
+
+async def probe_server(address, timeout=2.0, attempts=3):
+    # Opens `attempts` TCP connections one after another and returns reachability, RTT and jitter
+    host, port = split_address(address)
+    samples = []
+    error = None
+    for _ in range(attempts):
+        start = time.perf_counter()
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            error = str(e) or "timed out"
+            continue
+        samples.append((time.perf_counter() - start) * 1000)
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+    if not samples:
+        return {"reachable": False, "rtt_ms": None, "jitter_ms": None, "error": error}
+    return {
+        "reachable": True,
+        "rtt_ms": statistics.median(samples),
+        "jitter_ms": statistics.pstdev(samples) if len(samples) > 1 else 0.0,
+        "error": None,
+    }
+
+
+def cached_result(address):
+    entry = _cache.get(address)
+    if entry is not None and time.monotonic() - entry[0] < CACHE_TTL:
+        return entry[1]
+    return None
+
+
+class ServerProbeWorker(QThread):
+    # Emitted once per server as soon as its probe finishes
+    result_ready = pyqtSignal(str, dict)
+
+    def __init__(self, addresses, timeout=2.0, attempts=3, parent=None):
+        super().__init__(parent)
+        self.addresses = list(dict.fromkeys(addresses))
+        self.timeout = timeout
+        self.attempts = attempts
+
+    def run(self):
+        asyncio.run(self.probe_all())
+
+    async def probe_all(self):
+        async def probe(address):
+            result = await probe_server(address, self.timeout, self.attempts)
+            _cache[address] = (time.monotonic(), result)
+            self.result_ready.emit(address, result)
+
+        # All servers at once, so the slowest one bounds the total time
+        await asyncio.gather(*(probe(address) for address in self.addresses))
@@ -1,5 +1,3 @@
-import json
-
 from PyQt5.QtWidgets import (
     QDialog,
     QSpinBox,
@@ -10,11 +8,37 @@ from PyQt5.QtWidgets import (
     QPushButton,
 )
 
+from settings_model import FIELDS, Settings
+
 
 class SettingsDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
 
+        # The launcher reads the saved values; the widgets are only built when the dialog is first opened
+        self.settings_file = "settings/settings.json"
+        self.settings = Settings()
+        self.widgets_built = False
+
+    def value(self, name):
+        return getattr(self.settings, name)
+
+    def show(self):
+        self.ensure_widgets()
+        super().show()
+
+    def exec_(self):
+        self.ensure_widgets()
+        return super().exec_()
+
+    def ensure_widgets(self):
+        if not self.widgets_built:
+            self.build_widgets()
+            self.widgets_built = True
+        # Unsaved edits from a cancelled session are discarded
+        self.load_widgets()
+
+    def build_widgets(self):
         # Create widgets for all settings
         self.desired_width = QSpinBox()
         self.desired_height = QSpinBox()
@@ -37,13 +61,28 @@ class SettingsDialog(QDialog):
         self.sdl_frames = QSpinBox()
         self.sdl_cache_size = QSpinBox()
         self.sdl_multi = QSpinBox()
+        self.release_cache_ttl = QSpinBox()
+        self.download_connections = QSpinBox()
+        self.download_chunk_size = QSpinBox()
+        self.enable_streaming_install = QCheckBox()
+        self.launch_concurrency = QSpinBox()
+        self.launch_stagger = QSpinBox()
+        self.enable_wine_warm_start = QCheckBox()  # Keep a persistent wineserver running
+        self.wine_prefix = QLineEdit()  # Empty uses wine's default prefix
+        self.download_bandwidth_limit = QSpinBox()
+        self.update_mirrors = QLineEdit()  # LAN mirrors tried before GitHub
+        self.enable_background_updates = QCheckBox()
+        self.background_check_interval = QSpinBox()
+        self.background_bandwidth_limit = QSpinBox()
+        self.keep_versions = QSpinBox()
+        self.versions_disk_budget = QSpinBox()
+        self.enable_launch_warmup = QCheckBox()
+        self.launch_warmup_budget = QSpinBox()
 
-        # Set up limitations on fields
-        self.desired_width.setRange(800, 5000)
-        self.desired_height.setRange(600, 5000)
-        self.sdl_frames.setRange(24, 60)  # Assuming upper limit for frames
-        self.sdl_cache_size.setRange(8000, 16000)
-        self.sdl_multi.setRange(4, 10)  # Assuming a realistic upper limit
+        # Set up limitations on fields, the ranges live in the settings schema
+        for field in FIELDS:
+            if field.type is int:
+                getattr(self, field.name).setRange(field.minimum, field.maximum)
 
         # Create layout for settings
         layout = QGridLayout()
@@ -52,8 +91,8 @@ class SettingsDialog(QDialog):
         # Buttons
         self.save_button = QPushButton("Save")
         self.cancel_button = QPushButton("Cancel")
-        layout.addWidget(self.save_button, 21, 0)
-        layout.addWidget(self.cancel_button, 21, 1)
+        layout.addWidget(self.save_button, 38, 0)
+        layout.addWidget(self.cancel_button, 38, 1)
 
         # Signals
         self.save_button.clicked.connect(self.save_settings_to_file)
@@ -84,6 +123,23 @@ class SettingsDialog(QDialog):
             (self.sdl_frames, "SDL Frames:", 18),
             (self.sdl_cache_size, "SDL Cache Size:", 19),
             (self.sdl_multi, "SDL Multi-threading:", 20),
+            (self.release_cache_ttl, "Update Check Interval (s):", 21),
+            (self.download_connections, "Download Connections:", 22),
+            (self.download_chunk_size, "Download Chunk Size (MiB):", 23),
+            (self.enable_streaming_install, "Extract While Downloading:", 24),
+            (self.launch_concurrency, "Simultaneous Client Starts:", 25),
+            (self.launch_stagger, "Client Start Stagger (s):", 26),
+            (self.enable_wine_warm_start, "Wine Warm Start:", 27),
+            (self.wine_prefix, "Wine Prefix:", 28),
+            (self.download_bandwidth_limit, "Bandwidth Limit (KiB/s, 0 = off):", 29),
+            (self.update_mirrors, "Update Mirrors (URLs):", 30),
+            (self.enable_background_updates, "Download Updates in Background:", 31),
+            (self.background_check_interval, "Background Check Interval (s):", 32),
+            (self.background_bandwidth_limit, "Background Bandwidth (KiB/s, 0 = off):", 33),
+            (self.keep_versions, "Installed Versions Kept:", 34),
+            (self.versions_disk_budget, "Versions Disk Budget (MiB, 0 = off):", 35),
+            (self.enable_launch_warmup, "Preload Client Files Before Launch:", 36),
+            (self.launch_warmup_budget, "Preload Time Budget (s):", 37),
         ]
         for widget, label, row in widgets:
             layout.addWidget(QLabel(label), row, 0)
@@ -92,34 +148,38 @@ class SettingsDialog(QDialog):
     def cancel(self):
         self.close()
 
+    def widget_value(self, widget):
+        if isinstance(widget, QSpinBox):
+            return widget.value()
+        if isinstance(widget, QCheckBox):
+            return widget.isChecked()
+        return widget.text()
+
+    def load_widgets(self):
+        for field in FIELDS:
+            widget = getattr(self, field.name)
+            value = getattr(self.settings, field.name)
+            if isinstance(widget, QCheckBox):
+                widget.setChecked(value)
+            elif isinstance(widget, QSpinBox):
+                widget.setValue(value)
+            elif isinstance(widget, QLineEdit):
+                widget.setText(value)
+
     def save_settings_to_file(self):
-        settings_dict = {name: getattr(self, name).value() if isinstance(getattr(self, name), QSpinBox)
-        else getattr(self, name).isChecked() if isinstance(getattr(self, name), QCheckBox)
-        else getattr(self, name).text()
-                         for name in self.__dict__ if not name.startswith('__') and not callable(getattr(self, name))}
+        # Only changed fields are written to the model, each keeping the option mask current
+        for field in FIELDS:
+            value = self.widget_value(getattr(self, field.name))
+            if value != getattr(self.settings, field.name):
+                setattr(self.settings, field.name, value)
 
         try:
-            with open("settings/settings.json", "w") as f:
-                json.dump(settings_dict, f)
+            self.settings.save(self.settings_file)
         except Exception as e:
             print(f"Failed to save settings: {e}")
         else:
             self.close()
 
     def load_settings_from_file(self):
-        try:
-            with open("settings/settings.json", "r") as f:
-                settings_dict = json.load(f)
-            for key, value in settings_dict.items():
-                widget = getattr(self, key, None)
-                if widget:
-                    if isinstance(widget, QCheckBox):
-                        widget.setChecked(value)
-                    elif isinstance(widget, QSpinBox):
-                        widget.setValue(value)
-                    elif isinstance(widget, QLineEdit):
-                        widget.setText(value)
-        except FileNotFoundError:
-            print("Settings file not found, loading defaults.")
-        except json.JSONDecodeError:
-            print("Error decoding settings, check file format.")
+        # Plain JSON parsing and migration, cheap enough for startup; no widgets are touched
+        self.settings = Settings.load(self.settings_file)
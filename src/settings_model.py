@@ -0,0 +1,169 @@
+import json
+
+from persistence import read_json, writer
+
+# Bumped whenever a setting is renamed, removed or changes meaning; see MIGRATIONS
+SCHEMA_VERSION = 2
+
+
+class Field:
+    __slots__ = ("name", "type", "default", "minimum", "maximum", "bit", "width")
+
+    def __init__(self, name, type, default, minimum=None, maximum=None, bit=None, width=1):
+        self.name = name
+        self.type = type
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        # Position and width of the field in the client's -o option mask, None if it is not an option
+        self.bit = bit
+        self.width = width
+
+    def coerce(self, value):
+        # Returns value converted to the field's type, or raises ValueError
+        if self.type is bool:
+            if isinstance(value, bool):
+                return value
+            if value in (0, 1):
+                return bool(value)
+        elif self.type is int:
+            if isinstance(value, int) and not isinstance(value, bool):
+                return min(max(value, self.minimum), self.maximum)
+        elif isinstance(value, str):
+            return value
+        raise ValueError(f"Invalid value for {self.name}: {value!r}")
+
+    def mask(self):
+        return ((1 << self.width) - 1) << self.bit
+
+
+FIELDS = [
+    Field("desired_width", int, 800, 800, 5000),
+    Field("desired_height", int, 600, 600, 5000),
+    Field("enable_fullscreen", bool, False),
+    Field("enable_true_full_screen", bool, False, bit=8),
+    Field("enable_sound", bool, False, bit=6),
+    Field("enable_dark_gui", bool, False, bit=0),
+    Field("enable_context", bool, False, bit=1),
+    Field("enable_keybindings", bool, False, bit=2),
+    Field("enable_smaller_bottom_window", bool, False, bit=3),
+    Field("enable_smaller_top_window", bool, False, bit=4),
+    Field("enable_big_health_bar", bool, False, bit=5),
+    Field("enable_large_font", bool, False, bit=7),
+    Field("enable_legacy_mouse_wheel", bool, False, bit=9),
+    # The client reads gamma as a level in bits 14-15, the checkbox selects level 1
+    Field("enable_gamma_increase", bool, False, bit=14, width=2),
+    Field("enable_minimap_management", bool, False, bit=13),
+    Field("enable_minimap", bool, False, bit=18),
+    Field("enable_appdata_usage", bool, False, bit=12),
+    Field("executable_name", str, ""),
+    Field("sdl_frames", int, 24, 24, 60),  # Assuming upper limit for frames
+    Field("sdl_cache_size", int, 8000, 8000, 16000),
+    Field("sdl_multi", int, 4, 4, 10),  # Assuming a realistic upper limit
+    Field("release_cache_ttl", int, 300, 0, 86400),  # Seconds, 0 always asks GitHub
+    Field("download_connections", int, 4, 1, 16),  # Parallel range requests per download
+    Field("download_chunk_size", int, 4, 1, 64),  # MiB per range request
+    Field("download_bandwidth_limit", int, 0, 0, 1024 * 1024),  # KiB/s over all connections, 0 is unlimited
+    Field("enable_streaming_install", bool, True),  # Extract while downloading
+    Field("launch_concurrency", int, 2, 1, 16),  # Clients starting at the same time
+    Field("launch_stagger", int, 5, 0, 60),  # Seconds a client counts as starting
+    Field("enable_wine_warm_start", bool, False),  # Keep a persistent wineserver running
+    Field("wine_prefix", str, ""),  # Empty uses wine's default prefix
+    Field("enable_background_updates", bool, False),  # Poll for releases and stage them while the launcher runs
+    Field("background_check_interval", int, 3600, 300, 86400),  # Seconds between polls, jittered by 20%
+    Field("background_bandwidth_limit", int, 256, 0, 1024 * 1024),  # KiB/s for staging, 0 is unlimited
+    Field("update_mirrors", str, ""),  # Mirror base URLs separated by spaces or commas, tried before GitHub
+    Field("keep_versions", int, 3, 1, 50),  # Installed versions kept for switching back
+    Field("versions_disk_budget", int, 0, 0, 1024 * 1024),  # MiB for all installed versions, 0 is unlimited
+    Field("enable_launch_warmup", bool, False),  # Read client files into the page cache before a launch
+    Field("launch_warmup_budget", int, 5, 1, 60),  # Seconds the warm-up may take
+]
+FIELDS_BY_NAME = {field.name: field for field in FIELDS}
+OPTION_FIELDS = [field for field in FIELDS if field.bit is not None]
+
+
+def migrate_v1(data):
+    # Version 1 was a flat dump of every SettingsDialog attribute, including the button labels.
+    # Unknown keys are dropped and values that do not fit their field fall back to the default.
+    migrated = {}
+    for name, value in data.items():
+        field = FIELDS_BY_NAME.get(name)
+        if field is None:
+            continue
+        try:
+            migrated[name] = field.coerce(value)
+        except ValueError:
+            print(f"Ignoring invalid setting {name}={value!r}")
+    migrated["version"] = 2
+    return migrated
+
+
+# version -> function upgrading a settings dict of that version to the next one
+MIGRATIONS = {
+    1: migrate_v1,
+}
+
+
+def migrate(data):
+    version = data.get("version", 1)
+    if version > SCHEMA_VERSION:
+        # Written by a newer launcher; known fields are still read, unknown ones ignored
+        print(f"Settings version {version} is newer than {SCHEMA_VERSION}")
+        return data
+    while version < SCHEMA_VERSION:
+        data = MIGRATIONS[version](data)
+        version = data["version"]
+    return data
+
+
+class Settings:
+    # One slot per field plus the derived option mask, which every setattr keeps up to date
+    __slots__ = tuple(field.name for field in FIELDS) + ("options_mask",)
+
+    def __init__(self, **values):
+        object.__setattr__(self, "options_mask", 0)
+        for field in FIELDS:
+            setattr(self, field.name, values.get(field.name, field.default))
+
+    def __setattr__(self, name, value):
+        field = FIELDS_BY_NAME.get(name)
+        if field is None:
+            raise AttributeError(f"Unknown setting {name}")
+        value = field.coerce(value)
+        object.__setattr__(self, name, value)
+        if field.bit is not None:
+            # Only this field's bits change, the launch reads the finished mask
+            mask = (self.options_mask & ~field.mask()) | ((int(value) << field.bit) & field.mask())
+            object.__setattr__(self, "options_mask", mask)
+
+    def to_dict(self):
+        data = {"version": SCHEMA_VERSION}
+        for field in FIELDS:
+            data[field.name] = getattr(self, field.name)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        data = migrate(data)
+        settings = cls()
+        for name, value in data.items():
+            if name in FIELDS_BY_NAME:
+                try:
+                    setattr(settings, name, value)
+                except ValueError:
+                    print(f"Ignoring invalid setting {name}={value!r}")
+        return settings
+
+    @classmethod
+    def load(cls, settings_file):
+        try:
+            return cls.from_dict(read_json(settings_file))
+        except FileNotFoundError:
+            print("Settings file not found, loading defaults.")
+        except ValueError:
+            print("Error decoding settings, check file format.")
+        return cls()
+
+    def save(self, settings_file):
+        # Written atomically within half a second, together with any other pending settings files
+        writer.write(settings_file, json.dumps(self.to_dict()))
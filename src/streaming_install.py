@@ -0,0 +1,321 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import struct
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
+
+import requests
+
+from downloader import DownloadCancelled
+from manifest import move_tree, safe_path
+
+LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+# Unwanted bytes between two wanted entries that are read rather than split into two requests
+MAX_BATCH_GAP = 64 * 1024
+END_OF_CENTRAL_DIRECTORY = b"PK\x05\x06"
+
+
+class UnsupportedArchive(Exception):
+    # The asset cannot be installed in streaming mode, use download-then-extract instead
+    pass
+
+
+class _TailFile(io.RawIOBase):
+    # Seekable view of a remote file of which only the bytes from `start` onwards are known
+    def __init__(self, size, start, data):
+        self.size = size
+        self.start = start
+        self.data = data
+        self.position = 0
+
+    def seekable(self):
+        return True
+
+    def readable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.position = offset
+        return self.position
+
+    def read(self, n=-1):
+        if self.position < self.start:
+            raise OSError("Read outside of the fetched part of the archive")
+        begin = self.position - self.start
+        end = len(self.data) if n is None or n < 0 else begin + n
+        data = self.data[begin:end]
+        self.position += len(data)
+        return data
+
+
+class _StreamReader:
+    # Exact-size reads on top of a streamed response body
+    def __init__(self, client, response, read_size, cancelled, on_received):
+        self.chunks = client.iter_content(response, read_size, cancelled)
+        self.buffer = b""
+        self.cancelled = cancelled
+        self.on_received = on_received
+
+    def read(self, n):
+        while len(self.buffer) < n:
+            if self.cancelled.is_set():
+                raise DownloadCancelled()
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                raise requests.exceptions.RequestException("Archive stream ended early")
+            self.buffer += chunk
+            self.on_received(len(chunk))
+        data, self.buffer = self.buffer[:n], self.buffer[n:]
+        return data
+
+
+class StreamingInstaller:
+    def __init__(self, downloader, staging_dir=".update_staging", manifest=None):
+        # Network settings, the network client and cancellation are shared with the RangedDownloader
+        self.downloader = downloader
+        self.staging_dir = staging_dir
+        self.journal_file = os.path.join(staging_dir, ".journal.json")
+        # With an InstallManifest only entries that differ from the installed files are fetched
+        self.manifest = manifest
+        self.hashes = {}
+        self._lock = threading.Lock()
+        self._received = 0
+
+    def cancel(self):
+        self.downloader.cancel()
+
+    def install(self, url, target_dir=".", progress_callback=None):
+        # progress_callback(done, total) is always called from the calling thread
+        planned = self.stage(url, progress_callback)
+        self.commit(target_dir)
+        return planned
+
+    def stage(self, url, progress_callback=None, reuse=None):
+        # Fetches and checks every changed entry into staging_dir; the installed files are not touched.
+        # reuse(entries) may put unchanged files in place first (e.g. links to another version).
+        downloader = self.downloader
+        downloader.start_transfer()
+        final_url, total, validator = downloader.probe(url)
+        if validator is None or total is None:
+            raise UnsupportedArchive("Server does not support range requests")
+
+        entries, cd_offset = self.read_central_directory(final_url, total)
+        entry_ends = {
+            info.header_offset: entries[index + 1].header_offset if index + 1 < len(entries) else cd_offset
+            for index, info in enumerate(entries)
+        }
+        if self.manifest is not None:
+            self.manifest.set_release(entries)
+            if reuse is not None:
+                reuse(entries)
+            changed = set(self.manifest.find_changed([(info.filename, info.file_size, info.CRC) for info in entries]))
+            entries = [info for info in entries if info.filename in changed]
+        batches = self.plan_batches(entries, entry_ends)
+        done_batches = self.open_staging(validator)
+
+        planned = sum(end - start + 1 for start, end, _ in batches)
+        staged = sum(end - start + 1 for start, end, _ in batches if start in done_batches)
+        self._received = 0
+        if progress_callback:
+            progress_callback(staged, planned)
+
+        with ThreadPoolExecutor(max_workers=downloader.concurrency) as executor:
+            futures = {
+                executor.submit(self.install_batch, final_url, validator, batch): batch
+                for batch in batches
+                if batch[0] not in done_batches
+            }
+            pending = set(futures)
+            try:
+                while pending:
+                    done, pending = wait(pending, timeout=0.1, return_when=FIRST_EXCEPTION)
+                    for future in done:
+                        if future.exception() is not None:
+                            raise future.exception()
+                        done_batches.add(futures[future][0])
+                    if done:
+                        self.save_journal(validator, done_batches)
+                    if progress_callback:
+                        progress_callback(staged + self._received, planned)
+            finally:
+                downloader.stopping.set()
+                for future in pending:
+                    future.cancel()
+                executor.shutdown(wait=True)
+        return planned
+
+    def commit(self, target_dir="."):
+        # Every entry is complete and CRC-checked before anything in target_dir changes
+        self.swap_into_place(target_dir)
+        if self.manifest is not None:
+            for name, (crc, blake2) in self.hashes.items():
+                self.manifest.record(name, crc, blake2)
+            self.manifest.save()
+
+    def read_central_directory(self, url, total):
+        tail_start = max(0, total - (65535 + 22))
+        tail = self.fetch(url, tail_start, total - 1)
+
+        eocd = tail.rfind(END_OF_CENTRAL_DIRECTORY)
+        if eocd < 0 or len(tail) - eocd < 22:
+            raise UnsupportedArchive("End of central directory not found")
+        cd_size, cd_offset = struct.unpack("<II", tail[eocd + 12:eocd + 20])
+        if cd_offset == 0xFFFFFFFF:
+            raise UnsupportedArchive("ZIP64 archives are not streamed")
+        if cd_offset < tail_start:
+            tail = self.fetch(url, cd_offset, tail_start - 1) + tail
+            tail_start = cd_offset
+
+        with zipfile.ZipFile(_TailFile(total, tail_start, tail)) as archive:
+            entries = sorted(archive.infolist(), key=lambda info: info.header_offset)
+        for info in entries:
+            if info.flag_bits & 0x1:
+                raise UnsupportedArchive("Encrypted archives are not streamed")
+            if info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+                raise UnsupportedArchive(f"Unsupported compression in {info.filename}")
+        return entries, cd_offset
+
+    def fetch(self, url, start, end):
+        r = self.downloader.client.get(url, self.downloader.stopping, headers={"Range": f"bytes={start}-{end}"})
+        r.raise_for_status()
+        if r.status_code != 206:
+            raise UnsupportedArchive("Server ignored range request")
+        return r.content
+
+    def plan_batches(self, entries, entry_ends):
+        # Group neighbouring entries into spans of about chunk_size: (start, end, entries)
+        batches = []
+        current = []
+        for info in entries:
+            if current:
+                span_start = current[0].header_offset
+                span_end = entry_ends[current[-1].header_offset]
+                if (
+                        span_end - span_start >= self.downloader.chunk_size
+                        or info.header_offset - span_end > MAX_BATCH_GAP
+                ):
+                    batches.append((span_start, span_end - 1, current))
+                    current = []
+            current.append(info)
+        if current:
+            batches.append((current[0].header_offset, entry_ends[current[-1].header_offset] - 1, current))
+        return batches
+
+    def install_batch(self, url, validator, batch):
+        # A dropped connection restarts the batch; its entries are extracted again from the start
+        received = [0]
+
+        def attempt():
+            self.count_received(-received[0])
+            received[0] = 0
+            self.fetch_batch(url, validator, batch, received)
+
+        self.downloader.client.call_with_retries(attempt, self.downloader.stopping)
+
+    def fetch_batch(self, url, validator, batch, received):
+        start, end, entries = batch
+        downloader = self.downloader
+        headers = {"Range": f"bytes={start}-{end}"}
+        if not validator.startswith("W/"):
+            headers["If-Range"] = validator
+        with downloader.client.get(url, downloader.stopping, headers=headers, stream=True) as r:
+            r.raise_for_status()
+            if r.status_code != 206:
+                raise requests.exceptions.RequestException("Release asset changed during the update")
+
+            def on_received(size):
+                received[0] += size
+                self.count_received(size)
+
+            reader = _StreamReader(downloader.client, r, downloader.read_size, downloader.stopping, on_received)
+            position = start
+            for index, info in enumerate(entries):
+                next_offset = entries[index + 1].header_offset if index + 1 < len(entries) else end + 1
+                # Skip anything between entries, e.g. a data descriptor
+                reader.read(info.header_offset - position)
+                position = info.header_offset + self.extract_entry(reader, info)
+                if position > next_offset:
+                    raise zipfile.BadZipFile(f"Overlapping entries at {info.filename}")
+            reader.read(end + 1 - position)
+
+    def count_received(self, size):
+        with self._lock:
+            self._received += size
+
+    def extract_entry(self, reader, info):
+        # Returns the number of bytes the local header and data took up in the archive
+        header = LOCAL_HEADER.unpack(reader.read(LOCAL_HEADER.size))
+        if header[0] != b"PK\x03\x04":
+            raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+        name_length, extra_length = header[9], header[10]
+        reader.read(name_length + extra_length)
+        entry_size = LOCAL_HEADER.size + name_length + extra_length + info.compress_size
+
+        path = safe_path(self.staging_dir, info.filename)
+        if path is None or info.is_dir():
+            if path is not None:
+                os.makedirs(path, exist_ok=True)
+            reader.read(info.compress_size)
+            return entry_size
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.lexists(path):
+            # Never write through a hardlink shared with another installed version
+            os.remove(path)
+        decompressor = zlib.decompressobj(-15) if info.compress_type == zipfile.ZIP_DEFLATED else None
+        blake2 = hashlib.blake2b(digest_size=20)
+        crc = 0
+        size = 0
+        remaining = info.compress_size
+        with open(path, "wb") as f:
+            while remaining:
+                data = reader.read(min(remaining, self.downloader.read_size))
+                remaining -= len(data)
+                if decompressor is not None:
+                    data = decompressor.decompress(data)
+                    if not remaining:
+                        data += decompressor.flush()
+                crc = zlib.crc32(data, crc)
+                blake2.update(data)
+                size += len(data)
+                f.write(data)
+        if crc != info.CRC or size != info.file_size:
+            raise zipfile.BadZipFile(f"CRC or size mismatch for {info.filename}")
+        self.hashes[info.filename] = (crc, blake2.hexdigest())
+        return entry_size
+
+    def open_staging(self, validator):
+        # Returns the batches a previous, interrupted run already staged for this asset
+        try:
+            with open(self.journal_file, "r") as f:
+                journal = json.load(f)
+            if journal.get("validator") == validator:
+                return set(journal.get("done", []))
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+        os.makedirs(self.staging_dir)
+        return set()
+
+    def save_journal(self, validator, done_batches):
+        tmp_file = self.journal_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump({"validator": validator, "done": sorted(done_batches)}, f)
+        os.replace(tmp_file, self.journal_file)
+
+    def swap_into_place(self, target_dir):
+        if os.path.isfile(self.journal_file):
+            os.remove(self.journal_file)
+        move_tree(self.staging_dir, target_dir)
@@ -0,0 +1,340 @@
+import os
+import shutil
+import sys
+import time
+
+from PyQt5.QtCore import QObject, QProcess, QProcessEnvironment, QTimer, pyqtSignal
+from PyQt5.QtWidgets import (
+    QDialog,
+    QHeaderView,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+)
+
+from launcher_core import masked_command
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def sample_process(pid):
+    # Returns (cpu seconds, rss bytes) for pid, or None if it cannot be read
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            cpu = process.cpu_times()
+            return cpu.user + cpu.system, process.memory_info().rss
+        except psutil.Error:
+            return None
+    if sys.platform.startswith("linux"):
+        try:
+            with open(f"/proc/{pid}/stat", "r") as f:
+                # The command name may contain spaces, the fields we need follow the last ')'
+                fields = f.read().rpartition(")")[2].split()
+            with open(f"/proc/{pid}/statm", "r") as f:
+                resident_pages = int(f.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            return None
+        ticks = os.sysconf("SC_CLK_TCK")
+        cpu = (int(fields[11]) + int(fields[12])) / ticks
+        return cpu, resident_pages * os.sysconf("SC_PAGE_SIZE")
+    return None
+
+
+def open_files(pid):
+    # Paths of the regular files pid has open, or None if they cannot be read
+    if psutil is not None:
+        try:
+            return [f.path for f in psutil.Process(pid).open_files()]
+        except psutil.Error:
+            return None
+    if sys.platform.startswith("linux"):
+        paths = []
+        try:
+            for fd in os.listdir(f"/proc/{pid}/fd"):
+                try:
+                    paths.append(os.readlink(f"/proc/{pid}/fd/{fd}"))
+                except OSError:
+                    continue
+        except OSError:
+            return None
+        return [path for path in paths if path.startswith("/")]
+    return None
+
+
+# Seconds after a client's start during which its open files are sampled for the warm-up profile
+PROFILE_WINDOW = 60
+
+
+class SupervisedClient:
+    def __init__(self, name, command, env=None, cwd=None):
+        self.name = name
+        self.command = command
+        self.env = env
+        # The active version's directory, which the client's relative paths are resolved against
+        self.cwd = cwd
+        self.process = None
+        self.pid = None
+        self.started_at = None
+        self.finished_at = None
+        self.exit_code = None
+        self.state = "queued"
+        self.cpu_percent = None
+        self.rss = None
+        self.first_window_ms = None
+        # Absolute path -> seconds after the start when the client was first seen with it open
+        self.opened_files = {}
+        self._last_cpu = None
+        self._last_sample = None
+
+    def uptime(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+
+class ClientSupervisor(QObject):
+    # Emitted with the SupervisedClient whose state or statistics changed
+    client_changed = pyqtSignal(object)
+    client_started = pyqtSignal(object)
+    client_finished = pyqtSignal(object)
+
+    def __init__(self, max_starting=2, stagger=5.0, parent=None):
+        super().__init__(parent)
+        # At most max_starting clients are within `stagger` seconds of their start at any time
+        self.max_starting = max(1, max_starting)
+        self.stagger = stagger
+        self.clients = []
+        self.queue = []
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.tick)
+
+    def launch(self, name, command, env=None, cwd=None):
+        client = SupervisedClient(name, command, env, cwd)
+        self.clients.append(client)
+        self.queue.append(client)
+        self.client_changed.emit(client)
+        self.start_queued()
+        self.timer.start()
+        return client
+
+    def starting_count(self):
+        now = time.monotonic()
+        return sum(
+            1 for client in self.clients
+            if client.state == "running" and now - client.started_at < self.stagger
+        )
+
+    def start_queued(self):
+        while self.queue and self.starting_count() < self.max_starting:
+            self.start_client(self.queue.pop(0))
+
+    def start_client(self, client):
+        process = QProcess(self)
+        process.setProcessChannelMode(QProcess.ForwardedChannels)
+        if client.env is not None:
+            environment = QProcessEnvironment()
+            for key, value in client.env.items():
+                environment.insert(key, value)
+            process.setProcessEnvironment(environment)
+        if client.cwd is not None:
+            process.setWorkingDirectory(client.cwd)
+        process.finished.connect(lambda exit_code, exit_status: self.on_finished(client, exit_code))
+        process.errorOccurred.connect(lambda error: self.on_error(client, error))
+        client.process = process
+        client.state = "running"
+        client.started_at = time.monotonic()
+        print("Command to execute:", ' '.join(masked_command(client.command)))
+        process.start(client.command[0], client.command[1:])
+        client.pid = process.processId() or None
+        self.client_changed.emit(client)
+        if client.pid is not None:
+            self.client_started.emit(client)
+
+    def on_finished(self, client, exit_code):
+        client.state = "exited"
+        client.exit_code = exit_code
+        client.finished_at = time.monotonic()
+        self.client_changed.emit(client)
+        self.client_finished.emit(client)
+        self.start_queued()
+
+    def on_error(self, client, error):
+        if error == QProcess.FailedToStart:
+            client.state = "failed"
+            client.pid = None
+            client.finished_at = time.monotonic()
+            self.client_changed.emit(client)
+            self.start_queued()
+
+    def tick(self):
+        self.start_queued()
+        now = time.monotonic()
+        for client in self.clients:
+            if client.state != "running" or client.pid is None:
+                continue
+            sample = sample_process(client.pid)
+            if sample is not None:
+                cpu, client.rss = sample
+                if client._last_cpu is not None:
+                    client.cpu_percent = 100 * (cpu - client._last_cpu) / (now - client._last_sample)
+                client._last_cpu, client._last_sample = cpu, now
+            if client.cwd is not None and client.uptime() < PROFILE_WINDOW:
+                for path in open_files(client.pid) or ():
+                    client.opened_files.setdefault(path, round(client.uptime(), 2))
+            self.client_changed.emit(client)
+        if not self.queue and all(client.state != "running" for client in self.clients):
+            self.timer.stop()
+
+    def running(self):
+        return [client for client in self.clients if client.state == "running"]
+
+    def terminate_all(self):
+        for client in self.queue:
+            client.state = "cancelled"
+            self.client_changed.emit(client)
+        self.queue.clear()
+        for client in self.running():
+            client.process.terminate()
+
+
+class FirstWindowProbe(QObject):
+    # Polls the window system until `pid` maps a window and reports the latency from `started_at`.
+    # Each query is an asynchronous QProcess, so the GUI thread never waits for xdotool or wmctrl.
+    first_window = pyqtSignal(float)
+    timed_out = pyqtSignal()
+
+    # Seconds a query may take before it is killed, as a hung window manager would otherwise stop the probe
+    query_timeout = 1.0
+
+    def __init__(self, pid, started_at, timeout=60, interval=100, parent=None):
+        super().__init__(parent)
+        self.pid = pid
+        self.started_at = started_at
+        self.timeout = timeout
+        self.command = self.window_command(pid)
+        # The query in flight and when it was started; at most one runs at a time
+        self.process = None
+        self.queried_at = None
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.poll)
+
+    @staticmethod
+    def window_command(pid):
+        if shutil.which("xdotool"):
+            return ["xdotool", "search", "--onlyvisible", "--pid", str(pid)]
+        if shutil.which("wmctrl"):
+            return ["wmctrl", "-lp"]
+        return None
+
+    def available(self):
+        return self.command is not None
+
+    def start(self):
+        if self.available():
+            self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+        if self.process is not None:
+            self.process.kill()
+
+    def poll(self):
+        now = time.monotonic()
+        if now - self.started_at > self.timeout:
+            self.stop()
+            self.timed_out.emit()
+            return
+        if self.process is not None:
+            if now - self.queried_at > self.query_timeout:
+                self.process.kill()
+            return
+        process = QProcess(self)
+        process.finished.connect(lambda exit_code, exit_status: self.on_query_finished(process))
+        process.errorOccurred.connect(lambda error: self.on_query_error(process, error))
+        self.process = process
+        self.queried_at = now
+        process.start(self.command[0], self.command[1:])
+
+    def on_query_error(self, process, error):
+        # A query that never started emits no finished signal
+        if error == QProcess.FailedToStart:
+            self.on_query_finished(process)
+
+    def on_query_finished(self, process):
+        if process is not self.process:
+            return
+        self.process = None
+        process.deleteLater()
+        if not self.timer.isActive():
+            return
+        output = bytes(process.readAllStandardOutput()).decode(errors="replace")
+        if self.command[0] == "wmctrl":
+            # Columns: window id, desktop, pid, host, title
+            found = any(line.split()[2:3] == [str(self.pid)] for line in output.splitlines())
+        else:
+            found = bool(output.strip())
+        if found:
+            self.timer.stop()
+            # The window was there when the query started
+            self.first_window.emit((self.queried_at - self.started_at) * 1000)
+
+
+class SupervisorDialog(QDialog):
+    columns = ["Character", "PID", "Status", "Uptime", "CPU", "Memory", "First Window"]
+
+    def __init__(self, supervisor, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Running Clients")
+        self.setMinimumWidth(520)
+        self.supervisor = supervisor
+        self.rows = {}
+
+        self.table = QTableWidget(0, len(self.columns))
+        self.table.setHorizontalHeaderLabels(self.columns)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+
+        self.stop_button = QPushButton("Stop All")
+        self.stop_button.clicked.connect(supervisor.terminate_all)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.table)
+        layout.addWidget(self.stop_button)
+        self.setLayout(layout)
+
+        for client in supervisor.clients:
+            self.update_client(client)
+        supervisor.client_changed.connect(self.update_client)
+
+    def update_client(self, client):
+        row = self.rows.get(id(client))
+        if row is None:
+            row = self.table.rowCount()
+            self.table.insertRow(row)
+            self.rows[id(client)] = row
+
+        if client.state == "exited":
+            status = f"exited ({client.exit_code})"
+        else:
+            status = client.state
+        minutes, seconds = divmod(int(client.uptime()), 60)
+        values = [
+            client.name,
+            str(client.pid or ""),
+            status,
+            f"{minutes}:{seconds:02d}" if client.started_at else "",
+            f"{client.cpu_percent:.0f}%" if client.cpu_percent is not None else "",
+            f"{client.rss / (1024 * 1024):.0f} MiB" if client.rss is not None else "",
+            f"{client.first_window_ms / 1000:.1f} s" if client.first_window_ms is not None else "",
+        ]
+        for column, value in enumerate(values):
+            self.table.setItem(row, column, QTableWidgetItem(value))
@@ -0,0 +1,42 @@
+import threading
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from launcher_core import LauncherError, fetch_release, release_for_version
+
+
+class ReleaseCheckWorker(QThread):
+    # Emitted with the parsed release JSON, or with an error message
+    release_found = pyqtSignal(dict)
+    check_failed = pyqtSignal(str)
+
+    def __init__(self, release_api_url, release_cache, timeout=5, version=None, parent=None):
+        super().__init__(parent)
+        self.release_api_url = release_api_url
+        self.release_cache = release_cache
+        self.timeout = timeout
+        # With a version, looks up that version's release instead of the latest one
+        self.version = version
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        # Ends the lookup before its next attempt; nothing is emitted then
+        self.cancelled.set()
+
+    def run(self):
+        # network, and with it requests, is only imported on this thread
+        from network import DownloadCancelled
+
+        try:
+            if self.version is not None:
+                release = release_for_version(self.release_cache, self.version, timeout=self.timeout,
+                                              cancelled=self.cancelled)
+            else:
+                release = fetch_release(self.release_cache, self.release_api_url, timeout=self.timeout,
+                                        cancelled=self.cancelled)
+        except DownloadCancelled:
+            return
+        except LauncherError as e:
+            self.check_failed.emit(str(e))
+            return
+        self.release_found.emit(release)
@@ -0,0 +1,103 @@
+import zipfile
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from downloader import DownloadCancelled
+from launcher_core import (
+    LauncherError,
+    fetch_release,
+    install_release,
+    make_background_downloader,
+    read_installed_version,
+    stage_release,
+    staged_version,
+)
+from progress import ProgressThrottle
+from streaming_install import UnsupportedArchive
+
+
+class UpdateWorker(QThread):
+    # Progress is reported every 100 ms and on each whole percent as (percent, bytes per second, eta in seconds)
+    progress = pyqtSignal(int, float, float)
+    update_finished = pyqtSignal()
+    update_failed = pyqtSignal(str)
+    update_cancelled = pyqtSignal()
+
+    def __init__(self, downloader, asset_url, release_file, version, streaming=True, mirrors=(), digest=None,
+                 parent=None):
+        super().__init__(parent)
+        self.downloader = downloader
+        self.asset_url = asset_url
+        self.release_file = release_file
+        self.version = version
+        self.streaming = streaming
+        self.mirrors = mirrors
+        self.digest = digest
+        self.throttle = ProgressThrottle()
+
+    def cancel(self):
+        self.downloader.cancel()
+
+    def report_progress(self, done, total):
+        state = self.throttle.update(done, total)
+        if state is not None:
+            self.progress.emit(*state)
+
+    def run(self):
+        try:
+            install_release(
+                self.downloader,
+                self.asset_url,
+                self.release_file,
+                self.version,
+                streaming=self.streaming,
+                progress_callback=self.report_progress,
+                mirrors=self.mirrors,
+                digest=self.digest,
+            )
+        except DownloadCancelled:
+            self.update_cancelled.emit()
+            return
+        # requests' exceptions derive from OSError
+        except (OSError, zipfile.BadZipFile, LauncherError) as e:
+            self.update_failed.emit(str(e))
+            return
+        self.update_finished.emit()
+
+
+class PrefetchWorker(QThread):
+    # Looks for a new release and installs it next to the active version without switching to it.
+    # Started with QThread.IdlePriority and a capped downloader, so it stays out of the way of a running game.
+    staged = pyqtSignal(str)
+
+    def __init__(self, release_api_url, release_cache, settings, timeout=10, parent=None):
+        super().__init__(parent)
+        self.release_api_url = release_api_url
+        self.release_cache = release_cache
+        self.settings = settings
+        self.timeout = timeout
+        # Built up front, so a cancel during the release lookup still stops the staging
+        self.downloader = make_background_downloader(settings)
+
+    def cancel(self):
+        self.downloader.cancel()
+
+    def run(self):
+        # Failures are only logged, the next poll tries again
+        try:
+            # Conditional request once the cached release is older than its TTL
+            release = fetch_release(self.release_cache, self.release_api_url, timeout=self.timeout,
+                                    cancelled=self.downloader.cancelled)
+            installed = read_installed_version()
+            version = release["tag_name"]
+            if installed is None or version == installed:
+                return
+            if staged_version(version) is None:
+                stage_release(self.downloader, release, self.settings)
+                print(f"Staged update {version}")
+        except DownloadCancelled:
+            return
+        except (OSError, zipfile.BadZipFile, LauncherError, UnsupportedArchive) as e:
+            print(f"Background update failed: {e}")
+            return
+        self.staged.emit(version)
@@ -0,0 +1,18 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from launcher_core import verify_files
+
+
+class VerifyWorker(QThread):
+    # Emitted with verify_files' result: (number of release files, damaged names), or None without a manifest
+    verified = pyqtSignal(object)
+    verify_failed = pyqtSignal(str)
+
+    def run(self):
+        # Hashes every file the manifest has no current entry for, seconds to minutes on a large install
+        try:
+            result = verify_files()
+        except OSError as e:
+            self.verify_failed.emit(str(e))
+            return
+        self.verified.emit(result)
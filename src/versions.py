@@ -0,0 +1,143 @@
+import os
+import re
+import shutil
+
+from manifest import InstallManifest
+
+# Each release lives in versions/<tag>/ with its own manifest. Release files are hardlinked into
+# versions/.objects/<blake2> and from one version to the next, so a file that did not change between
+# releases is stored once
+VERSIONS_DIR = "versions"
+MANIFEST_NAME = ".manifest.json"
+# Created when a version is complete; its mtime is the install time, which verify runs do not change
+INSTALLED_MARKER = ".installed"
+
+
+def version_dir_name(version):
+    # Tags become directory names; anything but a plain name is replaced
+    name = re.sub(r"[^A-Za-z0-9._+-]", "_", version)
+    return name if name.strip(".") else "_" + name
+
+
+def link_or_copy(source, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.lexists(path):
+        os.remove(path)
+    try:
+        os.link(source, path)
+    except OSError:
+        # No hardlinks on this filesystem (FAT, some network shares): same result, more disk
+        shutil.copy2(source, path)
+
+
+class VersionStore:
+    def __init__(self, root=VERSIONS_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, ".objects")
+
+    def path(self, version):
+        return os.path.join(self.root, version_dir_name(version))
+
+    def staging_path(self, version):
+        # Renamed to path(version) once complete; kept across runs so an interrupted install resumes
+        return os.path.join(self.root, f".{version_dir_name(version)}.partial")
+
+    def manifest(self, directory):
+        return InstallManifest(os.path.join(directory, MANIFEST_NAME), directory)
+
+    def has(self, version):
+        return os.path.isfile(os.path.join(self.path(version), INSTALLED_MARKER))
+
+    def versions(self):
+        # Complete versions, oldest install first
+        if not os.path.isdir(self.root):
+            return []
+        installed = []
+        for name in os.listdir(self.root):
+            marker = os.path.join(self.root, name, INSTALLED_MARKER)
+            if not name.startswith(".") and os.path.isfile(marker):
+                installed.append((os.path.getmtime(marker), name))
+        return [name for _, name in sorted(installed)]
+
+    def object_path(self, blake2):
+        return os.path.join(self.objects_dir, blake2[:2], blake2)
+
+    def add_to_store(self, path, blake2):
+        # Makes path, whose content was just verified, the stored object for blake2. An existing object
+        # is replaced rather than trusted: if it is a damaged file of an older version, versions still
+        # linking to it keep their copy and Verify / Repair finds it there.
+        target = self.object_path(blake2)
+        try:
+            if os.path.isfile(target) and os.path.samefile(target, path):
+                return
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.link(path, target + ".tmp")
+            os.replace(target + ".tmp", target)
+        except OSError as e:
+            print(f"Not deduplicating {path}: {e}")
+
+    def carry_over(self, base_dir, release_names, staging, roots=None):
+        # Copies the files the client created next to its release files (config, keybindings, logs)
+        # from base_dir into the new version; roots limits the walk to these subdirectories
+        release_names = set(release_names) | {MANIFEST_NAME, INSTALLED_MARKER}
+        for top in roots if roots is not None else [""]:
+            for root, dirs, files in os.walk(os.path.join(base_dir, top)):
+                for name in files:
+                    source = os.path.join(root, name)
+                    relative = os.path.relpath(source, base_dir).replace(os.sep, "/")
+                    path = os.path.join(staging, relative)
+                    if relative in release_names or os.path.lexists(path):
+                        continue
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    shutil.copy2(source, path)
+
+    def finish(self, staging, version):
+        # The rename is the commit: a version directory either is complete or does not exist
+        target = self.path(version)
+        open(os.path.join(staging, INSTALLED_MARKER), "w").close()
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        os.replace(staging, target)
+        return target
+
+    def remove(self, version):
+        shutil.rmtree(self.path(version), ignore_errors=True)
+
+    def disk_usage(self):
+        # Bytes used by the store, each hardlinked file counted once
+        seen = set()
+        total = 0
+        for root, dirs, files in os.walk(self.root):
+            for name in files:
+                stat = os.lstat(os.path.join(root, name))
+                if (stat.st_dev, stat.st_ino) not in seen:
+                    seen.add((stat.st_dev, stat.st_ino))
+                    total += stat.st_size
+        return total
+
+    def gc(self, keep_versions, protected=(), budget_bytes=0):
+        # Removes the oldest versions beyond keep_versions, then more while the store exceeds
+        # budget_bytes (0 is no budget); protected versions (active, previous) always stay.
+        # Returns the removed versions.
+        protected = {version_dir_name(version) for version in protected if version}
+        candidates = [name for name in self.versions() if name not in protected]
+        removed = []
+        while candidates and len(self.versions()) > keep_versions:
+            removed.append(candidates.pop(0))
+            self.remove(removed[-1])
+        self.prune_objects()
+        while candidates and budget_bytes and self.disk_usage() > budget_bytes:
+            removed.append(candidates.pop(0))
+            self.remove(removed[-1])
+            self.prune_objects()
+        return removed
+
+    def prune_objects(self):
+        # An object with a link count of 1 is no longer part of any version
+        if not os.path.isdir(self.objects_dir):
+            return
+        for root, dirs, files in os.walk(self.objects_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                if os.stat(path).st_nlink <= 1:
+                    os.remove(path)
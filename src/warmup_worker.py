@@ -0,0 +1,20 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from launcher_core import warm_up_client
+
+
+class WarmupWorker(QThread):
+    # Emitted with the warm-up report; an empty dict if the warm-up failed, the launch goes ahead either way
+    warmed = pyqtSignal(dict)
+
+    def __init__(self, settings, parent=None):
+        super().__init__(parent)
+        self.settings = settings
+
+    def run(self):
+        try:
+            report = warm_up_client(self.settings)
+        except OSError as e:
+            print(f"Warm-up failed: {e}")
+            report = {}
+        self.warmed.emit(report)
@@ -0,0 +1,45 @@
+import json
+import os
+import shutil
+import subprocess
+
+from persistence import write_atomic
+
+
+def wine_environment(prefix=""):
+    # Environment for wine and wineserver, with WINEPREFIX set when a prefix is configured
+    env = dict(os.environ)
+    if prefix:
+        env["WINEPREFIX"] = os.path.expanduser(prefix)
+    return env
+
+
+def start_persistent_wineserver(prefix=""):
+    # `wineserver -p` keeps running after the last client exits, so later launches skip prefix start-up.
+    # If one is already running for the prefix, the new one exits immediately.
+    wineserver = shutil.which("wineserver")
+    if wineserver is None:
+        print("wineserver not found, warm start disabled")
+        return None
+    try:
+        return subprocess.Popen(
+            [wineserver, "-p"],
+            env=wine_environment(prefix),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+    except OSError as e:
+        print(f"Failed to start wineserver: {e}")
+        return None
+
+
+def record_launch(launch_times_file, entry, keep=200):
+    # Appends one launch measurement, keeping the newest `keep` entries
+    try:
+        with open(launch_times_file, "r") as f:
+            launches = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        launches = []
+    launches.append(entry)
+    write_atomic(launch_times_file, json.dumps(launches[-keep:]), backup=False)
@@ -0,0 +1,119 @@
+import hashlib
+import io
+import os
+import shutil
+import sys
+import time
+import zipfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The launcher modules import each other by their plain names, as when run from src/;
+# benchmarks/ has the local asset server the network tests run against
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PyQt5.QtCore import QCoreApplication
+
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+@pytest.fixture
+def wait_until(qapp):
+    # Runs the Qt event loop until condition() is true; False after timeout seconds
+    def wait(condition, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                return False
+            qapp.processEvents()
+            time.sleep(0.01)
+        return True
+
+    return wait
+
+
+@pytest.fixture
+def stub_bin(tmp_path, monkeypatch):
+    # Puts executable shell scripts first on PATH: stub_bin("name", "script body")
+    directory = tmp_path / "bin"
+    directory.mkdir()
+    monkeypatch.setenv("PATH", f"{directory}{os.pathsep}{os.environ['PATH']}")
+
+    def make(name, body):
+        path = directory / name
+        path.write_text("#!/bin/sh\n" + body + "\n")
+        path.chmod(0o755)
+        return str(path)
+
+    return make
+
+
+@pytest.fixture
+def launcher_dir(tmp_path, monkeypatch):
+    # An empty launcher directory as the working directory, as the launcher runs from its own
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("settings")
+    return tmp_path
+
+
+@pytest.fixture(scope="session")
+def release_archive():
+    # (bytes, SHA-256) of a release archive with the entries client/0.bin to client/2.bin
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for i in range(3):
+            archive.writestr(f"client/{i}.bin", os.urandom(512 * 1024))
+    data = buffer.getvalue()
+    return data, hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture
+def make_downloader():
+    # make_downloader(**kwargs): a RangedDownloader for the local servers, with small ranges and short backoffs
+    from downloader import RangedDownloader
+    from network import HttpClient
+
+    def make(concurrency=2, chunk_size=256 * 1024, backoff=0.01, retries=4):
+        client = HttpClient(retries=retries, backoff=backoff)
+        return RangedDownloader(concurrency=concurrency, chunk_size=chunk_size, client=client)
+
+    return make
+
+
+class CopyDownloader:
+    # Stands in for RangedDownloader: the "url" is a local archive
+    client = None
+    cancelled = None
+
+    def download(self, url, path, progress_callback=None, sha256=None):
+        shutil.copy(url, path)
+
+
+@pytest.fixture
+def make_release():
+    # make_release(path, {name: bytes}) writes a release archive and returns its SHA-256
+    def make(path, files):
+        with zipfile.ZipFile(path, "w") as archive:
+            for name, data in files.items():
+                archive.writestr(name, data)
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    return make
+
+
+@pytest.fixture
+def install():
+    # install(archive path, version, digest) installs a local archive as version, whole and not streamed
+    import launcher_core
+
+    def install_archive(archive, version, digest):
+        return launcher_core.install_release(CopyDownloader(), archive, "release.zip", version, streaming=False,
+                                             digest=digest)
+
+    return install_archive
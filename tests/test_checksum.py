@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+import launcher_core
+from downloader import ChecksumMismatch, DigestRecord, InlineDigest
+from launcher_core import LauncherError
+from local_server import FaultInjectingHandler, LocalAssetServer
+from manifest import InstallManifest
+
+
+def test_digest_is_computed_while_downloading(tmp_path, release_archive, make_downloader):
+    archive, digest = release_archive
+    path = str(tmp_path / "release.zip")
+    with LocalAssetServer(archive, handler=FaultInjectingHandler) as server:
+        downloader = make_downloader()
+        assert downloader.download(server.url, path, sha256=digest) == digest
+        assert DigestRecord(path).load() == digest
+        # Verified before, so not downloaded again
+        requests_before = len(server.httpd.requests)
+        assert downloader.download(server.url, path, sha256=digest) == digest
+        assert len(server.httpd.requests) == requests_before
+
+
+@pytest.mark.parametrize("truncated, supports_ranges, faults", [
+    # The first request of every download is the range probe
+    (False, True, [None, None, "corrupt"]),
+    (True, True, []),
+    (False, False, [None, "corrupt"]),
+    (True, False, []),
+], ids=["corrupted range", "truncated", "corrupted stream", "truncated stream"])
+def test_wrong_bodies_are_refused_and_removed(tmp_path, release_archive, make_downloader, truncated, supports_ranges,
+                                              faults):
+    archive, digest = release_archive
+    body = archive[:-4096] if truncated else archive
+    path = str(tmp_path / "release.zip")
+    with LocalAssetServer(body, handler=FaultInjectingHandler, supports_ranges=supports_ranges,
+                          faults=faults) as server:
+        with pytest.raises(ChecksumMismatch):
+            make_downloader().download(server.url, path, sha256=digest)
+    assert os.listdir(tmp_path) == []
+
+
+def test_short_file_is_reported_as_truncated(tmp_path, release_archive, make_downloader):
+    archive, digest = release_archive
+    path = str(tmp_path / "release.zip")
+    with open(path, "wb") as f:
+        f.write(archive[:1000])
+    inline = InlineDigest(path)
+    inline.update(0, archive[:1000])
+    with pytest.raises(ChecksumMismatch, match="got 1000 of"):
+        make_downloader().check(path, inline, len(archive), digest)
+    assert not os.path.exists(path)
+
+
+def test_nothing_is_extracted_from_a_corrupted_download(tmp_path, release_archive, make_downloader):
+    archive, digest = release_archive
+    install_dir = tmp_path / "install"
+    install_dir.mkdir()
+    path = str(tmp_path / "release.zip")
+    manifest = InstallManifest(str(tmp_path / "manifest.json"), str(install_dir))
+    with LocalAssetServer(archive, handler=FaultInjectingHandler, faults=[None, "corrupt"]) as server:
+        with pytest.raises(LauncherError):
+            launcher_core.download_and_extract(make_downloader(), [server.url], path, str(install_dir), manifest,
+                                               digest=digest)
+    assert os.listdir(install_dir) == []
+    assert not os.path.exists(path)
+    assert manifest.files == {}
+
+
+def test_verified_download_is_extracted(tmp_path, release_archive, make_downloader):
+    archive, digest = release_archive
+    install_dir = tmp_path / "install"
+    install_dir.mkdir()
+    path = str(tmp_path / "release.zip")
+    manifest = InstallManifest(str(tmp_path / "manifest.json"), str(install_dir))
+    with LocalAssetServer(archive, handler=FaultInjectingHandler, faults=["503", "drop"]) as server:
+        launcher_core.download_and_extract(make_downloader(), [server.url], path, str(install_dir), manifest,
+                                           digest=digest)
+    assert sorted(os.listdir(install_dir / "client")) == ["0.bin", "1.bin", "2.bin"]
+    assert not os.path.exists(path) and not os.path.exists(path + ".sha256.json")
@@ -0,0 +1,46 @@
+import io
+import json
+import os
+import time
+import zipfile
+
+import pytest
+
+import cli
+from local_server import LocalAssetServer
+
+
+def corrupt_archive():
+    # A stored entry with one byte flipped: the central directory reads fine, the CRC does not match
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        archive.writestr("client.dll", os.urandom(64 * 1024))
+    data = bytearray(buffer.getvalue())
+    data[30 + len("client.dll") + 1000] ^= 0xFF
+    return bytes(data)
+
+
+def seed_release(url):
+    # A fresh release cache, so update never asks GitHub
+    release = {"tag_name": "v1", "assets": [{"browser_download_url": url, "name": "release.zip"}]}
+    with open(os.path.join("settings", "release_cache.json"), "w") as f:
+        json.dump({"body": release, "fetched_at": time.time()}, f)
+
+
+@pytest.mark.parametrize("streaming, payload", [
+    (True, corrupt_archive()),
+    (False, corrupt_archive()),
+    (False, b"not a zip archive" * 1000),
+], ids=["streaming", "whole-archive", "not-a-zip"])
+def test_update_reports_a_damaged_archive_as_json(launcher_dir, capfd, streaming, payload):
+    with open(os.path.join("settings", "settings.json"), "w") as f:
+        json.dump({"enable_streaming_install": streaming}, f)
+
+    with LocalAssetServer(payload) as server:
+        seed_release(server.url)
+        assert cli.main(["update"]) == 1
+
+    result = json.loads(capfd.readouterr().out)
+    assert result["status"] == "error"
+    assert result["command_name"] == "update"
+    assert "Release archive is damaged" in result["error"]
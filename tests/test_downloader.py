@@ -0,0 +1,83 @@
+import hashlib
+import os
+
+import pytest
+
+from downloader import DownloadCancelled, DownloadJournal
+from local_server import FaultInjectingHandler, LocalAssetServer
+from streaming_install import StreamingInstaller
+
+PAYLOAD = os.urandom(3 * 1024 * 1024 + 17)
+
+
+def test_download_is_intact(tmp_path, make_downloader):
+    path = str(tmp_path / "asset.zip")
+    with LocalAssetServer(PAYLOAD, handler=FaultInjectingHandler) as server:
+        digest = make_downloader().download(server.url, path)
+    assert digest == hashlib.sha256(PAYLOAD).hexdigest()
+    with open(path, "rb") as f:
+        assert f.read() == PAYLOAD
+
+
+def test_cancel_before_the_download_is_kept(tmp_path, make_downloader):
+    # E.g. the window closed while the update was still looking for mirrors
+    downloader = make_downloader()
+    downloader.cancel()
+    with LocalAssetServer(PAYLOAD, handler=FaultInjectingHandler) as server:
+        with pytest.raises(DownloadCancelled):
+            downloader.download(server.url, str(tmp_path / "asset.zip"))
+        with pytest.raises(DownloadCancelled):
+            StreamingInstaller(downloader, str(tmp_path / "staging")).stage(server.url)
+        assert server.httpd.requests == []
+
+
+def test_finished_download_does_not_stop_the_next(tmp_path, make_downloader):
+    downloader = make_downloader()
+    with LocalAssetServer(PAYLOAD, handler=FaultInjectingHandler) as server:
+        downloader.download(server.url, str(tmp_path / "first.zip"))
+        downloader.download(server.url, str(tmp_path / "second.zip"))
+    with open(tmp_path / "second.zip", "rb") as f:
+        assert f.read() == PAYLOAD
+
+
+def interrupt(path, make_downloader):
+    # One range at a time and no retries: the first range completes, the second is cut off and ends the
+    # download. Returns the bytes the journal kept.
+    with LocalAssetServer(PAYLOAD, handler=FaultInjectingHandler, faults=[None, None, "drop"]) as server:
+        with pytest.raises(OSError):
+            make_downloader(concurrency=1, retries=0).download(server.url, path)
+    journal = DownloadJournal(path)
+    assert journal.load()
+    assert 0 < journal.completed() < len(PAYLOAD)
+    return journal.completed()
+
+
+def test_interrupted_download_resumes_from_the_journal(tmp_path, make_downloader):
+    path = str(tmp_path / "asset.zip")
+    kept = interrupt(path, make_downloader)
+
+    progress = []
+    with LocalAssetServer(PAYLOAD, handler=FaultInjectingHandler) as server:
+        digest = make_downloader().download(server.url, path, lambda done, total: progress.append(done))
+    # The first report is what the journal had, before anything was fetched
+    assert progress[0] == kept
+    assert digest == hashlib.sha256(PAYLOAD).hexdigest()
+    with open(path, "rb") as f:
+        assert f.read() == PAYLOAD
+    assert not os.path.exists(path + ".journal.json")
+
+
+def test_changed_asset_is_downloaded_from_the_start(tmp_path, make_downloader, capsys):
+    path = str(tmp_path / "asset.zip")
+    interrupt(path, make_downloader)
+
+    # Same size, other content, so only the ETag tells them apart
+    changed = os.urandom(len(PAYLOAD))
+    progress = []
+    with LocalAssetServer(changed, handler=FaultInjectingHandler) as server:
+        digest = make_downloader().download(server.url, path, lambda done, total: progress.append(done))
+    assert progress[0] == 0
+    assert "starting over" in capsys.readouterr().out
+    assert digest == hashlib.sha256(changed).hexdigest()
+    with open(path, "rb") as f:
+        assert f.read() == changed
@@ -0,0 +1,125 @@
+import io
+import os
+import threading
+import zipfile
+
+import pytest
+
+import launcher_core
+from local_server import FaultInjectingHandler, LocalAssetServer
+from mirror import AssetStore, MirrorServer, available_mirrors, mirror_urls, parse_range
+from network import HttpClient
+from settings_model import Settings
+
+
+@pytest.fixture
+def serve_mirror(tmp_path, release_archive):
+    # serve_mirror(content) starts a mirror whose store has content under the release archive's digest;
+    # returns its base URL
+    _, digest = release_archive
+    servers = []
+
+    def serve(content):
+        store = AssetStore(str(tmp_path / f"mirror{len(servers)}"))
+        partial = store.partial_path(digest)
+        with open(partial, "wb") as f:
+            f.write(content)
+        store.add(partial, digest)
+        server = MirrorServer(("127.0.0.1", 0), store)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return "http://%s:%d" % server.server_address
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-0", 100) == (0, 0)
+    assert parse_range("bytes=10-", 100) == (10, 99)
+    assert parse_range("bytes=90-200", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=100-", 100)
+
+
+def test_mirror_is_used_before_github(tmp_path, serve_mirror, release_archive, make_downloader):
+    archive, digest = release_archive
+    mirror = serve_mirror(archive)
+    path = str(tmp_path / "release.zip")
+    with LocalAssetServer(archive, handler=FaultInjectingHandler) as github:
+        downloader = make_downloader()
+        urls = available_mirrors(downloader.client, [mirror], digest) + [github.url]
+        assert launcher_core.download_verified(downloader, urls, path, digest) == mirror_urls([mirror], digest)[0]
+        assert github.httpd.requests == []
+    with open(path, "rb") as f:
+        assert f.read() == archive
+
+
+def test_mirror_with_wrong_bytes_is_skipped(tmp_path, serve_mirror, release_archive, make_downloader):
+    archive, digest = release_archive
+    tampered = bytearray(archive)
+    tampered[1000] ^= 0xFF
+    mirror = serve_mirror(bytes(tampered))
+    path = str(tmp_path / "release.zip")
+    with LocalAssetServer(archive, handler=FaultInjectingHandler) as github:
+        downloader = make_downloader()
+        urls = available_mirrors(downloader.client, [mirror], digest) + [github.url]
+        assert len(urls) == 2
+        assert launcher_core.download_verified(downloader, urls, path, digest) == github.url
+    with open(path, "rb") as f:
+        assert f.read() == archive
+
+
+def test_unavailable_mirrors_are_not_tried(serve_mirror, release_archive):
+    archive, digest = release_archive
+    mirror = serve_mirror(archive)
+    # Nothing listens on port 9 of localhost; the mirror has no asset with another digest
+    down = "http://127.0.0.1:9"
+    client = HttpClient()
+    assert available_mirrors(client, [down, mirror], digest) == mirror_urls([mirror], digest)
+    assert available_mirrors(client, [mirror], "0" * 64) == []
+
+
+def test_install_from_a_lying_mirror_falls_back_to_github(launcher_dir, serve_mirror, release_archive, make_downloader):
+    archive, digest = release_archive
+    mirror = serve_mirror(archive[:-10] + b"0123456789")
+    with LocalAssetServer(archive, handler=FaultInjectingHandler) as github:
+        directory = launcher_core.install_release(make_downloader(), github.url, "release.zip", "v1",
+                                                  mirrors=[mirror], digest=digest)
+    with zipfile.ZipFile(io.BytesIO(archive)) as release:
+        for name in release.namelist():
+            with open(os.path.join(directory, name), "rb") as f:
+                assert f.read() == release.read(name)
+    assert launcher_core.read_installed_version() == "v1"
+
+
+def release_json(url, digest):
+    return {"tag_name": "v2", "assets": [{"name": "release.zip", "browser_download_url": url,
+                                          "digest": f"sha256:{digest}"}]}
+
+
+def test_staging_uses_the_mirrors(launcher_dir, serve_mirror, release_archive, make_downloader):
+    archive, digest = release_archive
+    launcher_core.write_installed_version("v1")
+    settings = Settings(update_mirrors=serve_mirror(archive), enable_streaming_install=True)
+    with LocalAssetServer(archive, handler=FaultInjectingHandler) as github:
+        launcher_core.stage_release(make_downloader(), release_json(github.url, digest), settings)
+        assert github.httpd.requests == []
+    assert launcher_core.staged_version("v2") == "v2"
+    assert launcher_core.read_installed_version() == "v1"
+
+
+def test_staging_checks_the_listed_digest(launcher_dir, release_archive, make_downloader):
+    archive, digest = release_archive
+    launcher_core.write_installed_version("v1")
+    # Streaming extracts entries by their CRCs and cannot check the whole archive, so it is off here
+    settings = Settings(enable_streaming_install=False)
+    with LocalAssetServer(archive, handler=FaultInjectingHandler, faults=[None, "corrupt"]) as github:
+        with pytest.raises(launcher_core.LauncherError):
+            launcher_core.stage_release(make_downloader(), release_json(github.url, digest), settings)
+    assert launcher_core.staged_version("v2") is None
@@ -0,0 +1,108 @@
+import os
+
+import pytest
+import requests
+
+from downloader import RangedDownloader
+from local_server import FaultInjectingHandler, LocalAssetServer
+from network import HttpClient, parse_retry_after
+
+PAYLOAD = os.urandom(2 * 1024 * 1024 + 5)
+
+
+def download(server, path, client, concurrency=4, chunk_size=512 * 1024):
+    RangedDownloader(concurrency=concurrency, chunk_size=chunk_size, client=client).download(server.url, path)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("faults", [
+    ["503"],
+    ["429"],
+    ["reset"],
+    # The probe succeeds, the first range is cut off after 64 KiB and continues where it stopped
+    [None, "drop"],
+    ["503", "reset", "drop", "429", "drop", "503"],
+])
+def test_faults_still_give_an_intact_file(tmp_path, faults):
+    with LocalAssetServer(PAYLOAD, handler=FaultInjectingHandler, faults=faults) as server:
+        assert download(server, str(tmp_path / "asset.zip"), HttpClient(backoff=0.01)) == PAYLOAD
+        assert not server.httpd.faults
+
+
+@pytest.mark.parametrize("faults", [["503"], [None, "503"]])
+def test_retry_after_is_honoured(tmp_path, faults):
+    with LocalAssetServer(PAYLOAD, handler=FaultInjectingHandler, faults=faults, retry_after=1) as server:
+        assert download(server, str(tmp_path / "asset.zip"), HttpClient(backoff=0.01), concurrency=1) == PAYLOAD
+        times = [when for when, _ in server.httpd.requests]
+    failed = len(faults) - 1
+    assert times[failed + 1] - times[failed] >= 0.95
+
+
+def test_too_long_retry_after_is_not_waited_for(tmp_path):
+    with LocalAssetServer(PAYLOAD, handler=FaultInjectingHandler, faults=["503"], retry_after=3600) as server:
+        with pytest.raises(requests.exceptions.HTTPError):
+            download(server, str(tmp_path / "asset.zip"), HttpClient(backoff=0.01))
+        assert len(server.httpd.requests) == 1
+
+
+def test_persistent_errors_give_up_after_the_retries(tmp_path):
+    with LocalAssetServer(PAYLOAD, handler=FaultInjectingHandler, faults=["503"] * 10) as server:
+        with pytest.raises(requests.exceptions.HTTPError):
+            download(server, str(tmp_path / "asset.zip"), HttpClient(retries=2, backoff=0.01))
+        assert len(server.httpd.requests) == 3
+
+
+def test_pooled_client_reuses_its_connection():
+    with LocalAssetServer(PAYLOAD[:1024], handler=FaultInjectingHandler) as server:
+        client = HttpClient()
+        for _ in range(10):
+            assert client.get(server.url).content == PAYLOAD[:1024]
+        assert len({port for _, port in server.httpd.requests}) == 1
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_cancel_stops_the_release_lookup_while_it_waits_to_retry(tmp_path):
+    # What the background prefetch relies on to stop without the window waiting out the Retry-After
+    import threading
+    import time
+
+    import launcher_core
+    from network import DownloadCancelled
+    from release_cache import ReleaseCache
+
+    cancelled = threading.Event()
+    with LocalAssetServer(PAYLOAD, handler=FaultInjectingHandler, faults=["503"], retry_after=60) as server:
+        threading.Timer(0.2, cancelled.set).start()
+        started = time.monotonic()
+        with pytest.raises(DownloadCancelled):
+            launcher_core.fetch_release(ReleaseCache(str(tmp_path / "cache.json")), server.url, cancelled=cancelled)
+    assert time.monotonic() - started < 5
+
+
+def test_cancelled_release_check_worker_finishes_without_a_result(tmp_path, qapp, wait_until):
+    # The window cancels and waits for it when it closes
+    import time
+
+    from release_cache import ReleaseCache
+    from update_checker import ReleaseCheckWorker
+
+    with LocalAssetServer(PAYLOAD, handler=FaultInjectingHandler, faults=["503"], retry_after=60) as server:
+        worker = ReleaseCheckWorker(server.url, ReleaseCache(str(tmp_path / "cache.json")), timeout=5)
+        results = []
+        worker.release_found.connect(results.append)
+        worker.check_failed.connect(results.append)
+        worker.start()
+        assert wait_until(lambda: server.httpd.requests)
+        started = time.monotonic()
+        worker.cancel()
+        assert worker.wait(5000)
+    assert time.monotonic() - started < 5
+    qapp.processEvents()
+    assert results == []
@@ -0,0 +1,37 @@
+import json
+import os
+
+import pytest
+
+from persistence import BACKUP_SUFFIX, read_json, write_atomic
+
+
+def test_truncated_file_falls_back_to_the_backup(tmp_path, capsys):
+    path = str(tmp_path / "characters.json")
+    write_atomic(path, json.dumps([{"username": "first"}]))
+    # The first version becomes the backup once this one replaces it
+    write_atomic(path, json.dumps([{"username": "second"}]))
+    assert read_json(path + BACKUP_SUFFIX) == [{"username": "first"}]
+
+    # Cut off half way, as a disk error or a hand edit can leave it
+    with open(path, "r+") as f:
+        f.truncate(10)
+    assert read_json(path) == [{"username": "first"}]
+    assert "damaged" in capsys.readouterr().out
+
+
+def test_failed_write_leaves_the_previous_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "settings.json")
+    write_atomic(path, json.dumps({"volume": 1}))
+
+    def disk_full(fd):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(os, "fsync", disk_full)
+    with pytest.raises(OSError):
+        write_atomic(path, json.dumps({"volume": 2}))
+    monkeypatch.undo()
+
+    with open(path) as f:
+        assert json.load(f) == {"volume": 1}
+    assert read_json(path) == {"volume": 1}
@@ -0,0 +1,76 @@
+import pytest
+
+import progress
+from progress import ProgressThrottle, format_progress
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(progress.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_slow_transfer_reports_every_interval(clock):
+    # 2 MB/s on a 1 GB asset: a whole percent takes five seconds
+    # Powers of two keep the simulated clock exact
+    throttle = ProgressThrottle(interval=1 / 8)
+    total = 1000 * 1000 * 1000
+    reports = []
+    done = 0
+    for _ in range(192):
+        clock[0] += 1 / 64
+        done += 2 * 1000 * 1000 // 64
+        state = throttle.update(done, total)
+        if state is not None:
+            reports.append((done, state))
+    # 3 s: the first call plus one report per interval, with the rate and ETA filled in
+    assert len(reports) == 24
+    done, (percent, rate, eta) = reports[-1]
+    assert percent == 0
+    assert rate == pytest.approx(2e6, rel=0.01)
+    assert eta == pytest.approx((total - done) / rate)
+
+
+def test_fast_transfer_reports_every_percent(clock):
+    throttle = ProgressThrottle(interval=0.1)
+    percents = []
+    for done in range(0, 1001):
+        clock[0] += 0.00001
+        state = throttle.update(done, 1000)
+        if state is not None:
+            percents.append(state[0])
+    assert percents == list(range(0, 101))
+
+
+def test_reports_within_an_interval_need_a_new_percent(clock):
+    throttle = ProgressThrottle(interval=0.1)
+    assert throttle.update(0, 1000) is not None
+    clock[0] += 0.01
+    assert throttle.update(5, 1000) is None
+    clock[0] += 0.01
+    assert throttle.update(10, 1000)[0] == 1
+    clock[0] += 0.1
+    assert throttle.update(11, 1000)[0] == 1
+
+
+def test_finish_is_always_reported(clock):
+    throttle = ProgressThrottle(interval=0.1)
+    throttle.update(0, 1000)
+    clock[0] += 0.001
+    assert throttle.update(1000, 1000)[0] == 100
+
+
+def test_unknown_total(clock):
+    throttle = ProgressThrottle(interval=1 / 8)
+    assert throttle.update(0, None) == (0, 0.0, -1.0)
+    clock[0] += 1 / 16
+    assert throttle.update(100, None) is None
+    clock[0] += 1 / 16
+    percent, rate, eta = throttle.update(200, None)
+    assert (percent, eta) == (0, -1.0) and rate == pytest.approx(1600)
+
+
+def test_format_progress():
+    assert format_progress(2 * 1024 * 1024, 125) == "2.0 MiB/s, 2:05 left"
+    assert format_progress(0, -1) == "0.0 MiB/s"
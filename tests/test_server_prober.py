@@ -0,0 +1,113 @@
+import asyncio
+import socket
+import time
+
+import pytest
+
+import server_prober
+from server_prober import ServerProbeWorker, cached_result, probe_server, split_address
+
+
+@pytest.fixture
+def listening_port():
+    # A port that accepts connections right away
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(16)
+    yield server.getsockname()[1]
+    server.close()
+
+
+@pytest.fixture
+def full_backlog_port():
+    # A listener that never accepts and whose backlog is filled, so new connections hang in the handshake
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(0)
+    port = server.getsockname()[1]
+    fillers = []
+    for _ in range(8):
+        filler = socket.socket()
+        filler.setblocking(False)
+        filler.connect_ex(("127.0.0.1", port))
+        fillers.append(filler)
+    yield port
+    for filler in fillers:
+        filler.close()
+    server.close()
+
+
+@pytest.fixture
+def closed_port():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    port = server.getsockname()[1]
+    server.close()
+    return port
+
+
+def probe(address, timeout=0.5, attempts=3):
+    return asyncio.run(probe_server(address, timeout, attempts))
+
+
+def test_split_address():
+    assert split_address("play.astonia.com") == ("play.astonia.com", server_prober.DEFAULT_SERVER_PORT)
+    assert split_address("10.0.0.2:5555") == ("10.0.0.2", 5555)
+
+
+def test_reachable_server(listening_port):
+    result = probe(f"127.0.0.1:{listening_port}")
+    assert result["reachable"] and result["error"] is None
+    assert 0 <= result["rtt_ms"] < 500
+    assert result["jitter_ms"] >= 0
+
+
+def test_closed_port_is_unreachable(closed_port):
+    began = time.monotonic()
+    result = probe(f"127.0.0.1:{closed_port}", timeout=2)
+    assert not result["reachable"]
+    assert result["rtt_ms"] is None and result["error"]
+    # Refused at once, the timeout is not waited for
+    assert time.monotonic() - began < 1
+
+
+def test_delayed_accept_times_out(full_backlog_port):
+    began = time.monotonic()
+    result = probe(f"127.0.0.1:{full_backlog_port}", timeout=0.3, attempts=2)
+    elapsed = time.monotonic() - began
+    if result["reachable"]:
+        pytest.skip("this kernel completes handshakes beyond the listen backlog")
+    assert result["error"] == "timed out"
+    assert elapsed < 0.3 * 2 + 0.5
+
+
+def test_worker_reports_each_server_without_waiting_for_the_slowest(qapp, wait_until, listening_port,
+                                                                     full_backlog_port):
+    fast = f"127.0.0.1:{listening_port}"
+    slow = f"127.0.0.1:{full_backlog_port}"
+    results = {}
+    worker = ServerProbeWorker([slow, fast, fast], timeout=1.0, attempts=2)
+    worker.result_ready.connect(lambda address, result: results.setdefault(address, (time.monotonic(), result)))
+
+    began = time.monotonic()
+    # The probes run on the worker thread, start() returns at once
+    worker.start()
+    assert time.monotonic() - began < 0.1
+    assert wait_until(lambda: len(results) == 2)
+    assert worker.wait(5000)
+
+    fast_at, fast_result = results[fast]
+    slow_at, slow_result = results[slow]
+    assert fast_result["reachable"]
+    assert fast_at - began < 0.5
+    if not slow_result["reachable"]:
+        assert slow_at > fast_at
+    assert cached_result(fast) == fast_result
+
+
+def test_cached_results_expire(listening_port):
+    address = f"127.0.0.1:{listening_port}"
+    server_prober._cache[address] = (time.monotonic() - server_prober.CACHE_TTL - 1, {"reachable": True})
+    assert cached_result(address) is None
+    server_prober._cache[address] = (time.monotonic(), {"reachable": True})
+    assert cached_result(address) == {"reachable": True}
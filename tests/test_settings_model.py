@@ -0,0 +1,125 @@
+import json
+import random
+
+import pytest
+
+from persistence import writer
+from settings_model import FIELDS, FIELDS_BY_NAME, OPTION_FIELDS, SCHEMA_VERSION, Settings, migrate
+
+# Bit positions the client reads from -o; gamma is a level in bits 14-15, the checkbox selects level 1
+EXPECTED_BITS = {
+    "enable_dark_gui": 0,
+    "enable_context": 1,
+    "enable_keybindings": 2,
+    "enable_smaller_bottom_window": 3,
+    "enable_smaller_top_window": 4,
+    "enable_big_health_bar": 5,
+    "enable_sound": 6,
+    "enable_large_font": 7,
+    "enable_true_full_screen": 8,
+    "enable_legacy_mouse_wheel": 9,
+    "enable_appdata_usage": 12,
+    "enable_minimap_management": 13,
+    "enable_gamma_increase": 14,
+    "enable_minimap": 18,
+}
+
+
+def expected_mask(settings):
+    return sum(1 << EXPECTED_BITS[field.name] for field in OPTION_FIELDS if getattr(settings, field.name))
+
+
+def random_value(rng, field):
+    if field.type is bool:
+        return rng.random() < 0.5
+    if field.type is int:
+        # Also out of range, which is clamped
+        return rng.randint(field.minimum - 10, field.maximum + 10)
+    return rng.choice(["", "client.exe", "moac.exe", "http://10.0.0.2:8080 http://10.0.0.3"])
+
+
+def test_option_fields_are_the_client_bits():
+    assert {field.name: field.bit for field in OPTION_FIELDS} == EXPECTED_BITS
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_toggles_keep_the_mask_in_sync(seed):
+    rng = random.Random(seed)
+    settings = Settings()
+    for _ in range(500):
+        field = rng.choice(OPTION_FIELDS)
+        setattr(settings, field.name, rng.random() < 0.5)
+        assert settings.options_mask == expected_mask(settings)
+        assert not settings.options_mask & (1 << 15)
+
+
+def test_gamma_and_minimap_bits():
+    settings = Settings(enable_gamma_increase=True)
+    assert settings.options_mask == 1 << 14
+    settings.enable_minimap = True
+    assert settings.options_mask == (1 << 14) | (1 << 18)
+    settings.enable_gamma_increase = False
+    assert settings.options_mask == 1 << 18
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_round_trip(seed):
+    rng = random.Random(seed)
+    settings = Settings(**{field.name: random_value(rng, field) for field in FIELDS})
+    data = json.loads(json.dumps(settings.to_dict()))
+    assert data["version"] == SCHEMA_VERSION
+    restored = Settings.from_dict(data)
+    assert restored.to_dict() == settings.to_dict()
+    assert restored.options_mask == settings.options_mask == expected_mask(settings)
+
+
+def test_values_are_clamped_and_checked():
+    settings = Settings()
+    settings.desired_width = 100000
+    assert settings.desired_width == FIELDS_BY_NAME["desired_width"].maximum
+    with pytest.raises(ValueError):
+        settings.enable_sound = "yes"
+    with pytest.raises(AttributeError):
+        settings.no_such_setting = 1
+
+
+def test_migrate_v1():
+    # Version 1 dumped every SettingsDialog attribute, button labels and bad values included
+    v1 = {
+        "desired_width": 1920,
+        "desired_height": 100,
+        "enable_gamma_increase": 1,
+        "enable_minimap": True,
+        "enable_sound": "on",
+        "sdl_frames": 30.5,
+        "executable_name": "moac.exe",
+        "save_button": "Save",
+        "options": "0000",
+    }
+    migrated = migrate(dict(v1))
+    assert migrated == {
+        "version": 2,
+        "desired_width": 1920,
+        "desired_height": 600,
+        "enable_gamma_increase": True,
+        "enable_minimap": True,
+        "executable_name": "moac.exe",
+    }
+    settings = Settings.from_dict(v1)
+    assert settings.options_mask == (1 << 14) | (1 << 18)
+    assert settings.sdl_frames == FIELDS_BY_NAME["sdl_frames"].default
+    assert settings.enable_sound is False
+
+
+def test_newer_versions_keep_known_fields():
+    settings = Settings.from_dict({"version": SCHEMA_VERSION + 1, "enable_minimap": True, "new_setting": 3})
+    assert settings.options_mask == 1 << 18
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "settings.json")
+    settings = Settings(enable_dark_gui=True, desired_width=1024, update_mirrors="http://10.0.0.2:8080")
+    settings.save(path)
+    writer.flush()
+    assert Settings.load(path).to_dict() == settings.to_dict()
+    assert Settings.load(str(tmp_path / "missing.json")).to_dict() == Settings().to_dict()
@@ -0,0 +1,124 @@
+import os
+import sys
+import time
+
+import pytest
+
+from supervisor import ClientSupervisor, FirstWindowProbe
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="the stub commands are shell scripts")
+
+
+def test_probe_reports_the_first_window(qapp, wait_until, stub_bin, tmp_path):
+    mapped = tmp_path / "mapped"
+    # Like xdotool search: prints the window ids, nothing while the client has no window yet
+    stub_bin("xdotool", f'[ -e "{mapped}" ] && echo 41943041')
+    started_at = time.monotonic()
+    probe = FirstWindowProbe(1234, started_at, interval=20)
+    assert probe.command[0] == "xdotool"
+    latencies = []
+    probe.first_window.connect(latencies.append)
+    probe.start()
+
+    assert not wait_until(lambda: latencies, timeout=0.3)
+    mapped.touch()
+    assert wait_until(lambda: latencies)
+    assert 300 <= latencies[0] <= (time.monotonic() - started_at) * 1000
+    assert not probe.timer.isActive()
+
+
+def test_probe_never_blocks_on_a_hung_query(qapp, wait_until, stub_bin):
+    stub_bin("xdotool", "sleep 30")
+    probe = FirstWindowProbe(1234, time.monotonic(), timeout=1.5, interval=20)
+    timed_out = []
+    probe.timed_out.connect(lambda: timed_out.append(True))
+    probe.start()
+
+    # Every poll returns at once although the query does not; the hung query is killed after a second
+    began = time.monotonic()
+    probe.poll()
+    assert time.monotonic() - began < 0.1
+    assert wait_until(lambda: timed_out, timeout=5)
+    assert wait_until(lambda: probe.process is None)
+
+
+def test_probe_with_wmctrl_matches_the_pid(qapp, wait_until, stub_bin, monkeypatch):
+    # Columns: window id, desktop, pid, host, title
+    wmctrl = stub_bin("wmctrl", 'echo "0x02800003  0 999 host other"; echo "0x02a00003  0 1234 host Astonia"')
+    monkeypatch.setenv("PATH", os.path.dirname(wmctrl))
+    probe = FirstWindowProbe(1234, time.monotonic(), interval=20)
+    assert probe.command[0] == "wmctrl"
+    latencies = []
+    probe.first_window.connect(latencies.append)
+    probe.start()
+    assert wait_until(lambda: latencies)
+
+    other = FirstWindowProbe(4321, time.monotonic(), timeout=0.5, interval=20)
+    timed_out = []
+    other.first_window.connect(latencies.append)
+    other.timed_out.connect(lambda: timed_out.append(True))
+    other.start()
+    assert wait_until(lambda: timed_out)
+    assert len(latencies) == 1
+
+
+def child(code, exit_code=0):
+    return [sys.executable, "-c", f"import sys, time; {code}; sys.exit({exit_code})"]
+
+
+def test_supervised_client_reports_pid_and_exit_code(qapp, wait_until, tmp_path):
+    supervisor = ClientSupervisor(max_starting=2, stagger=0.5)
+    started, finished = [], []
+    supervisor.client_started.connect(started.append)
+    supervisor.client_finished.connect(finished.append)
+
+    client = supervisor.launch("moac (local)", child("print(1)", exit_code=3), dict(os.environ), cwd=str(tmp_path))
+    assert client.state == "running"
+    assert started == [client] and client.pid
+    assert wait_until(lambda: finished)
+    assert finished == [client]
+    assert client.state == "exited" and client.exit_code == 3
+    assert client.uptime() > 0
+
+
+def test_starts_are_limited_and_staggered(qapp, wait_until):
+    supervisor = ClientSupervisor(max_starting=2, stagger=0.5)
+    clients = [supervisor.launch(f"c{i}", child("time.sleep(2)")) for i in range(5)]
+    try:
+        # Two start at once, the rest wait until the first two are past their stagger window
+        assert [client.state for client in clients] == ["running"] * 2 + ["queued"] * 3
+        assert wait_until(lambda: all(client.state == "running" for client in clients), timeout=5)
+        first = min(client.started_at for client in clients[:2])
+        later = sorted(client.started_at for client in clients[2:])
+        assert later[0] - first >= 0.5
+        assert later[2] - first >= 1.0
+        assert len({client.pid for client in clients}) == 5
+    finally:
+        supervisor.terminate_all()
+        wait_until(lambda: not supervisor.running())
+
+
+def test_failed_start_does_not_block_the_queue(qapp, wait_until):
+    supervisor = ClientSupervisor(max_starting=1, stagger=30)
+    missing = supervisor.launch("missing", ["/nonexistent/wine", "-u", "moac"])
+    ok = supervisor.launch("ok", child("pass"))
+    assert wait_until(lambda: missing.state == "failed")
+    assert wait_until(lambda: ok.state == "exited")
+    assert missing.pid is None and ok.exit_code == 0
+
+
+def test_terminate_all_cancels_the_queue(qapp, wait_until):
+    supervisor = ClientSupervisor(max_starting=1, stagger=30)
+    running = supervisor.launch("running", child("time.sleep(30)"))
+    queued = supervisor.launch("queued", child("pass"))
+    supervisor.terminate_all()
+    assert queued.state == "cancelled"
+    assert wait_until(lambda: running.state == "exited")
+
+
+def test_password_is_not_printed(qapp, wait_until, capsys):
+    supervisor = ClientSupervisor()
+    client = supervisor.launch("moac", child("pass") + ["-u moac", "-p secret", "-d server"])
+    assert wait_until(lambda: client.state == "exited")
+    out = capsys.readouterr().out
+    assert "secret" not in out and "-p ********" in out
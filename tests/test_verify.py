@@ -0,0 +1,45 @@
+import json
+import os
+
+import pytest
+
+import launcher_core
+from launcher_core import LauncherError
+from local_server import LocalAssetServer
+from release_cache import ReleaseCache
+
+
+def test_verify_worker_reports_damaged_files(launcher_dir, make_release, install):
+    from PyQt5.QtCore import QCoreApplication
+    from verify_worker import VerifyWorker
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    digest = make_release(launcher_dir / "v1.zip", {"a.dll": b"A" * 100, "b.dll": b"B" * 100})
+    directory = install(str(launcher_dir / "v1.zip"), "v1", digest)
+    os.remove(os.path.join(directory, "b.dll"))
+
+    results = []
+    worker = VerifyWorker()
+    worker.verified.connect(results.append)
+    worker.start()
+    assert worker.wait(10000)
+    app.processEvents()
+    assert results == [(2, ["b.dll"])]
+
+
+def test_release_for_version_uses_the_cached_release_when_it_matches(launcher_dir):
+    cache = ReleaseCache(launcher_core.RELEASE_CACHE_FILE)
+    cache.body = {"tag_name": "v1", "assets": []}
+    assert launcher_core.release_for_version(cache, "v1") is cache.body
+
+
+def test_release_for_version_looks_up_the_tag(launcher_dir, monkeypatch):
+    # The latest release is newer than the installed one, the repair must not install it
+    cache = ReleaseCache(launcher_core.RELEASE_CACHE_FILE)
+    cache.body = {"tag_name": "v2", "assets": []}
+    release = {"tag_name": "v1", "assets": [{"name": "v1.zip", "browser_download_url": "http://x/v1.zip"}]}
+    with LocalAssetServer(json.dumps(release).encode()) as server:
+        monkeypatch.setattr(launcher_core, "RELEASE_TAG_URL", server.url + "?tag={}")
+        assert launcher_core.release_for_version(cache, "v1") == release
+        with pytest.raises(LauncherError):
+            launcher_core.release_for_version(cache, "v3")
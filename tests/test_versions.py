@@ -0,0 +1,33 @@
+import os
+
+import launcher_core
+
+
+def test_repaired_file_is_not_reused_damaged_by_the_next_version(launcher_dir, make_release, install):
+    v1 = make_release(launcher_dir / "v1.zip", {"a.dll": b"A" * 1000, "b.dll": b"B" * 10})
+    directory = install(str(launcher_dir / "v1.zip"), "v1", v1)
+    # Damaged in place, i.e. through the hardlink the object store shares
+    with open(os.path.join(directory, "a.dll"), "r+b") as f:
+        f.write(b"X")
+    assert launcher_core.verify_files() == (2, ["a.dll"])
+
+    install(str(launcher_dir / "v1.zip"), "v1", v1)
+    assert launcher_core.verify_files() == (2, [])
+
+    v2 = make_release(launcher_dir / "v2.zip", {"a.dll": b"A" * 1000, "b.dll": b"C" * 10})
+    directory = install(str(launcher_dir / "v2.zip"), "v2", v2)
+    with open(os.path.join(directory, "a.dll"), "rb") as f:
+        assert f.read() == b"A" * 1000
+    assert launcher_core.verify_files() == (2, [])
+
+
+def test_unchanged_files_are_shared_between_versions(launcher_dir, make_release, install):
+    v1 = make_release(launcher_dir / "v1.zip", {"a.dll": b"A" * 1000, "b.dll": b"B" * 10})
+    old = install(str(launcher_dir / "v1.zip"), "v1", v1)
+    v2 = make_release(launcher_dir / "v2.zip", {"a.dll": b"A" * 1000, "b.dll": b"C" * 10})
+    new = install(str(launcher_dir / "v2.zip"), "v2", v2)
+
+    assert os.path.samefile(os.path.join(old, "a.dll"), os.path.join(new, "a.dll"))
+    assert not os.path.samefile(os.path.join(old, "b.dll"), os.path.join(new, "b.dll"))
+    assert launcher_core.read_installed_version() == "v2"
+    assert launcher_core.previous_version() == "v1"
@@ -0,0 +1,40 @@
+import json
+import os
+import sys
+
+import pytest
+
+from wine_warmup import record_launch, start_persistent_wineserver, wine_environment
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="the stub wineserver is a shell script")
+
+
+def test_wine_environment(monkeypatch):
+    monkeypatch.delenv("WINEPREFIX", raising=False)
+    assert "WINEPREFIX" not in wine_environment("")
+    monkeypatch.setenv("HOME", "/home/player")
+    env = wine_environment("~/.wine-astonia")
+    assert env["WINEPREFIX"] == "/home/player/.wine-astonia"
+    assert env["PATH"] == os.environ["PATH"]
+
+
+def test_persistent_wineserver_gets_the_prefix(stub_bin, tmp_path):
+    calls = tmp_path / "calls"
+    stub_bin("wineserver", f'echo "$* $WINEPREFIX" >> "{calls}"')
+    process = start_persistent_wineserver(str(tmp_path / "prefix"))
+    assert process is not None
+    assert process.wait(10) == 0
+    assert calls.read_text() == f"-p {tmp_path / 'prefix'}\n"
+
+
+def test_without_wineserver_warm_start_is_off(monkeypatch, tmp_path):
+    monkeypatch.setenv("PATH", str(tmp_path))
+    assert start_persistent_wineserver("") is None
+
+
+def test_record_launch_keeps_the_newest(tmp_path):
+    path = str(tmp_path / "launch_times.json")
+    for i in range(5):
+        record_launch(path, {"first_window_ms": i}, keep=3)
+    with open(path) as f:
+        assert [entry["first_window_ms"] for entry in json.load(f)] == [2, 3, 4]